@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: acw_sc__v2 相关的性能测试
+
+运行方式: python benchmark/bench_acw.py --number 20000 --clients 8
+
+1. unsbox / hex_xor / calc_acw_sc__v2 改写前后的耗时(同时校验结果一致)
+2. MemoryAcwTokenStore 与 SQLiteAcwTokenStore 的读写耗时
+3. 模拟服务器要求 acw_sc__v2 时，多个客户端各自计算与共用存储分别被验证页面拦截的次数
+--------------------------------------------
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to, share_url, _load_page
+from zibuyu_lanzou import LanZouApi
+from zibuyu_lanzou.acw import MemoryAcwTokenStore, SQLiteAcwTokenStore
+from zibuyu_lanzou.utils import unsbox, hex_xor, calc_acw_sc__v2
+
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+ACW_KEY = "3000176000856006061501533003690027800375"
+
+
+# 以下为改写前的实现，用于对比
+def old_unsbox(str_arg):
+    v1 = [15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26, 2,
+          30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36]
+    v2 = ["" for _ in v1]
+    for idx in range(0, len(str_arg)):
+        v3 = str_arg[idx]
+        for idx2 in range(len(v1)):
+            if v1[idx2] == idx + 1:
+                v2[idx2] = v3
+
+    res = ''.join(v2)
+    return res
+
+
+def old_hex_xor(str_arg, args):
+    res = ''
+    for idx in range(0, min(len(str_arg), len(args)), 2):
+        v1 = int(str_arg[idx:idx + 2], 16)
+        v2 = int(args[idx:idx + 2], 16)
+        v3 = format(v1 ^ v2, 'x')
+        if len(v3) == 1:
+            v3 = '0' + v3
+        res += v3
+
+    return res
+
+
+def old_calc_acw_sc__v2(html_text: str) -> str:
+    arg1 = re.search(r"arg1='([0-9A-Z]+)'", html_text)
+    arg1 = arg1.group(1) if arg1 else ""
+    acw_sc__v2 = old_hex_xor(old_unsbox(arg1), ACW_KEY)
+    return acw_sc__v2
+
+
+def per_call(func, args, number: int) -> float:
+    """平均每次调用的耗时(微秒)"""
+    start = time.perf_counter()
+    for _ in range(number):
+        func(*args)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def check_equal(rounds: int = 2000):
+    rng = random.Random(0)
+    for _ in range(rounds):
+        arg = ''.join(rng.choice('0123456789ABCDEF') for _ in range(rng.randint(0, 40)))
+        assert unsbox(arg) == old_unsbox(arg), arg
+        assert hex_xor(arg, ACW_KEY) == old_hex_xor(arg, ACW_KEY), arg
+
+
+def bench_functions(number: int):
+    html = _load_page('acw.html')
+    arg1 = re.search(r"arg1='([0-9A-Z]+)'", html).group(1)
+    boxed = unsbox(arg1)
+    check_equal()
+    assert calc_acw_sc__v2(html) == old_calc_acw_sc__v2(html)
+
+    print(f"{'函数':<18}{'改写前(us)':>12}{'改写后(us)':>12}{'加速':>8}")
+    for name, old, new, args in (
+            ('unsbox', old_unsbox, unsbox, (arg1,)),
+            ('hex_xor', old_hex_xor, hex_xor, (boxed, ACW_KEY)),
+            ('calc_acw_sc__v2', old_calc_acw_sc__v2, calc_acw_sc__v2, (html,)),
+    ):
+        before, after = per_call(old, args, number), per_call(new, args, number)
+        print(f"{name:<18}{before:>12.2f}{after:>12.2f}{before / after:>7.1f}x")
+
+
+def bench_stores(number: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n{'存储':<18}{'get(us)':>12}{'set(us)':>12}")
+        for name, store in (('memory', MemoryAcwTokenStore()),
+                            ('sqlite', SQLiteAcwTokenStore(os.path.join(tmp, 'acw.db')))):
+            urls = [f'https://u{i}.lanzouo.com/i{i}' for i in range(16)]
+            set_cost = per_call(lambda: store.set(random.choice(urls), 'a' * 40), (), number // 10)
+            get_cost = per_call(lambda: store.get(random.choice(urls)), (), number)
+            print(f"{name:<18}{get_cost:>12.2f}{set_cost:>12.2f}")
+
+
+def bench_reuse(clients: int, links: int):
+    print(f"\n{'':<18}{'验证页面次数':>12}{'耗时(s)':>10}")
+    for name, shared in (('各自计算', False), ('共用存储', True)):
+        with StubServer(latency=0.01, acw_challenge=True) as server:
+            store = MemoryAcwTokenStore()
+            start = time.perf_counter()
+            for c in range(clients):  # 每个客户端相当于一个新的进程或线程
+                api = point_to(LanZouApi(logger=LOGGER, acw_store=store if shared else MemoryAcwTokenStore()),
+                               server.url)
+                for i in range(links):
+                    assert api.get_file_info_by_url(share_url(400000 + 2 * (c * links + i))).direct_url
+                api.close()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<18}{server.state.calls['acw_challenge']:>12}{elapsed:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20000, help='每个函数调用的次数')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--links', type=int, default=5, help='每个客户端解析的链接数')
+    args = parser.parse_args()
+
+    bench_functions(args.number)
+    bench_stores(args.number)
+    bench_reuse(args.clients, args.links)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 对比同步客户端与异步客户端在模拟服务器上的吞吐量
+
+运行方式: python benchmark/bench_async.py --calls 500 --latency 0.02
+--------------------------------------------
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to
+from zibuyu_lanzou import LanZouApi, AsyncLanZouApi, LanZouCookie
+
+COOKIE = LanZouCookie(PHPSESSID='stub', ylogin='10000', phpdisk_info='stub')
+LOGGER = logging.getLogger('bench')
+
+
+def bench_sync(base_url: str, calls: int) -> float:
+    api = point_to(LanZouApi(cookies=COOKIE, logger=LOGGER), base_url)
+
+    start = time.perf_counter()
+    for i in range(calls):
+        api.get_share_info(i)
+    return calls / (time.perf_counter() - start)
+
+
+async def _bench_async(base_url: str, calls: int, concurrency: int) -> float:
+    async with AsyncLanZouApi(cookies=COOKIE, logger=LOGGER, max_concurrency=concurrency) as api:
+        point_to(api, base_url)
+        await api.get_share_info(0)  # 预热连接池
+
+        start = time.perf_counter()
+        await asyncio.gather(*(api.get_share_info(i) for i in range(calls)))
+        return calls / (time.perf_counter() - start)
+
+
+def bench_async(base_url: str, calls: int, concurrency: int) -> float:
+    return asyncio.run(_bench_async(base_url, calls, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟服务器每个请求的延迟(秒)')
+    parser.add_argument('--concurrency', type=int, default=100)
+    args = parser.parse_args()
+
+    with StubServer(latency=args.latency) as server:
+        # get_share_info 对文件需要 task 22 + task 12 两次 doupload.php 请求
+        sync_ops = bench_sync(server.url, args.calls)
+        async_ops = bench_async(server.url, args.calls, args.concurrency)
+
+    print(f'get_share_info x {args.calls}, 模拟延迟 {args.latency * 1000:.0f} ms')
+    print(f'  LanZouApi       : {sync_ops:10.1f} ops/s')
+    print(f'  AsyncLanZouApi  : {async_ops:10.1f} ops/s  (x{async_ops / sync_ops:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 对比遇到验证码时阻塞等待与延后提交(resolve_many)的批量解析吞吐量
+
+运行方式: python benchmark/bench_captcha.py --links 300 --workers 16
+
+模拟服务器按 --rates 中的比例在假直链返回验证码页面，分别用线程池逐个调用 get_file_info_by_url
+(遇到验证码时工作线程 sleep 2 秒)与 resolve_many(遇到验证码的链接进入等待队列)解析同一批链接。
+--------------------------------------------
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to, share_url
+from zibuyu_lanzou import LanZouApi, resolve_many
+
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def run(mode: str, rate: float, args) -> dict:
+    links = [share_url(500000 + 2 * i) for i in range(args.links)]  # 偶数 id 为无提取码的文件
+    with StubServer(latency=args.latency, captcha_rate=rate, seed=1) as server:
+        api = point_to(LanZouApi(logger=LOGGER, pool_maxsize=args.workers, host_limit=args.workers), server.url)
+        start = time.perf_counter()
+        if mode == 'blocking':
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                details = list(executor.map(api.get_file_info_by_url, links))
+        else:
+            details = list(resolve_many(links, workers=args.workers, api=api))
+        elapsed = time.perf_counter() - start
+        return {
+            'per_sec': len(details) / elapsed,
+            'ok': sum(1 for detail in details if detail.direct_url),
+            'captcha': server.state.calls['captcha'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--links', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--rates', type=float, nargs='+', default=[0.0, 0.5, 0.9], help='返回验证码页面的比例')
+    args = parser.parse_args()
+
+    print(f"{'验证码比例':<10}{'方式':<12}{'链接/秒':>10}{'成功':>8}{'验证码':>8}")
+    for rate in args.rates:
+        for mode in ('blocking', 'deferred'):
+            r = run(mode, rate, args)
+            print(f"{rate:<14.0%}{mode:<12}{r['per_sec']:>10.1f}{r['ok']:>8}{r['captcha']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 对比逐个调用 get_share_info 与 export_shares 导出文件夹分享链接的耗时
+
+运行方式: python benchmark/bench_export.py --files-per-page 50 --pages 10 --latency 0.03 --workers 16
+
+逐个调用时每个文件依次请求 task 22 与 task 12；export_shares 的文件名取自文件列表，只请求 task 22，并且并发请求。
+输出每秒导出的链接数，以及按此速度导出 2 万个链接需要的时间。
+--------------------------------------------
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to
+from zibuyu_lanzou import LanZouApi, LanZouCookie
+
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+COOKIE = LanZouCookie(ylogin='10001', phpdisk_info='bench', PHPSESSID='bench')
+
+
+def run(mode: str, args) -> dict:
+    with StubServer(latency=args.latency, files_per_page=args.files_per_page, pages=args.pages) as server:
+        api = point_to(LanZouApi(cookies=COOKIE, logger=LOGGER, pool_maxsize=args.workers), server.url)
+        start = time.perf_counter()
+        if mode == 'get_share_info':
+            count = 0
+            for file in api.get_file_list(args.folder_id):
+                info = api.get_share_info(file.id)
+                count += 1 if info.success else 0
+        else:
+            buffer = io.StringIO()
+            count = api.export_shares(args.folder_id, buffer, fmt='jsonl', workers=args.workers)
+        elapsed = time.perf_counter() - start
+        calls = server.state.calls
+        return {'count': count, 'per_sec': count / elapsed, 'task22': calls['task22'], 'task12': calls['task12']}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--folder-id', type=int, default=1)
+    parser.add_argument('--files-per-page', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'方式':<16}{'链接数':>8}{'链接/秒':>10}{'task22':>8}{'task12':>8}{'2万个链接':>12}")
+    for mode in ('get_share_info', 'export_shares'):
+        r = run(mode, args)
+        minutes = 20000 / r['per_sec'] / 60
+        print(f"{mode:<16}{r['count']:>8}{r['per_sec']:>10.1f}{r['task22']:>8}{r['task12']:>8}{minutes:>10.1f}分钟")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 对比分享页面解析模块与原来的逐个正则提取方式，每秒能解析多少个页面
+
+运行方式: python benchmark/bench_parser.py --seconds 2
+页面样本在 benchmark/corpus 目录中，按真实分享页面的结构整理(包括注释掉的旧代码、统计脚本等干扰内容)
+--------------------------------------------
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zibuyu_lanzou import parser
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def _legacy_remove_notes(html: str) -> str:
+    html = re.sub(r'<!--.+?-->|\s+//\s*.+', '', html)
+    html = re.sub(r'(.+?[,;])\s*//.+', r'\1', html)
+    return html
+
+
+def legacy_share_page(html: str) -> tuple:
+    """原来 get_file_info_by_url 中的提取过程"""
+
+    if "acw_sc__v2" in html:
+        return ('acw',)
+    html = _legacy_remove_notes(html)
+    if '文件取消' in html or '文件不存在' in html:
+        return ('cancelled',)
+    if 'id="pwdload"' in html or 'id="passwddiv"' in html:
+        return 'password', re.search(r"var skdklds = '(.*?)';", html).group(1)
+
+    para = re.search(r'<iframe.*?src="(.+?)"', html).group(1)
+    f_name = re.search(r"<title>(.+?) - 蓝奏云</title>", html) or \
+             re.search(r'<div class="filethetext".+?>([^<>]+?)</div>', html) or \
+             re.search(r'<div style="font-size.+?>([^<>].+?)</div>', html) or \
+             re.search(r"var filename = '(.+?)';", html) or \
+             re.search(r'id="filenajax">(.+?)</div>', html) or \
+             re.search(r'<div class="b"><span>([^<>]+?)</span></div>', html)
+    f_name = f_name.group(1).replace("*", "_") if f_name else "未匹配到文件名"
+    f_time = re.search(r'>(\d+\s?[秒天分小][钟时]?前|[昨前]天\s?[\d:]+?|\d+\s?天前|\d{4}-\d\d-\d\d)<', html)
+    f_time = f_time.group(1) if f_time else '0 小时前'
+    f_size = re.search(r'大小.+?(\d[\d.,]+\s?[BKM]?)<', html)
+    f_size = f_size.group(1).replace(",", "") if f_size else '0 M'
+    f_desc = re.search(r'文件描述.+?<br>\n?\s*(.*?)\s*</td>', html)
+    f_desc = f_desc.group(1) if f_desc else ''
+    return 'file', f_name, f_time, f_size, f_desc, para
+
+
+def legacy_password_info(html: str) -> tuple:
+    html = _legacy_remove_notes(html)
+    f_size = re.search(r'大小.+?(\d[\d.,]+\s?[BKM]?)<', html)
+    f_size = f_size.group(1).replace(",", "") if f_size else '0 M'
+    f_time = re.search(r'class="n_file_infos">(.+?)</span>', html)
+    f_time = f_time.group(1) if f_time else '0 小时前'
+    f_desc = re.search(r'class="n_box_des">(.*?)</div>', html)
+    return f_size, f_time, f_desc.group(1) if f_desc else ''
+
+
+def legacy_download_frame(html: str, webpage: bool) -> dict:
+    html = _legacy_remove_notes(html)
+    sign = re.search(r"'sign':(.+?),", html).group(1)
+    if len(sign) < 20:
+        sign = re.search(rf"var {sign}\s*=\s*'(.+?)';", html).group(1)
+    if not webpage:
+        return {'action': 'downprocess', 'sign': sign, 'ves': 1}
+    ajax_data = re.search(r"var ajaxdata\s*=\s*'(.+?)';", html).group(1)
+    web_sign = re.search(r"var a?websigna?\s*=\s*'(.+?)';", html).group(1)
+    web_sign_key = re.search(r"var c?websignkeyc?\s*=\s*'(.+?)';", html).group(1)
+    return {'action': 'downprocess', 'signs': ajax_data, 'sign': sign, 'ves': 1,
+            'websign': web_sign, 'websignkey': web_sign_key}
+
+
+def legacy_captcha(html: str):
+    html = _legacy_remove_notes(html)
+    if '网络异常' not in html:
+        return None
+    return re.findall("'file':'(.+?)'", html)[0], re.findall("'sign':'(.+?)'", html)[0]
+
+
+def new_share_page(html: str) -> tuple:
+    page = parser.parse_share_page(html)
+    if page.kind in ('acw', 'cancelled'):
+        return (page.kind,)
+    if page.kind == 'password':
+        return 'password', page.sign
+    return 'file', page.name, page.time, page.size, page.desc, page.iframe
+
+
+# 样本文件 -> (原来的解析函数, 新的解析函数)
+CASES = {
+    'public.html': (legacy_share_page, new_share_page),
+    'password.html': (legacy_share_page, new_share_page),
+    'acw.html': (legacy_share_page, new_share_page),
+    'cancelled.html': (legacy_share_page, new_share_page),
+    'password_info.html': (legacy_password_info, parser.parse_password_info),
+    'public_frame.html': (lambda h: legacy_download_frame(h, False), lambda h: parser.parse_download_frame(h, False)),
+    'webpage_frame.html': (lambda h: legacy_download_frame(h, True), lambda h: parser.parse_download_frame(h, True)),
+    'captcha.html': (legacy_captcha, parser.parse_captcha_page),
+}
+
+
+def pages_per_second(func, html: str, seconds: float) -> float:
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func(html)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--seconds', type=float, default=1.0, help='每个样本每种方式的测试时长')
+    args = arg_parser.parse_args()
+
+    print(f"{'样本':<22}{'大小':>8}{'原来(页/秒)':>14}{'现在(页/秒)':>14}{'倍数':>8}")
+    for name, (legacy, new) in CASES.items():
+        with open(os.path.join(CORPUS_DIR, name), 'r', encoding='utf-8') as file:
+            html = file.read()
+
+        if legacy(html) != new(html):  # 先确认两种方式的结果一致
+            raise AssertionError(f'{name} 解析结果不一致: {legacy(html)} != {new(html)}')
+
+        old_rate = pages_per_second(legacy, html, args.seconds)
+        new_rate = pages_per_second(new, html, args.seconds)
+        print(f"{name:<22}{len(html):>8}{old_rate:>14.0f}{new_rate:>14.0f}{new_rate / old_rate:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 测试导入包与创建客户端的耗时，以及大量创建客户端后日志 handler 的数量
+
+运行方式:
+    python benchmark/bench_startup.py
+    git worktree add /tmp/lanzou_old HEAD~1 && python benchmark/bench_startup.py --compare /tmp/lanzou_old
+
+每项测试都在新的子进程中运行，避免模块缓存影响结果；--compare 指定另一份代码的根目录，与当前代码对比。
+--------------------------------------------
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行，输出一行 json
+_PROBE = r'''
+import sys, time, json, logging
+sys.path.insert(0, {root!r})
+
+start = time.perf_counter()
+import zibuyu_lanzou
+import_package = time.perf_counter() - start
+
+start = time.perf_counter()
+from zibuyu_lanzou import LanZouApi
+import_client = time.perf_counter() - start
+
+start = time.perf_counter()
+LanZouApi()
+first_client = time.perf_counter() - start
+
+start = time.perf_counter()
+for _ in range({clients}):
+    LanZouApi()
+per_client = (time.perf_counter() - start) / {clients}
+
+logging.disable(logging.CRITICAL)  # 只统计 handler 数量，不输出日志
+print(json.dumps({{
+    'import_package_ms': import_package * 1000,
+    'import_client_ms': import_client * 1000,
+    'first_client_ms': first_client * 1000,
+    'per_client_ms': per_client * 1000,
+    'handlers': len(logging.getLogger('lanzou_api').handlers),
+    'heavy_modules': sorted(m for m in ('aiohttp', 'fake_useragent', 'requests') if m in sys.modules),
+}}))
+'''
+
+
+def probe(root: str, clients: int) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-c', _PROBE.format(root=root, clients=clients)],
+        capture_output=True, text=True, check=True, cwd=root,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(root: str, clients: int, repeat: int) -> dict:
+    """重复 repeat 次取中位数；handler 数与已导入的模块取最后一次"""
+    runs = [probe(root, clients) for _ in range(repeat)]
+    result = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key.endswith('_ms')}
+    result['handlers'] = runs[-1]['handlers']
+    result['heavy_modules'] = runs[-1]['heavy_modules']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=2000, help='连续创建多少个客户端')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help='另一份代码的根目录(例如旧版本的 git worktree)')
+    args = parser.parse_args()
+
+    targets = [('当前', ROOT)]
+    if args.compare:
+        targets.insert(0, ('对比', os.path.abspath(args.compare)))
+
+    rows = [(name, measure(root, args.clients, args.repeat)) for name, root in targets]
+
+    print(f"{'':<6}{'导入包(ms)':>12}{'导入客户端(ms)':>16}{'首个客户端(ms)':>16}{'每个客户端(ms)':>16}"
+          f"{'handler 数':>12}  已导入")
+    for name, r in rows:
+        print(f"{name:<6}{r['import_package_ms']:>12.1f}{r['import_client_ms']:>16.1f}{r['first_client_ms']:>16.2f}"
+              f"{r['per_client_ms']:>16.3f}{r['handlers']:>12}  {', '.join(r['heavy_modules'])}")
+
+
+if __name__ == '__main__':
+    main()
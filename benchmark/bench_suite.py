@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 在本地模拟服务器上端到端测试各个接口的吞吐量与延迟分布
+
+运行方式:
+    python benchmark/bench_suite.py --latency 0.01 --json result.json
+    python benchmark/bench_suite.py --latency 0.01 --baseline result.json  # 与之前的结果对比，性能下降时返回非 0
+
+每个场景用 --threads 个线程共用一个 LanZouApi 实例执行 --ops 次操作，记录 吞吐(次/秒)、p50 与 p99 延迟(毫秒)。
+--------------------------------------------
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to, share_url
+from zibuyu_lanzou import LanZouApi, LanZouCookie, RetryPolicy
+
+COOKIE = LanZouCookie(PHPSESSID='stub', ylogin='10000', phpdisk_info='stub')
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)  # nearest-rank
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def run_scenario(op: Callable[[int], bool], ops: int, threads: int) -> dict:
+    """op(i) 执行第 i 次操作并返回是否成功"""
+
+    latencies = [0.0] * ops
+    failures = [0]
+
+    def _timed(i):
+        start = time.perf_counter()
+        try:
+            ok = op(i)
+        except Exception:  # 基准测试里任何异常都计为失败，不中断其他操作
+            LOGGER.debug('操作失败', exc_info=True)
+            ok = False
+        latencies[i] = time.perf_counter() - start
+        if not ok:
+            failures[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(_timed, range(ops)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'ops': ops,
+        'ops_per_sec': ops / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'failures': failures[0],
+    }
+
+
+def build_scenarios(api: LanZouApi, work_dir: str, upload_size: int) -> Dict[str, Callable[[int], bool]]:
+    upload_path = os.path.join(work_dir, 'upload.zip')
+    with open(upload_path, 'wb') as file:
+        file.write(os.urandom(upload_size))
+
+    def _list(i):
+        return len(api.get_file_list(i % 5 + 1)) > 0
+
+    def _share_info(i):
+        return api.get_share_info(100000 + i).success
+
+    def _upload(i):
+        # 每次上传不同的文件名，避免删除同名文件影响结果；文件夹的文件名映射只在第一次上传时列举
+        name_path = os.path.join(work_dir, f'u{i}.zip')
+        if not os.path.exists(name_path):
+            shutil.copyfile(upload_path, name_path)
+        return bool(api.upload_file(name_path, folder_id=i % 5 + 1))
+
+    def _resolve(i):
+        return bool(api.get_file_info_by_url(share_url(200000 + 2 * i)).direct_url)
+
+    def _resolve_pwd(i):
+        return bool(api.get_file_info_by_url(share_url(200001 + 2 * i), 'abcd').direct_url)
+
+    return {
+        'list': _list,
+        'share_info': _share_info,
+        'upload': _upload,
+        'resolve': _resolve,
+        'resolve_pwd': _resolve_pwd,
+    }
+
+
+def run_suite(args) -> Dict[str, dict]:
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='lanzou_bench_')
+    try:
+        with StubServer(latency=args.latency, latency_jitter=args.jitter, error_rate=args.error_rate) as server:
+            policy = RetryPolicy(backoff=0.05, max_backoff=0.5)  # 模拟服务器上注入的故障不需要等待太久
+            api = point_to(LanZouApi(cookies=COOKIE, logger=LOGGER, pool_maxsize=args.threads, retry_policy=policy),
+                           server.url)
+            scenarios = build_scenarios(api, work_dir, args.upload_size)
+            for name, op in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                op(0)  # 预热连接池与文件名映射
+                results[name] = run_scenario(op, args.ops, args.threads)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """吞吐下降或 p99 上升超过 tolerance 比例即视为性能下降"""
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: 吞吐 {base['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f} 次/秒")
+        if result['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_ms']:.1f} -> {result['p99_ms']:.1f} 毫秒")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=200, help='每个场景的操作次数')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.01, help='模拟服务器每个请求的延迟(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='在延迟之外随机增加的时间上限(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='注入故障的请求比例')
+    parser.add_argument('--upload-size', type=int, default=64 * 1024, help='上传场景的文件大小(字节)')
+    parser.add_argument('--only', nargs='*', help='只运行指定的场景')
+    parser.add_argument('--json', help='把结果保存为 json，作为之后对比的基准')
+    parser.add_argument('--baseline', help='与之前保存的 json 结果对比')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的性能波动比例')
+    args = parser.parse_args()
+
+    results = run_suite(args)
+
+    print(f"{'场景':<14}{'次数':>8}{'次/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'失败':>6}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['ops']:>8}{r['ops_per_sec']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['failures']:>6}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for line in regressions:
+            print('性能下降:', line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 对比是否使用自适应限速时，持续解析分享链接的成功次数
+
+运行方式: python benchmark/bench_throttle.py --duration 60 --threads 16 --antibot-rate 15
+
+模拟服务器上分享页面或假直链每秒请求数超过 --antibot-rate 后，--penalty 秒内返回 acw_sc__v2 验证页面或验证码页面；
+不限速时请求先突发再被惩罚，限速时按信号自动调整速率。输出每分钟成功解析次数与各信号出现的次数。
+--------------------------------------------
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to, share_url
+from zibuyu_lanzou import LanZouApi, Metrics
+from zibuyu_lanzou.throttle import AdaptiveRateLimiter
+
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def run(args, limiter) -> dict:
+    with StubServer(latency=args.latency, antibot_rate=args.antibot_rate, antibot_penalty=args.penalty) as server:
+        metrics = Metrics()
+        api = point_to(LanZouApi(logger=LOGGER, pool_maxsize=args.threads, metrics=metrics, rate_limiter=limiter),
+                       server.url)
+
+        deadline = time.monotonic() + args.duration
+        counter = iter(range(10 ** 9))
+        lock = threading.Lock()
+        results = {'ok': 0, 'failed': 0}
+
+        def _worker():
+            while time.monotonic() < deadline:
+                with lock:
+                    i = next(counter)
+                detail = api.get_file_info_by_url(share_url(300000 + 2 * i))  # 偶数 id 为无提取码的文件
+                with lock:
+                    results['ok' if detail.direct_url else 'failed'] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            for _ in range(args.threads):
+                executor.submit(_worker)
+        elapsed = time.perf_counter() - start
+
+        calls = server.httpd.state.calls
+        return {
+            'per_minute': results['ok'] / elapsed * 60,
+            'ok': results['ok'],
+            'failed': results['failed'],
+            'acw': calls['antibot_acw'],
+            'captcha': calls['antibot_captcha'],
+            'signals': metrics.count('throttle_signals'),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=float, default=60, help='每轮持续解析的时间(秒)')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--antibot-rate', type=float, default=15, help='模拟服务器每秒允许的请求数')
+    parser.add_argument('--penalty', type=float, default=2.0, help='触发反爬后的惩罚时间(秒)')
+    args = parser.parse_args()
+
+    print(f"{'':<10}{'成功/分钟':>10}{'成功':>8}{'失败':>8}{'acw':>8}{'验证码':>8}")
+    for name, limiter in (('不限速', None), ('自适应限速', AdaptiveRateLimiter())):
+        r = run(args, limiter)
+        print(f"{name:<10}{r['per_minute']:>10.0f}{r['ok']:>8}{r['failed']:>8}{r['acw']:>8}{r['captcha']:>8}")
+        if limiter is not None:
+            for row in limiter.stats():
+                print(f"    {row['site']:<24} 速率 {row['rate']:.1f} 次/秒  信号 {row['signals']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 上传的发送速度与每字节 CPU 开销
+
+运行方式: python benchmark/bench_upload.py --size 100 --rounds 3
+
+模拟服务器在子进程中运行(只接收数据，不占用本进程的 CPU)。对比:
+    monitor      改写前的方式: MultipartEncoderMonitor，urllib3 每次读取 16 KB，每次读取都调用进度回调
+    block=...    EncoderStream 按块发送，进度回调每 0.1 秒最多一次
+CPU 为发送线程的 CPU 时间(time.thread_time)除以字节数。
+--------------------------------------------
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to
+from zibuyu_lanzou import LanZouApi, LanZouCookie
+from zibuyu_lanzou.stream import open_upload_body
+from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+
+LOGGER = logging.getLogger('bench')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+COOKIE = LanZouCookie(ylogin='10001', phpdisk_info='bench', PHPSESSID='bench')
+
+
+def _serve(queue, stop):
+    with StubServer() as server:
+        queue.put(server.url)
+        stop.wait()
+
+
+def upload_monitor(api: LanZouApi, file_path: str) -> int:
+    """改写前的上传方式，返回进度回调次数"""
+
+    calls = [0]
+
+    def _call_back(monitor):
+        calls[0] += 1
+
+    with open(file_path, 'rb') as file:
+        encoder = MultipartEncoder({'task': '1', 'name': 'bench.zip',
+                                    'upload_file': ('bench.zip', file, 'application/octet-stream')})
+        headers = dict(api._headers, **{'Content-Type': encoder.content_type})
+        resp = api._post(api._upload_url, data=MultipartEncoderMonitor(encoder, _call_back), headers=headers)
+        assert resp and resp.json()['zt'] == 1
+    return calls[0]
+
+
+def upload_stream(api: LanZouApi, file_path: str) -> int:
+    calls = [0]
+
+    def _callback(name, total, now):
+        calls[0] += 1
+
+    with open_upload_body(file_path) as body:
+        result = api.upload_stream(body, 'bench.zip', overwrite='keep', callback=_callback)
+        assert result
+    return calls[0]
+
+
+def measure(func, api, file_path, size: int, rounds: int) -> dict:
+    best = None
+    for _ in range(rounds):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        callbacks = func(api, file_path)
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        if best is None or wall < best['wall']:
+            best = {'wall': wall, 'cpu': cpu, 'callbacks': callbacks}
+    best['mb_per_sec'] = size / best['wall'] / 1048576
+    best['ns_per_byte'] = best['cpu'] / size * 1e9
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100, help='上传文件大小(MB)')
+    parser.add_argument('--rounds', type=int, default=3, help='每种方式上传的次数，取最快的一次')
+    parser.add_argument('--blocks', type=int, nargs='+', default=[64, 256, 1024], help='EncoderStream 的块大小(KB)')
+    args = parser.parse_args()
+
+    queue, stop = multiprocessing.Queue(), multiprocessing.Event()
+    server = multiprocessing.Process(target=_serve, args=(queue, stop), daemon=True)
+    server.start()
+    url = queue.get(timeout=30)
+
+    size = args.size * 1048576
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, 'bench.zip')
+        with open(file_path, 'wb') as file:
+            for _ in range(args.size):
+                file.write(os.urandom(1048576))
+
+        print(f"{'方式':<14}{'MB/s':>10}{'CPU ns/B':>10}{'回调次数':>10}")
+        modes = [('monitor', upload_monitor, None)] + [(f'block={kb}K', upload_stream, kb) for kb in args.blocks]
+        for name, func, kb in modes:
+            api = point_to(LanZouApi(cookies=COOKIE, logger=LOGGER, upload_block_size=(kb or 1024) * 1024), url)
+            r = measure(func, api, file_path, size, args.rounds)
+            print(f"{name:<14}{r['mb_per_sec']:>10.1f}{r['ns_per_byte']:>10.2f}{r['callbacks']:>10}")
+            if kb is not None:
+                print(f"{'':<14}upload_throughput: {api.upload_throughput()['throughput'] / 1048576:.1f} MB/s")
+            api.close()
+
+    stop.set()
+    server.join(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
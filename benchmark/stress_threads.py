@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 多个线程共用一个 LanZouApi 实例的压力测试，检查结果是否正确以及连接是否被复用
+
+运行方式: python benchmark/stress_threads.py --threads 32 --rounds 50
+--------------------------------------------
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer, point_to
+from zibuyu_lanzou import LanZouApi, LanZouCookie
+
+COOKIE = LanZouCookie(PHPSESSID='stub', ylogin='10000', phpdisk_info='stub')
+LOGGER = logging.getLogger('stress')
+
+
+def _worker(api: LanZouApi, worker_id: int, rounds: int) -> list:
+    """混合调用各个接口，返回发现的错误"""
+
+    errors = []
+    for i in range(rounds):
+        info = api.get_share_info(worker_id * rounds + i)
+        if not info.success or not info.url.endswith(str(worker_id * rounds + i)):
+            errors.append(f'get_share_info: {info}')
+
+        files = api.get_file_list(worker_id % 5 + 1)
+        if len(files) != 54:
+            errors.append(f'get_file_list: {len(files)} 个文件')
+
+        if i % 5 == 0:
+            name = f'w{worker_id}_{i}.txt'
+            uploaded = api._upload_fileobj(io.BytesIO(b'x' * 1024), name, folder_id=worker_id % 5 + 1,
+                                           overwrite='keep')
+            if [f.name for f in uploaded] != [name]:
+                errors.append(f'upload: {uploaded}')
+    return errors
+
+
+def run(threads: int, rounds: int, pool_maxsize: int, latency: float) -> dict:
+    with StubServer(latency=latency) as server:
+        api = point_to(LanZouApi(cookies=COOKIE, logger=LOGGER, pool_maxsize=pool_maxsize), server.url)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda w: _worker(api, w, rounds), range(threads)))
+        elapsed = time.perf_counter() - start
+
+        calls = server.httpd.state.calls
+        requests_count = sum(v for k, v in calls.items() if k != 'connections')
+        return {
+            'errors': [e for r in results for e in r],
+            'requests': requests_count,
+            'connections': calls['connections'],
+            'ops_per_sec': requests_count / elapsed,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.005, help='模拟服务器每个请求的延迟(秒)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('urllib3').setLevel(logging.ERROR)  # 连接池满时每次丢弃连接都会打印一条警告
+    for pool_maxsize in (10, args.threads):
+        result = run(args.threads, args.rounds, pool_maxsize, args.latency)
+        print(f"pool_maxsize={pool_maxsize:<4} 请求数: {result['requests']:<6} 新建连接: {result['connections']:<6} "
+              f"吞吐: {result['ops_per_sec']:.0f} 请求/秒  错误: {len(result['errors'])}")
+        for error in result['errors'][:5]:
+            print('   ', error)
+
+
+if __name__ == '__main__':
+    main()
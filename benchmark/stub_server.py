@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 本地模拟的蓝奏云接口，仅用于性能测试
+
+模拟的接口:
+    doupload.php    task 2/3/4/5/6/11/12/16/18/22/23/47
+    html5up.php     上传文件
+    account.php     退出登录
+    分享页面         http://stub.lanzoui.com/i{文件id}，文件 id 为奇数时需要提取码；acw_challenge 时要求 acw_sc__v2
+    下载页面(iframe) /fn?...
+    ajaxm.php       提交 sign(与提取码)，返回假直链
+    /file/...       假直链，302 跳转到真直链；按 captcha_rate 的比例返回验证页面
+    /file/ajax.php  验证后返回真直链
+    /cdn/...        真直链，支持 Range
+    /stored/{文件id} keep_uploads 时返回上传的文件内容
+
+分享链接的域名必须通过 is_file_url 的校验，因此客户端以 HTTP 代理的方式连接模拟服务器(见 point_to)，
+所有请求(包括 pc.woozooo.com、分享域名、CDN)都由这一个服务器处理。
+--------------------------------------------
+"""
+
+import os
+import re
+import json
+import time
+import random
+import itertools
+import threading
+from typing import Dict, Optional
+from collections import Counter, deque
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+SHARE_HOST = 'http://stub.lanzoui.com'  # 分享链接使用的域名，经代理发往模拟服务器
+
+
+def _load_page(name: str) -> str:
+    with open(os.path.join(CORPUS_DIR, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+class StubState(object):
+    """模拟服务端的数据与故障注入配置"""
+
+    def __init__(self, files_per_page: int = 18, pages: int = 3, latency: float = 0.0, latency_jitter: float = 0.0,
+                 folders_per_dir: int = 3, folder_depth: int = 2, error_rate: float = 0.0,
+                 error_kinds: tuple = ('status', 'reset', 'html'), captcha_rate: float = 0.0,
+                 cdn_size: int = 1048576, antibot_rate: float = 0.0, antibot_penalty: float = 2.0,
+                 acw_challenge: bool = False, keep_uploads: bool = False, seed: int = 0):
+        """
+        @param latency: 每个请求的固定延迟(秒)，用来模拟网络往返
+        @param latency_jitter: 在固定延迟之外再随机增加 [0, latency_jitter] 秒
+        @param error_rate: 注入故障的请求比例
+        @param error_kinds: 故障类型: status 返回 503; reset 不返回任何内容直接断开连接; html 返回防火墙拦截页面
+        @param captcha_rate: 访问假直链时返回验证页面的比例，客户端遇到验证页面要等待 2 秒
+        @param cdn_size: 真直链对应的文件大小(字节)
+        @param antibot_rate: 分享页面、假直链每秒超过这么多次请求时触发反爬，分别返回 acw_sc__v2 验证页面与验证码页面，0 表示不触发
+        @param antibot_penalty: 触发反爬后持续多少秒内的请求都返回验证页面
+        @param acw_challenge: 分享页面要求带上正确的 acw_sc__v2 cookie，否则返回验证页面
+        @param keep_uploads: 保存上传的文件内容，可以通过 /stored/{文件id} 下载
+        """
+        self.files_per_page = files_per_page
+        self.pages = pages
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.folders_per_dir = folders_per_dir
+        self.folder_depth = folder_depth  # 目录树的层数，子文件夹 id 为父文件夹 id * 10 + 序号
+        self.error_rate = error_rate
+        self.error_kinds = tuple(error_kinds)
+        self.captcha_rate = captcha_rate
+        self.cdn_size = cdn_size
+        self.antibot_rate = antibot_rate
+        self.antibot_penalty = antibot_penalty
+        self._recent: Dict[str, deque] = {}  # 分享页面、假直链最近 1 秒内的请求时间
+        self._penalty_until: Dict[str, float] = {}
+        self.calls = Counter()  # 各接口的调用次数，doupload.php 按 task 分别计数，另按账号(uid_xxx)计数
+        self.expired_sessions = set()  # 这些 PHPSESSID 的登录已失效，需要登录的接口返回 zt=9
+        self.broken_folders = set()  # 列举这些文件夹(task 5、task 47)时总是返回 503
+        self.broken_pages = set()  # (文件夹 id, 页码)，只有文件列表的这一页返回 503
+        self.keep_uploads = keep_uploads
+        self.uploads: Dict[int, bytes] = {}
+        self._ids = itertools.count(900000000)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cdn_data = None
+
+        self.pages_html = {
+            'public': _load_page('public.html'),
+            'password': _load_page('password.html'),
+            'frame': _load_page('public_frame.html'),
+            'captcha': _load_page('captcha.html'),
+            'acw': _load_page('acw.html'),
+        }
+        self.acw_token = ''
+        if acw_challenge:
+            from zibuyu_lanzou.utils import calc_acw_sc__v2
+            self.acw_token = calc_acw_sc__v2(self.pages_html['acw'])
+
+    def count(self, key: str):
+        with self._lock:
+            self.calls[key] += 1
+
+    def new_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def pick_error(self) -> str:
+        with self._lock:
+            return self._random.choice(self.error_kinds)
+
+    def antibot(self, kind: str) -> bool:
+        """按请求速率模拟反爬，返回 True 表示这个请求应该返回验证页面"""
+        if self.antibot_rate <= 0:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            recent = self._recent.setdefault(kind, deque())
+            recent.append(now)
+            while recent and now - recent[0] > 1:
+                recent.popleft()
+            if len(recent) > self.antibot_rate:
+                self._penalty_until[kind] = now + self.antibot_penalty
+            return now < self._penalty_until.get(kind, 0.0)
+
+    def delay(self):
+        if self.latency or self.latency_jitter:
+            with self._lock:
+                extra = self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    @property
+    def cdn_data(self) -> bytes:
+        if self._cdn_data is None:
+            self._cdn_data = bytes(random.Random(1).getrandbits(8) for _ in range(min(self.cdn_size, 4096))) * \
+                             (self.cdn_size // 4096 + 1)
+            self._cdn_data = self._cdn_data[:self.cdn_size]
+        return self._cdn_data
+
+    def file_page(self, folder_id: int, page: int) -> dict:
+        if page > self.pages:
+            return {'zt': 1, 'info': 0, 'text': []}
+
+        text = []
+        for i in range(self.files_per_page):
+            fid = (max(folder_id, 0) * 1000 + page) * 1000 + i  # 不同文件夹下的文件 id 不重复
+            text.append({
+                'id': fid, 'name_all': f'file_{fid}.zip', 'time': '2024-11-07',
+                'size': '1.2 M', 'downs': '0', 'onof': str(fid % 2), 'is_des': '0',
+            })
+        return {'zt': 1, 'info': 1, 'text': text}
+
+    def sub_folders(self, folder_id: int) -> list:
+        parent = max(folder_id, 0)
+        if parent and len(str(parent)) >= self.folder_depth:
+            return []
+        return [{'fol_id': parent * 10 + i + 1, 'name': f'folder_{parent * 10 + i + 1}', 'onof': '0',
+                 'folder_des': '[]'} for i in range(self.folders_per_dir)]
+
+
+def share_url(file_id) -> str:
+    """
+    模拟服务器上文件的分享链接；文件 id 为奇数时需要提取码(任意非空提取码都能通过)
+    is_file_url 要求 i 后面至少有 5 个字符，因此 id 补齐为 6 位
+    """
+    return f'{SHARE_HOST}/i{str(file_id).zfill(6)}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持长连接，与真实服务器行为一致
+    disable_nagle_algorithm = True  # 响应头与响应体分两次写出，避免触发延迟确认
+
+    def log_message(self, fmt, *args):
+        pass
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def setup(self):
+        super().setup()
+        self.server.state.count('connections')  # 每个 TCP 连接调用一次，用来观察连接复用情况
+
+    def _send(self, body, status: int = 200, headers: dict = None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+        body = body.encode('utf-8') if isinstance(body, str) else body
+
+        self.send_response(status)
+        if not headers or 'Content-Type' not in headers:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _inject_error(self) -> bool:
+        """按 error_rate 注入故障，返回 True 表示已经处理了这个请求"""
+        if not self.state.chance(self.state.error_rate):
+            return False
+
+        kind = self.state.pick_error()
+        self.state.count(f'error_{kind}')
+        if kind == 'reset':
+            self.close_connection = True
+            return True
+        if kind == 'html':
+            self._send('<html><body>访问过于频繁，请稍后再试</body></html>')
+            return True
+        self._send('Service Unavailable', status=503)
+        return True
+
+    def _route(self):
+        """代理请求的 path 是完整的 url，直连请求的 path 只有路径部分"""
+        parsed = urlparse(self.path)
+        return parsed.netloc, parsed.path, parsed.query
+
+    def do_GET(self):
+        self.state.delay()
+        host, path, query = self._route()
+        if not path.startswith('/cdn/') and self._inject_error():
+            return
+
+        if path == '/account.php':
+            self.state.count('logout')
+            return self._send('<p>退出系统成功</p>')
+        if re.fullmatch(r'/i\d+', path):
+            self.state.count('share_page')
+            if self.state.antibot('share_page'):
+                self.state.count('antibot_acw')
+                return self._send(self.state.pages_html['acw'])
+            if self.state.acw_token:
+                cookie = SimpleCookie(self.headers.get('Cookie', '')).get('acw_sc__v2')
+                if cookie is None or cookie.value != self.state.acw_token:
+                    self.state.count('acw_challenge')
+                    return self._send(self.state.pages_html['acw'])
+            kind = 'password' if int(path[2:]) % 2 else 'public'
+            return self._send(self.state.pages_html[kind])
+        if path == '/fn':
+            self.state.count('frame_page')
+            return self._send(self.state.pages_html['frame'])
+        if path.startswith('/file/'):
+            self.state.count('fake_link')
+            if self.state.antibot('fake_link'):
+                self.state.count('antibot_captcha')
+                return self._send(self.state.pages_html['captcha'])
+            if self.state.chance(self.state.captcha_rate):
+                return self._send(self.state.pages_html['captcha'])
+            return self._send('', status=302, headers={'Location': f'{self.base_url}/cdn/{path[6:]}'})
+        if path.startswith('/cdn/'):
+            self.state.count('cdn')
+            return self.cdn()
+        if re.fullmatch(r'/stored/\d+', path) and int(path[8:]) in self.state.uploads:
+            return self._send_range(self.state.uploads[int(path[8:])])
+        return self._send('not found', status=404)
+
+    def do_POST(self):
+        self.state.delay()
+        body = self._read_body()  # 先读完请求体，断开连接时客户端才能收到完整的错误
+        if len(body) < int(self.headers.get('Content-Length') or 0):  # 客户端发送到一半就断开了
+            self.state.count('truncated')
+            self.close_connection = True
+            return
+        if self._inject_error():
+            return
+
+        host, path, query = self._route()
+        if path in ('/html5up.php', '/doupload.php'):
+            cookies = SimpleCookie(self.headers.get('Cookie', ''))
+            uid = cookies['ylogin'].value if 'ylogin' in cookies else ''
+            self.state.count(f'uid_{uid}')
+            if 'PHPSESSID' in cookies and cookies['PHPSESSID'].value in self.state.expired_sessions:
+                return self._send({'zt': 9, 'info': '登录信息已失效，请重新登录'})
+        if path == '/html5up.php':
+            return self._send(self.upload(body))
+
+        form = {k: v[0] for k, v in parse_qs(body.decode('utf-8', errors='replace')).items()}
+        if path == '/doupload.php':
+            result = self.doupload(form)
+            if result is None:
+                return self._send('Service Unavailable', status=503)
+            return self._send(result)
+        if path == '/ajaxm.php':
+            self.state.count('ajaxm')
+            if 'p' in form and not form['p']:
+                return self._send({'zt': 0, 'inf': '密码不正确'})
+            return self._send({'zt': 1, 'dom': self.base_url, 'url': f'?{self.state.new_id()}', 'inf': 'file.zip'})
+        if path == '/file/ajax.php':
+            self.state.count('captcha')
+            return self._send({'zt': 1, 'url': f'{self.base_url}/cdn/{form.get("file", "")}'})
+        return self._send('not found', status=404)
+
+    def cdn(self):
+        return self._send_range(self.state.cdn_data)
+
+    def _send_range(self, data: bytes):
+        """按请求头中的 Range 返回部分数据"""
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        headers = {'Content-Type': 'application/octet-stream', 'Accept-Ranges': 'bytes'}
+        if not match:
+            return self._send(data, headers=headers)
+
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+        headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+        return self._send(data[start:end + 1], status=206, headers=headers)
+
+    def upload(self, body: bytes) -> dict:
+        self.state.count('upload')
+        name = re.search(rb'name="name"\r\n\r\n(.*?)\r\n', body)
+        name = name.group(1).decode('utf-8') if name else 'unknown'
+        file_id = self.state.new_id()
+        if self.state.keep_uploads:  # upload_file 是最后一个字段，数据到结束分隔符之前为止
+            start = body.index(b'\r\n\r\n', body.index(b'name="upload_file"')) + 4
+            self.state.uploads[file_id] = body[start:body.rindex(b'\r\n--')]
+        return {'zt': 1, 'info': '上传成功', 'text': [{
+            'id': file_id, 'name': name, 'time': '0 秒前', 'size': f'{len(body) / 1024:.1f} K',
+            'icon': name.split('.')[-1], 'downs': '0',
+        }]}
+
+    def doupload(self, form: dict) -> Optional[dict]:
+        """返回 None 表示模拟服务端故障(503)"""
+        task = int(form.get('task', 0))
+        self.state.count(f'task{task}')
+
+        if task in (5, 47) and int(form.get('folder_id', -1)) in self.state.broken_folders:
+            return None
+        if task == 5 and (int(form.get('folder_id', -1)), int(form.get('pg', 1))) in self.state.broken_pages:
+            return None
+        if task == 5:  # 文件列表
+            return self.state.file_page(int(form.get('folder_id', -1)), int(form.get('pg', 1)))
+        if task == 47:  # 子文件夹列表
+            return {'zt': 1, 'info': 'success', 'text': self.state.sub_folders(int(form.get('folder_id', -1)))}
+        if task == 22:  # 文件分享信息
+            fid = form.get('file_id', '')
+            f_id = 'i' + fid.zfill(6) if fid else 'i'  # f_id 为 'i' 表示 id 无效
+            return {'zt': 1, 'info': {'f_id': f_id, 'is_newd': SHARE_HOST,
+                                      'pwd': 'abcd', 'onof': str(int(fid) % 2 if fid.isdigit() else 1)}}
+        if task == 18:  # 文件夹分享信息
+            return {'zt': 1, 'info': {'name': 'folder', 'new_url': f'{SHARE_HOST}/b000', 'pwd': '',
+                                      'onof': '0', 'des': ''}}
+        if task == 12:  # 文件名与描述
+            return {'zt': 1, 'text': 'file', 'info': ''}
+        if task == 2:  # 创建文件夹
+            return {'zt': 1, 'info': '创建成功', 'text': self.state.new_id()}
+        if task in (6, 3):  # 删除文件 / 文件夹
+            return {'zt': 1, 'info': '已删除', 'text': None}
+        if task in (11, 4):  # 设置文件描述 / 文件夹信息
+            return {'zt': 1, 'info': '修改成功', 'text': None}
+        if task in (16, 23):  # 设置文件夹 / 文件提取码
+            return {'zt': 1, 'info': '设置成功', 'text': None}
+        return {'zt': 0, 'info': f'未知的 task: {task}', 'text': None}
+
+
+class StubServer(object):
+    """
+    在后台线程中启动模拟服务器
+
+    with StubServer(latency=0.02) as server:
+        api = point_to(LanZouApi(cookies=cookie), server.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **state_kwargs):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = StubState(**state_kwargs)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def state(self) -> StubState:
+        return self.httpd.state
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def point_to(api, base_url: str):
+    """把客户端的接口地址替换为模拟服务器地址；分享域名与 CDN 经 HTTP 代理发往模拟服务器"""
+    api._host_url = base_url
+    api._doupload_url = base_url + '/doupload.php'
+    api._account_url = base_url + '/account.php'
+    api._mydisk_url = base_url + '/mydisk.php'
+    api._upload_url = base_url + '/html5up.php'
+    api._captcha_url = base_url + '/file/ajax.php'
+
+    session = getattr(api, '_session', None)
+    if session is not None and hasattr(session, 'proxies'):
+        session.proxies = {'http': base_url}
+        session.trust_env = False  # 忽略环境变量中的代理设置
+    elif hasattr(api, '_proxy'):  # AsyncLanZouApi 的连接池在第一次请求时才创建，代理按请求设置
+        api._proxy = base_url
+    return api
@@ -44,5 +44,8 @@ setup(
         'requests',
         'requests-toolbelt',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+    },
     python_requires='>=3.9'
 )
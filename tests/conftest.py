@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 测试共用的模拟服务器与客户端
+--------------------------------------------
+"""
+
+import os
+import sys
+import logging
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmark'))
+
+from stub_server import StubServer, point_to  # noqa: E402
+from zibuyu_lanzou import LanZouApi, LanZouCookie, RetryPolicy  # noqa: E402
+from zibuyu_lanzou.acw import MemoryAcwTokenStore  # noqa: E402
+from zibuyu_lanzou.health import DomainHealth  # noqa: E402
+
+COOKIE = LanZouCookie(ylogin='10001', phpdisk_info='test', PHPSESSID='test')
+
+LOGGER = logging.getLogger('lanzou_test')
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def fast_policy(**kwargs) -> RetryPolicy:
+    """退避时间很短的重试策略，故障注入的测试不必等待"""
+    kwargs.setdefault('backoff', 0.01)
+    kwargs.setdefault('max_backoff', 0.02)
+    kwargs.setdefault('deadline', 10)
+    return RetryPolicy(**kwargs)
+
+
+@pytest.fixture
+def stub():
+    """按需传入 StubState 的参数启动模拟服务器: server = stub(latency=0.01)"""
+
+    servers = []
+
+    def _start(**state_kwargs) -> StubServer:
+        server = StubServer(**state_kwargs).__enter__()
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+
+@pytest.fixture
+def make_api():
+    """创建指向模拟服务器的 LanZouApi，每个客户端使用独立的域名健康度与 acw_sc__v2 存储"""
+
+    apis = []
+
+    def _make(server: StubServer, **kwargs) -> LanZouApi:
+        kwargs.setdefault('cookies', COOKIE)
+        kwargs.setdefault('logger', LOGGER)
+        kwargs.setdefault('retry_policy', fast_policy())
+        kwargs.setdefault('domain_health', DomainHealth())
+        kwargs.setdefault('acw_store', MemoryAcwTokenStore())
+        api = point_to(LanZouApi(**kwargs), server.url)
+        apis.append(api)
+        return api
+
+    yield _make
+    for api in apis:
+        api.close()
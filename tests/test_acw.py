@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: acw_sc__v2 的计算与共享存储
+--------------------------------------------
+"""
+
+import random
+
+import pytest
+
+from stub_server import share_url
+from zibuyu_lanzou import AdaptiveRateLimiter, MemoryAcwTokenStore, Metrics, SQLiteAcwTokenStore
+from zibuyu_lanzou.utils import unsbox, hex_xor
+
+_ORDER = [15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26, 2,
+          30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36]
+
+
+def _unsbox_reference(str_arg):
+    """改写前的实现"""
+    v2 = ['' for _ in _ORDER]
+    for idx in range(len(str_arg)):
+        for idx2 in range(len(_ORDER)):
+            if _ORDER[idx2] == idx + 1:
+                v2[idx2] = str_arg[idx]
+    return ''.join(v2)
+
+
+def _hex_xor_reference(str_arg, args):
+    """改写前的实现"""
+    res = ''
+    for idx in range(0, min(len(str_arg), len(args)), 2):
+        v3 = format(int(str_arg[idx:idx + 2], 16) ^ int(args[idx:idx + 2], 16), 'x')
+        res += '0' + v3 if len(v3) == 1 else v3
+    return res
+
+
+def test_unsbox_and_hex_xor_match_reference():
+    rand = random.Random(0)
+    for length in list(range(0, 45)) + [80]:
+        text = ''.join(rand.choice('0123456789ABCDEF') for _ in range(length))
+        assert unsbox(text) == _unsbox_reference(text)
+        other = ''.join(rand.choice('0123456789abcdef') for _ in range(rand.randint(length, length + 3)))
+        assert hex_xor(text, other) == _hex_xor_reference(text, other)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryAcwTokenStore()
+    return SQLiteAcwTokenStore(str(tmp_path / 'acw.db'))
+
+
+def test_store_by_site_and_invalidate(store):
+    store.set('https://a.lanzoui.com/i1', 'old')
+    assert store.get('https://a.lanzoui.com/i2') == 'old'  # 同一站点共用
+    assert store.get('https://b.lanzoui.com/i1') == 'old'  # 二级域名不同，主域名相同
+    assert store.get('https://a.lanzouo.com/i1') is None
+
+    store.set('https://a.lanzoui.com/i1', 'new')
+    store.invalidate('https://a.lanzoui.com/i1', 'old')  # 其他客户端已经写入新值，保留新值
+    assert store.get('https://a.lanzoui.com/i1') == 'new'
+    store.invalidate('https://a.lanzoui.com/i1', 'new')
+    assert store.get('https://a.lanzoui.com/i1') is None
+    assert store.stats() == {'hits': 3, 'misses': 2, 'updates': 2}
+
+
+def test_sqlite_store_shared_between_instances(tmp_path):
+    SQLiteAcwTokenStore(str(tmp_path / 'acw.db')).set('https://a.lanzoui.com/i1', 'token')
+    assert SQLiteAcwTokenStore(str(tmp_path / 'acw.db')).get('https://a.lanzoui.com/i9') == 'token'
+
+
+def test_clients_share_token(stub, make_api):
+    server = stub(acw_challenge=True)
+    store = MemoryAcwTokenStore()
+
+    for i in range(4):  # 只有第一个客户端被验证页面拦截
+        assert make_api(server, acw_store=store).get_direct_url_by_url(share_url(2 * i + 2))
+    assert server.state.calls['acw_challenge'] == 1
+    assert store.get(share_url(2)) == server.state.acw_token
+
+
+def test_stale_token_is_replaced(stub, make_api):
+    server = stub(acw_challenge=True)
+    store = MemoryAcwTokenStore()
+    store.set(share_url(2), 'stale')
+
+    assert make_api(server, acw_store=store).get_direct_url_by_url(share_url(2))
+    assert server.state.calls['acw_challenge'] == 1
+    assert store.get(share_url(2)) == server.state.acw_token
+
+
+def test_challenge_page_slows_limiter(stub, make_api):
+    server = stub(acw_challenge=True)
+    calls = []
+
+    class _Limiter(AdaptiveRateLimiter):
+        def success(self, url):
+            calls.append('success')
+            super().success(url)
+
+        def penalize(self, url, signal):
+            calls.append(signal)
+            super().penalize(url, signal)
+
+    limiter, metrics = _Limiter(rate=50, burst=50), Metrics()
+    api = make_api(server, rate_limiter=limiter, metrics=metrics)
+    assert api.get_direct_url_by_url(share_url(2))
+
+    assert calls[0] == 'acw'  # 验证页面只发出限速信号，不计为成功
+    assert calls.count('acw') == 1 and metrics.count('throttle_signals', signal='acw') == 1
+    assert limiter.rate(share_url(2)) < 50
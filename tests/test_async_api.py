@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: AsyncLanZouApi
+--------------------------------------------
+"""
+
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from conftest import COOKIE, LOGGER, fast_policy
+from stub_server import point_to, share_url
+from zibuyu_lanzou import AsyncLanZouApi, Metrics, AdaptiveRateLimiter, LanZouListError
+from zibuyu_lanzou.acw import MemoryAcwTokenStore
+from zibuyu_lanzou.async_api import _AsyncResponse
+from zibuyu_lanzou.health import DomainHealth
+
+
+def run_async(server, func, **kwargs):
+    """创建指向模拟服务器的 AsyncLanZouApi，在新的事件循环中执行 func(api)"""
+
+    async def _main():
+        kwargs.setdefault('cookies', COOKIE)
+        kwargs.setdefault('logger', LOGGER)
+        kwargs.setdefault('retry_policy', fast_policy())
+        kwargs.setdefault('domain_health', DomainHealth())
+        kwargs.setdefault('acw_store', MemoryAcwTokenStore())
+        async with AsyncLanZouApi(**kwargs) as api:
+            point_to(api, server.url)
+            return await func(api)
+
+    return asyncio.run(_main())
+
+
+def test_response_truthiness():
+    assert _AsyncResponse(200, b'', {})
+    assert _AsyncResponse(302, b'', {})
+    assert not _AsyncResponse(404, b'', {})
+    assert not _AsyncResponse(503, b'', {})
+
+
+def test_get_file_list(stub):
+    server = stub(files_per_page=5, pages=3)
+    files = run_async(server, lambda api: api.get_file_list(1))
+    assert len(files) == 15
+    assert len({f.id for f in files}) == 15
+
+
+def test_get_file_list_failure_is_bounded(stub):
+    server = stub()
+    server.state.broken_folders.add(7)
+
+    start = time.monotonic()
+    with pytest.raises(LanZouListError) as info:
+        run_async(server, lambda api: api.get_file_list(7), retry_policy=fast_policy(max_attempts=3))
+    assert info.value.folder_id == 7 and info.value.page == 1
+    assert server.state.calls['task5'] == 3
+    assert time.monotonic() - start < 5
+
+
+def test_get_returns_none_when_all_domains_fail(stub):
+    server = stub()
+    server.__exit__(None, None, None)  # 服务器关闭后连接被拒绝
+
+    async def _get(api):
+        return await api._get(server.url + '/account.php', need_check_cookie=False)
+
+    assert run_async(server, _get) is None
+
+
+def test_share_info_and_dir_list(stub):
+    server = stub()
+
+    async def _main(api):
+        return await asyncio.gather(api.get_share_info(3), api.get_dir_list(-1))
+
+    info, folders = run_async(server, _main)
+    assert info.success and info.pwd == 'abcd' and info.url.endswith('/i000003')
+    assert [f.name for f in folders] == ['folder_1', 'folder_2', 'folder_3']
+
+
+def test_resolve_with_acw_and_captcha(stub):
+    server = stub(acw_challenge=True, captcha_rate=1.0)
+
+    async def _main(api):
+        api._captcha_delay = 0.05
+        return await asyncio.gather(*(api.get_file_info_by_url(share_url(20 + i), 'ab') for i in range(4)))
+
+    details = run_async(server, _main, acw_store=MemoryAcwTokenStore())
+    assert all(d.direct_url for d in details)
+    assert server.state.calls['captcha'] == 4
+    assert server.state.calls['acw_challenge'] >= 1
+
+
+def test_metrics_and_rate_limiter(stub):
+    server = stub()
+    metrics = Metrics()
+    limiter = AdaptiveRateLimiter(rate=1000)
+
+    async def _main(api):
+        return await api.get_file_info_by_url(share_url(30))
+
+    detail = run_async(server, _main, metrics=metrics, rate_limiter=limiter)
+    assert detail.direct_url
+    operations = {row['operation'] for row in metrics.snapshot()}
+    assert {'share_page', 'iframe', 'ajaxm', 'redirect'} <= operations
+    assert limiter.stats()[0]['successes'] >= 3
+
+
+def test_retry_respects_deadline(stub):
+    server = stub(error_rate=1.0, error_kinds=('status',))
+    policy = fast_policy(max_attempts=100, backoff=0.05, max_backoff=0.05, deadline=0.3)
+
+    start = time.monotonic()
+    info = run_async(server, lambda api: api.get_share_info(1), retry_policy=policy)
+    assert not info.success
+    assert time.monotonic() - start < 2
+
+
+def test_upload_file(stub, tmp_path):
+    server = stub()
+    path = tmp_path / 'data.zip'
+    path.write_bytes(b'z' * 300000)
+    progress = []
+
+    async def _main(api):
+        return await api.upload_file(str(path), callback=lambda name, total, now: progress.append(now))
+
+    files = run_async(server, _main, upload_block_size=65536)
+    assert [f.name for f in files] == ['data.zip']
+    assert progress and progress[-1] > 300000
+
+
+def test_upload_overwrite_uses_name_map(stub, tmp_path):
+    server = stub(files_per_page=3, pages=1)
+    path = tmp_path / 'data.zip'
+    path.write_bytes(b'z' * 1000)
+
+    async def _main(api):
+        first = await api.upload_file(str(path))
+        listed = server.state.calls['task5']
+        second = await api.upload_file(str(path))  # 同名文件来自映射，删除上一次上传的文件
+        skipped = await api.upload_file(str(path), overwrite='skip')
+        await api.upload_file(str(path), overwrite='keep')
+        return first, second, skipped, listed
+
+    first, second, skipped, listed = run_async(server, _main)
+    assert listed == server.state.calls['task5'] > 0  # 同一个文件夹只列举一次
+    assert server.state.calls['task6'] == 1
+    assert [f.id for f in skipped] == [f.id for f in second] != [f.id for f in first]
+    assert server.state.calls['upload'] == 3
+
+
+def test_expired_deadline_stops_domain_fallback(stub):
+    import aiohttp
+
+    urls = []
+
+    async def _send(method, url, timeout, **kwargs):
+        urls.append(url)
+        await asyncio.sleep(0.3)  # 第一个域名就耗尽了操作的时限
+        raise aiohttp.ClientConnectionError('timeout')
+
+    async def _main(api):
+        api._send = _send
+        return await api._get('https://pc.lanzouo.com/fn?abc', need_check_cookie=False)
+
+    assert run_async(stub(), _main, retry_policy=fast_policy(max_attempts=5, deadline=0.2)) is None
+    assert len(urls) == 1
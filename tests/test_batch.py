@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 批量修改提取码、描述与删除
+--------------------------------------------
+"""
+
+import asyncio
+
+import pytest
+
+from conftest import COOKIE, LOGGER, fast_policy
+from stub_server import point_to
+from zibuyu_lanzou.acw import MemoryAcwTokenStore
+from zibuyu_lanzou.health import DomainHealth
+
+
+def test_batch_results_keep_order(stub, make_api):
+    server = stub()
+    api = make_api(server)
+
+    results = api.set_passwd_many([5, 3, 9], 'abcd')
+    assert [r.id for r in results] == [5, 3, 9] and all(r.success for r in results)
+    assert server.state.calls['task23'] == 3
+
+    results = api.set_passwd_many([5, 3], 'a')  # 文件提取码至少 2 位，不发请求
+    assert not any(r.success for r in results) and results[0].request_msg
+    assert server.state.calls['task23'] == 3
+
+    assert all(r.success for r in api.delete_many([1, 2], is_file=False))
+    assert server.state.calls['task3'] == 2
+
+
+def test_folder_desc_uses_listed_name(stub, make_api):
+    server = stub(folders_per_dir=3)
+    api = make_api(server)
+
+    folders = api.get_dir_list(-1)
+    results = api.set_desc_many(folders, 'desc', is_file=False)
+    assert [r.id for r in results] == [f.id for f in folders] and all(r.success for r in results)
+    assert server.state.calls['task4'] == 3
+    assert server.state.calls['task18'] == 0  # 名称来自 LanZouFolder，不必再请求分享信息
+
+    assert api.set_desc(7, 'desc', is_file=False)  # 只有 id 时才请求分享信息
+    assert server.state.calls['task18'] == 1
+
+
+def test_async_batch(stub):
+    pytest.importorskip('aiohttp')
+    from zibuyu_lanzou import AsyncLanZouApi
+
+    server = stub(folders_per_dir=3)
+
+    async def _main():
+        async with AsyncLanZouApi(cookies=COOKIE, logger=LOGGER, retry_policy=fast_policy(),
+                                  domain_health=DomainHealth(), acw_store=MemoryAcwTokenStore()) as api:
+            point_to(api, server.url)
+            folders = await api.get_dir_list(-1)
+            return (
+                await api.set_passwd_many([5, 3, 9], 'abcd', workers=2),
+                await api.set_passwd_many([5], 'a'),
+                await api.set_desc_many(folders, 'desc', is_file=False),
+                await api.delete_many(folders, is_file=False),
+                [f.id for f in folders],
+            )
+
+    passwd, invalid, desc, deleted, folder_ids = asyncio.run(_main())
+    assert [r.id for r in passwd] == [5, 3, 9] and all(r.success for r in passwd)
+    assert not invalid[0].success
+    assert [r.id for r in desc] == folder_ids and all(r.success for r in desc)
+    assert [r.id for r in deleted] == folder_ids and all(r.success for r in deleted)
+    assert server.state.calls['task18'] == 0
+    assert server.state.calls['task4'] == server.state.calls['task3'] == 3
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 直链缓存
+--------------------------------------------
+"""
+
+import pytest
+
+from stub_server import share_url
+from zibuyu_lanzou import LanZouFileDetail, MemoryDirectUrlCache, SQLiteDirectUrlCache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryDirectUrlCache()
+    return SQLiteDirectUrlCache(str(tmp_path / 'cache.db'))
+
+
+def test_url_only_entry_is_miss_when_info_needed(cache):
+    url = 'https://example.com/iabc'
+    cache.set(url, '', LanZouFileDetail(request_info='请求成功', share_url=url, direct_url='https://d/1'))
+
+    assert cache.get(url).direct_url == 'https://d/1'
+    assert cache.get(url, need_info=True) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_api_replaces_url_only_entry(stub, make_api):
+    server = stub()
+    cache = MemoryDirectUrlCache()
+    api = make_api(server, url_cache=cache)
+    url = share_url(2)
+    cache.set(url, '', LanZouFileDetail(request_info='请求成功', share_url=url, direct_url='https://d/old'))
+
+    detail = api.get_file_info_by_url(url)
+    assert detail.name and detail.direct_url != 'https://d/old'
+    assert cache.stats()['misses'] == 1
+
+    assert api.get_file_info_by_url(url) is detail
+    assert cache.stats()['hits'] == 1
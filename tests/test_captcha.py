@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 验证码延后提交与批量解析分享链接
+--------------------------------------------
+"""
+
+import time
+
+from stub_server import share_url
+from zibuyu_lanzou import LanZouCaptchaWait, LanZouFileDetail, resolve_many, resolver, utils
+
+
+def test_begin_defers_and_finish_waits(stub, make_api):
+    server = stub(captcha_rate=1.0)
+    api = make_api(server)
+    api._captcha_delay = 0.3
+
+    start = time.monotonic()
+    pending = api.begin_file_info(share_url(2))
+    assert isinstance(pending, LanZouCaptchaWait)
+    assert time.monotonic() - start < 0.25  # 遇到验证码时不等待
+    assert server.state.calls['captcha'] == 0
+
+    detail = api.finish_file_info(pending)
+    assert time.monotonic() >= pending.ready_at
+    assert isinstance(detail, LanZouFileDetail) and detail.direct_url
+    assert server.state.calls['captcha'] == 1
+
+
+def test_begin_without_captcha_returns_detail(stub, make_api):
+    server = stub()
+    detail = make_api(server).begin_file_info(share_url(3), 'abcd')
+    assert isinstance(detail, LanZouFileDetail) and detail.direct_url
+
+
+def test_resolve_many_does_not_block_workers(stub, make_api):
+    server = stub(captcha_rate=1.0)
+    api = make_api(server)
+    api._captcha_delay = 0.4
+
+    links = [share_url(2 * i + 2) for i in range(8)]
+    start = time.monotonic()
+    details = list(resolve_many(links, workers=2, api=api))
+    elapsed = time.monotonic() - start
+
+    assert sorted(d.share_url for d in details) == sorted(links)
+    assert all(d.direct_url for d in details)
+    assert server.state.calls['captcha'] == 8
+    assert elapsed < 1.2  # 在工作线程里等待需要 8 * 0.4 / 2 = 1.6 秒
+
+
+def test_resolve_many_closes_own_api(stub, make_api, monkeypatch):
+    server = stub()
+    created = []
+
+    def _factory(**kwargs):
+        api = make_api(server, host_limit=kwargs['host_limit'])
+        api.close = lambda: created.append('closed')
+        created.append(api)
+        return api
+
+    monkeypatch.setattr(resolver, 'LanZouApi', _factory)
+    results = resolve_many([share_url(2), share_url(4)], workers=2)
+    assert next(results).direct_url
+    results.close()  # 提前结束迭代也要关闭
+    assert created[-1] == 'closed'
+
+    api = make_api(server)
+    closed = []
+    api.close = lambda: closed.append(True)
+    assert len(list(resolve_many([share_url(2)], api=api))) == 1
+    assert not closed  # 传入的 api 由调用方关闭
+
+
+def test_direct_download_url_layout_change(monkeypatch):
+    class _Page(object):
+        text = '<html>页面结构变了</html>'
+
+    monkeypatch.setattr(utils.requests, 'get', lambda *args, **kwargs: _Page())
+    assert utils.get_direct_download_url(share_url(2), '') is None
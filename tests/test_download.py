@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 多连接分段下载
+--------------------------------------------
+"""
+
+import time
+import threading
+
+import requests
+
+from conftest import LOGGER
+from stub_server import share_url
+from zibuyu_lanzou.download import RangeDownloader
+
+
+def test_refresh_once_without_holding_lock(tmp_path):
+    calls = []
+
+    def _resolve(expired: bool) -> str:
+        assert downloader._lock.acquire(timeout=1)  # 获取直链期间其他线程仍可以记录进度
+        downloader._lock.release()
+        calls.append(expired)
+        time.sleep(0.05)
+        return f'https://cdn/{len(calls)}'
+
+    downloader = RangeDownloader(requests.Session(), _resolve, str(tmp_path / 'out.bin'), logger=LOGGER)
+    first = downloader._current_url()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(downloader._refresh_url(first))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [False, True]
+    assert results == ['https://cdn/2'] * 8
+    assert downloader._refresh_count == 1
+
+
+def test_download_from_stub(stub, make_api, tmp_path):
+    server = stub(cdn_size=300000)
+    api = make_api(server)
+
+    save_path = str(tmp_path / 'data.bin')
+    assert api.download(share_url(2), save_path, connections=3, segment_size=65536)
+    with open(save_path, 'rb') as file:
+        assert file.read() == server.state.cdn_data
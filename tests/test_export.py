@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 导出分享链接
+--------------------------------------------
+"""
+
+import io
+import json
+import time
+import threading
+
+import pytest
+
+
+def _track(api, name, peak, lock, active):
+    """包装客户端的方法，记录同时在途的调用数"""
+
+    func = getattr(api, name)
+
+    def _wrapper(*args, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        try:
+            time.sleep(0.01)
+            return func(*args, **kwargs)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    setattr(api, name, _wrapper)
+
+
+@pytest.mark.parametrize('recursive', [True, False])
+def test_iter_shares_total_concurrency(stub, make_api, recursive):
+    server = stub(files_per_page=6, pages=2, folders_per_dir=3, folder_depth=2)
+    api = make_api(server)
+
+    peak, active, lock = [0], [0], threading.Lock()
+    for name in ('get_dir_list', '_get_file_page', '_get_share_info'):  # 每次调用对应一个请求
+        _track(api, name, peak, lock, active)
+
+    rows = list(api.iter_shares(-1, recursive=recursive, workers=4))
+    # 根目录 3 个子文件夹，每个子文件夹又有 3 个，每个文件夹 12 个文件
+    assert len(rows) == (13 * 12 if recursive else 12)
+    assert all(row['url'] for row in rows)
+    assert peak[0] <= 4  # 列举文件夹与请求分享信息合计不超过 workers
+
+
+def test_export_jsonl(stub, make_api):
+    server = stub(files_per_page=5, pages=1, folders_per_dir=2, folder_depth=1)
+    output = io.StringIO()
+    assert make_api(server).export_shares(-1, output, recursive=True, workers=3) == 15
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(row['path'] for row in rows).count('/') == 5
+    assert len({row['path'] for row in rows}) == 3 and all(row['url'] for row in rows)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: LanZouIndex 的同步与删除
+--------------------------------------------
+"""
+
+from conftest import fast_policy
+from zibuyu_lanzou import LanZouIndex, LanZouFile, LanZouFolder
+from zibuyu_lanzou.index import _listing_hash
+
+
+def _refresh(server, make_api, index):
+    return index.refresh(make_api(server, retry_policy=fast_policy(max_attempts=2)), workers=4)
+
+
+def test_refresh_and_unchanged(stub, make_api, tmp_path):
+    server = stub(files_per_page=2, pages=1, folders_per_dir=2, folder_depth=2)
+    index = LanZouIndex(str(tmp_path / 'index.db'))
+
+    stats = _refresh(server, make_api, index)
+    assert stats['changed'] == 1 + 2 + 4 and stats['removed'] == 0 and stats['failed'] == []
+    assert index.get_folder_by_path('/folder_1/folder_11').id == '11'
+    assert len(index.list_files(11)) == 2
+
+    stats = _refresh(server, make_api, index)
+    assert stats['changed'] == 0 and stats['unchanged'] == 7
+
+
+def test_refresh_prunes_removed_folders(stub, make_api, tmp_path):
+    server = stub(files_per_page=2, pages=1, folders_per_dir=2, folder_depth=2)
+    index = LanZouIndex(str(tmp_path / 'index.db'))
+    _refresh(server, make_api, index)
+
+    server.state.folders_per_dir = 1  # folder_2 及其子文件夹、folder_12 被删除
+    stats = _refresh(server, make_api, index)
+    assert stats['removed'] == 4
+    assert index.get_folder_by_path('/folder_2') is None
+    assert index.get_folder(21) is None
+    assert index.list_files(2) == []
+
+
+def test_refresh_keeps_subtree_when_listing_fails(stub, make_api, tmp_path):
+    server = stub(files_per_page=2, pages=1, folders_per_dir=2, folder_depth=2)
+    index = LanZouIndex(str(tmp_path / 'index.db'))
+    _refresh(server, make_api, index)
+
+    server.state.broken_folders.add(2)
+    stats = _refresh(server, make_api, index)
+    assert stats['failed'] == ['/folder_2']
+    assert stats['removed'] == 0
+    assert index.get_folder_by_path('/folder_2/folder_21').id == '21'
+    assert len(index.list_files(2)) == 2
+
+    server.state.broken_folders.add(-1)  # 起始文件夹也失败时整个索引保持不变
+    stats = _refresh(server, make_api, index)
+    assert stats['failed'] == ['/'] and stats['removed'] == 0
+    assert index.get_folder(11) is not None
+
+
+def test_listing_hash_ignores_time_and_downs():
+    folder = LanZouFolder(id=1, name='a', has_pwd=False, desc='')
+    before = [LanZouFile(id=1, name='a.zip', time='2026-10-17 10:00', size='1 M', downs='3')]
+    after = [LanZouFile(id=1, name='a.zip', time='2026-10-17 10:05', size='1 M', downs='9')]
+    assert _listing_hash(folder, before) == _listing_hash(folder, after)
+
+    renamed = [LanZouFile(id=1, name='b.zip', time='2026-10-17 10:00', size='1 M', downs='3')]
+    assert _listing_hash(folder, before) != _listing_hash(folder, renamed)
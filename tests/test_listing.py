@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 文件列表、子文件夹列表与目录遍历
+--------------------------------------------
+"""
+
+import pytest
+
+from conftest import fast_policy
+from zibuyu_lanzou import LanZouListError
+
+
+@pytest.mark.parametrize('prefetch', [1, 4])
+def test_iter_file_list_pages(stub, make_api, prefetch):
+    server = stub(files_per_page=5, pages=3)
+    files = list(make_api(server).iter_file_list(1, prefetch=prefetch))
+    assert len(files) == 15
+    assert [f.id for f in files] == sorted(f.id for f in files)
+
+
+@pytest.mark.parametrize('prefetch', [1, 4])
+def test_iter_file_list_raises_on_failed_page(stub, make_api, prefetch):
+    server = stub(files_per_page=5, pages=3)
+    server.state.broken_pages.add((1, 2))
+    api = make_api(server, retry_policy=fast_policy(max_attempts=2))
+
+    files = []
+    with pytest.raises(LanZouListError) as info:
+        for file in api.iter_file_list(1, prefetch=prefetch):
+            files.append(file)
+    assert len(files) == 5  # 第一页已经返回
+    assert info.value.folder_id == 1 and info.value.page == 2
+
+
+def test_get_dir_list_raises(stub, make_api):
+    server = stub()
+    server.state.broken_folders.add(1)
+    api = make_api(server, retry_policy=fast_policy(max_attempts=2))
+
+    with pytest.raises(LanZouListError) as info:
+        api.get_dir_list(1)
+    assert info.value.page == 0
+    assert api.mkdir(1, 'new_folder') is None  # 无法确认是否存在同名文件夹时不创建
+    assert server.state.calls['task2'] == 0
+
+
+def test_walk_raises_on_failed_folder(stub, make_api):
+    server = stub(files_per_page=2, pages=1)
+    server.state.broken_folders.add(2)
+    api = make_api(server, retry_policy=fast_policy(max_attempts=2))
+
+    with pytest.raises(LanZouListError):
+        list(api.walk(-1))
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 多账号池的分配与登录失效后换账号
+--------------------------------------------
+"""
+
+import pytest
+
+from conftest import LOGGER, fast_policy
+from stub_server import point_to, share_url
+from zibuyu_lanzou import AccountPool, LanZouApi, LanZouCookie, LanZouCookieError
+from zibuyu_lanzou.acw import MemoryAcwTokenStore
+from zibuyu_lanzou.health import DomainHealth
+
+COOKIES = [LanZouCookie(ylogin=str(10001 + i), phpdisk_info='test', PHPSESSID=f'session_{i}') for i in range(3)]
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def _make(server, cookies=COOKIES) -> AccountPool:
+        def _factory(cookie):
+            api = LanZouApi(cookies=cookie, logger=LOGGER, retry_policy=fast_policy(max_attempts=2),
+                            domain_health=DomainHealth(), acw_store=MemoryAcwTokenStore())
+            return point_to(api, server.url)
+
+        pool = AccountPool(cookies, logger=LOGGER, api_factory=_factory)
+        pools.append(pool)
+        return pool
+
+    yield _make
+    for pool in pools:
+        pool.close()
+
+
+def test_listing_fails_over_on_expired_login(stub, make_pool):
+    server = stub(files_per_page=3, pages=1)
+    pool = make_pool(server)
+    server.state.expired_sessions.update({'session_0', 'session_1'})
+
+    account, files = pool.get_file_list(-1)
+    assert account == '10003' and len(files) == 3
+    stats = {row['account']: row for row in pool.stats()}
+    assert not stats['10001']['available'] and not stats['10002']['available']
+
+    server.state.expired_sessions.add('session_2')
+    with pytest.raises(LanZouCookieError):
+        pool.get_dir_list(-1)
+
+
+def test_rotation_and_bound_account(stub, make_pool):
+    server = stub()
+    pool = make_pool(server)
+
+    accounts = {pool.get_file_info_by_url(share_url(2 * i))[0] for i in range(1, 7)}
+    assert accounts == {'10001', '10002', '10003'}  # 依次交给最近请求最少的账号
+
+    account, info = pool.get_share_info(4, account='10002')
+    assert account == '10002' and info.success
+    assert pool.set_passwd(4, 'abcd', account='10002') == ('10002', True)
+    assert server.state.calls['uid_10002'] >= 2  # 已有文件的操作只发给指定的账号
+    assert server.state.calls['uid_10001'] == server.state.calls['uid_10003'] == 0
+
+
+def test_login_expired_detection(stub, make_pool):
+    server = stub()
+    api = make_pool(server).api('10001')
+    assert api._is_login_expired({'zt': 9, 'info': '登录信息已失效'})
+    assert api._is_login_expired({'zt': 0, 'info': '请先登录'})
+    assert not api._is_login_expired({'zt': 1, 'info': '已删除'})
+    assert not api._is_login_expired({'zt': 0, 'info': '文件不存在'})
+    assert not api._is_login_expired([])
+
+
+def test_standalone_client_recovers(stub, make_api):
+    server = stub(files_per_page=3, pages=1)
+    api = make_api(server)
+    server.state.expired_sessions.add('test')
+
+    assert api.set_passwd(4, 'abcd') is False  # 登录失效时与其他失败一样返回 False，不抛出异常
+    assert not api.session_valid
+    assert api.set_passwd(4, 'abcd') is False  # 不会因为之前的失效直接拒绝请求
+    assert server.state.calls['uid_10001'] == 2
+
+    api.set_cookies(LanZouCookie(ylogin='10001', phpdisk_info='test', PHPSESSID='fresh'))
+    assert api.session_valid
+    assert api.set_passwd(4, 'abcd') is True
+    assert len(api.get_file_list(-1)) == 3
+
+
+def test_pool_account_reenabled_with_new_cookies(stub, make_pool):
+    server = stub()
+    pool = make_pool(server)
+    server.state.expired_sessions.add('session_1')
+
+    assert pool.set_passwd(4, 'abcd', account='10002') == ('10002', False)
+    with pytest.raises(LanZouCookieError):  # 停用后指定该账号的操作直接拒绝
+        pool.set_passwd(4, 'abcd', account='10002')
+
+    pool.set_cookies('10002', LanZouCookie(ylogin='10002', phpdisk_info='test', PHPSESSID='session_9'))
+    assert pool.set_passwd(4, 'abcd', account='10002') == ('10002', True)
+    assert {row['account']: row for row in pool.stats()}['10002']['available']
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: RetryPolicy 的退避、截止时间，以及客户端按策略重试
+--------------------------------------------
+"""
+
+import time
+import threading
+
+import requests
+
+from conftest import fast_policy
+from zibuyu_lanzou import RetryPolicy
+
+
+def test_delay_backoff_and_jitter():
+    policy = RetryPolicy(backoff=1, max_backoff=5, jitter=0)
+    assert [policy.delay(n) for n in range(1, 6)] == [1, 2, 4, 5, 5]
+
+    policy = RetryPolicy(backoff=1, max_backoff=5, jitter=0.5)
+    assert all(1 <= policy.delay(2) <= 2 for _ in range(100))  # 抖动只会缩短等待时间
+
+
+def test_wait_stops_at_max_attempts_and_deadline():
+    policy = RetryPolicy(max_attempts=3, backoff=0.01, max_backoff=0.01, jitter=0, deadline=None)
+    assert policy.wait(1) and policy.wait(2)
+    assert not policy.wait(3)
+
+    policy = RetryPolicy(max_attempts=10, backoff=1, jitter=0, deadline=0.5)
+    with policy.scope():
+        start = time.monotonic()
+        assert not policy.wait(1)  # 剩余时间不足一次退避，不再等待
+        assert time.monotonic() - start < 0.1
+        assert policy.timeout(15) <= 0.5
+
+    policy = RetryPolicy(deadline=0.05)
+    with policy.scope():
+        time.sleep(0.1)
+        assert policy.timeout(15) is None  # 截止时间已过，不再发送请求
+
+
+def test_scope_nesting_and_threads():
+    policy = RetryPolicy(deadline=10)
+    assert policy.remaining() is None
+
+    with policy.scope():
+        outer = policy.remaining()
+        with RetryPolicy(deadline=100).scope():  # 嵌套时沿用最外层的截止时间
+            assert policy.remaining() <= outer
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(policy.remaining()))
+        thread.start()
+        thread.join()
+        assert seen == [None]  # 截止时间只属于当前线程
+
+    assert policy.remaining() is None
+
+
+def test_retry_until_success(stub, make_api):
+    server = stub(error_rate=0.5, error_kinds=('status', 'reset', 'html'), seed=3)
+    api = make_api(server, retry_policy=fast_policy(max_attempts=20))
+
+    infos = [api.get_share_info(i) for i in range(2, 12)]
+    assert all(info.success for info in infos)
+    errors = sum(server.state.calls[f'error_{kind}'] for kind in ('status', 'reset', 'html'))
+    assert errors > 0
+
+
+def test_retry_gives_up_after_max_attempts(stub, make_api):
+    server = stub(error_rate=1.0, error_kinds=('status',))
+    api = make_api(server, retry_policy=fast_policy(max_attempts=3))
+
+    info = api.get_share_info(2)
+    assert not info.success
+    assert server.state.calls['error_status'] == 3
+
+
+def test_operation_deadline(stub, make_api):
+    server = stub(error_rate=1.0, error_kinds=('status',))
+    api = make_api(server, retry_policy=fast_policy(max_attempts=1000, backoff=0.05, max_backoff=0.05, deadline=0.3))
+
+    start = time.monotonic()
+    info = api.get_share_info(2)
+    assert not info.success
+    assert time.monotonic() - start < 1.5
+
+
+def test_upload_body_is_not_replayed(stub, make_api):
+    server = stub(error_rate=1.0, error_kinds=('status',))
+    api = make_api(server, retry_policy=fast_policy(max_attempts=5))
+
+    assert api.upload_stream(b'x' * 1000, 'a.zip', overwrite='keep') == []
+    assert server.state.calls['error_status'] == 1  # 流式上传的请求体只能发送一次
+
+
+def test_expired_deadline_stops_domain_fallback(make_api, stub):
+    api = make_api(stub(), retry_policy=fast_policy(max_attempts=5, deadline=0.2))
+    urls = []
+
+    def _request(method, url, **kwargs):
+        urls.append(url)
+        time.sleep(0.3)  # 第一个域名就耗尽了操作的时限
+        raise requests.ConnectionError('timeout')
+
+    api._session.request = _request
+    url = 'https://pc.lanzouo.com/fn?abc'
+    assert len(api._all_possible_urls(url)) == 3
+    assert api._get(url, need_check_cookie=False) is None
+    assert len(urls) == 1  # 剩下的备用域名不再各自多发一次请求
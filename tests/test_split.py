@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 大文件分块上传与还原
+--------------------------------------------
+"""
+
+import os
+import json
+
+import pytest
+
+from conftest import fast_policy
+from zibuyu_lanzou.split import FileSlice
+
+
+def _write(path, size: int) -> bytes:
+    data = os.urandom(size)
+    with open(path, 'wb') as file:
+        file.write(data)
+    return data
+
+
+def test_file_slice_len_is_remaining(tmp_path):
+    data = _write(tmp_path / 'data.bin', 1000)
+    with FileSlice(str(tmp_path / 'data.bin'), 100, 300) as part:
+        assert len(part) == 300
+        assert part.read(120) == data[100:220]
+        assert len(part) == 180
+        assert part.read() == data[220:400]
+        assert len(part) == 0 and part.read() == b''
+
+
+def test_file_slice_truncated_file(tmp_path):
+    _write(tmp_path / 'data.bin', 200)
+    with FileSlice(str(tmp_path / 'data.bin'), 100, 300) as part:
+        with pytest.raises(IOError):
+            part.read()
+
+
+def test_split_upload_and_reassemble(stub, make_api, tmp_path):
+    server = stub(keep_uploads=True, seed=5)
+    api = make_api(server, retry_policy=fast_policy(max_attempts=10))
+    api._max_size = 1  # 单文件上限 1 MB，数据块默认 0.9 MB
+    data = _write(tmp_path / 'big.bin', 2621440 + 12345)
+
+    progress = []
+    manifest = api.upload_split_file(str(tmp_path / 'big.bin'), -1, workers=3,
+                                     callback=lambda name, total, now: progress.append((total, now)))
+    assert len(manifest) == 1 and manifest[0].name == 'big.bin.manifest.txt'
+
+    content = json.loads(server.state.uploads[int(manifest[0].id)])
+    assert [p['size'] for p in content['parts']] == [943718, 943718, 746349]
+    assert sum(p['size'] for p in content['parts']) == len(data)
+    assert progress[-1] == (len(data), len(data))
+    assert [now for _, now in progress] == sorted(now for _, now in progress)
+    assert server.state.calls['task12'] == 0  # 数据块的文件名已知，不再请求文件名与描述
+
+    def _direct_url(share_url, pwd=''):  # 分享链接 -> 模拟服务器保存的上传内容
+        return f'{server.url}/stored/{int(share_url.rsplit("/i", 1)[1])}'
+
+    api.get_direct_url_by_url = _direct_url
+    server.state.error_rate, server.state.error_kinds = 0.3, ('reset', 'status')  # 下载清单与数据块时按重试策略重试
+    save_path = str(tmp_path / 'restored.bin')
+    assert api.download_split_file(f'/i{manifest[0].id}', save_path)
+    with open(save_path, 'rb') as file:
+        assert file.read() == data
+    assert sum(server.state.calls[f'error_{kind}'] for kind in ('reset', 'status')) > 0
+    assert not [name for name in os.listdir(tmp_path) if '.part' in name]
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 流式上传的数据包装与分块发送
+--------------------------------------------
+"""
+
+import io
+
+import pytest
+from requests_toolbelt import MultipartEncoder
+
+from conftest import fast_policy
+from zibuyu_lanzou.stream import EncoderStream, open_upload_body
+
+DATA = bytes(range(256)) * 40  # 10240 字节
+
+
+def _chunks(data: bytes, sizes):
+    """按 sizes 循环切分 data，模拟块大小不固定的生成器"""
+    pos, i = 0, 0
+    while pos < len(data):
+        size = sizes[i % len(sizes)]
+        yield data[pos:pos + size]
+        pos, i = pos + size, i + 1
+
+
+class _ShortReads(io.RawIOBase):
+    """每次最多返回 limit 字节的管道"""
+
+    def __init__(self, data: bytes, limit: int):
+        self._data, self._limit, self._pos = data, limit, 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        size = min(size, self._limit)
+        chunk = self._data[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+
+@pytest.mark.parametrize('source', [
+    lambda: _chunks(DATA, [1, 700, 3, 4096, 0, 250]),
+    lambda: _ShortReads(DATA, 333),
+], ids=['iter', 'stream'])
+def test_body_reads_across_chunk_boundaries(source):
+    with open_upload_body(source(), size=len(DATA)) as body:
+        parts, sizes = [], [1, 512, 1000, 7, 4096]
+        while len(body):
+            want = sizes[len(parts) % len(sizes)]
+            remain = len(body)
+            part = body.read(want)
+            assert len(part) == min(want, remain)  # 跨越数据块时也返回完整的长度
+            parts.append(part)
+        assert b''.join(parts) == DATA
+        assert body.read(10) == b'' and body.tell() == len(DATA)
+
+
+@pytest.mark.parametrize('source', [
+    lambda: _chunks(DATA[:1000], [300]),
+    lambda: _ShortReads(DATA[:1000], 300),
+], ids=['iter', 'stream'])
+def test_short_source_raises(source):
+    with open_upload_body(source(), size=2000) as body:
+        assert len(body.read(900)) == 900
+        with pytest.raises(IOError):
+            body.read(900)
+
+
+def _encoder(data: bytes) -> MultipartEncoder:
+    return MultipartEncoder({'upload_file': ('a.zip', open_upload_body(data), 'application/octet-stream')})
+
+
+@pytest.mark.parametrize('block_size', [1000, 4096, 65536])
+def test_encoder_stream_blocks(block_size):
+    stream = EncoderStream(_encoder(DATA), block_size)
+    blocks = list(stream)
+
+    assert all(len(block) == block_size for block in blocks[:-1])
+    assert 0 < len(blocks[-1]) <= block_size
+    assert sum(map(len, blocks)) == len(stream) == stream.bytes_sent
+    assert DATA in b''.join(blocks)
+
+
+def test_encoder_stream_progress():
+    calls = []
+    stream = EncoderStream(_encoder(DATA), 1000, progress=lambda sent, total: calls.append((sent, total)),
+                           interval=3600, step=3000)
+    list(stream)
+
+    total = len(stream)
+    assert [sent for sent, _ in calls] == [3000, 6000, 9000, total]  # 每 3000 字节一次，最后再补一次
+    assert all(t == total for _, t in calls) and stream.callbacks == len(calls)
+
+    calls.clear()
+    list(EncoderStream(_encoder(DATA), 1000, progress=lambda sent, total: calls.append(sent), interval=3600))
+    assert calls == [total]  # 只按时间合并时，发送完成后只调用一次
+
+
+def test_upload_stream_generator(stub, make_api):
+    server = stub(keep_uploads=True)
+    api = make_api(server, upload_block_size=1000, progress_interval=3600, progress_step=4000)
+
+    progress = []
+    files = api.upload_stream(_chunks(DATA, [1, 999, 2500]), 'a.zip', size=len(DATA),
+                              callback=lambda name, total, now: progress.append((now, total)))
+    assert len(files) == 1
+    assert server.state.uploads[int(files[0].id)] == DATA
+    assert progress[-1][0] == progress[-1][1] and len(progress) == progress[-1][1] // 4000 + 1
+
+
+def test_upload_stream_short_generator(stub, make_api):
+    server = stub(keep_uploads=True)
+    api = make_api(server, retry_policy=fast_policy(max_attempts=3))
+
+    # 生成器的数据少于 size 时在发送途中抛出 IOError，与网络异常一样返回空列表，请求体只发送一次
+    assert api.upload_stream(_chunks(DATA[:1000], [300]), 'a.zip', size=len(DATA)) == []
+    assert server.state.calls['truncated'] <= 1 and server.state.calls['upload'] == 0
+    assert not server.state.uploads
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 上传整个目录
+--------------------------------------------
+"""
+
+import os
+
+from zibuyu_lanzou.journal import UploadJournal
+
+
+def _make_tree(root) -> int:
+    total = 0
+    for i, rel in enumerate(['a.zip', 'b.zip', 'sub/c.zip', 'sub/deep/d.zip']):
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(os.urandom(50000 * (i + 1)))
+        total += 50000 * (i + 1)
+    return total
+
+
+def test_upload_tree_progress_and_journal(stub, make_api, tmp_path):
+    server = stub(files_per_page=0, pages=0, folders_per_dir=0)
+    api = make_api(server)
+    local_dir = tmp_path / 'dist'
+    total = _make_tree(local_dir)
+
+    progress = []
+    summary = api.upload_tree(str(local_dir), -1, workers=4,
+                              callback=lambda name, total_size, now: progress.append((total_size, now)))
+    assert summary == {'uploaded': 4, 'skipped': 0, 'failed': []}
+    assert server.state.calls['upload'] == 4
+    assert progress[-1] == (total, total)
+    assert [now for _, now in progress] == sorted(now for _, now in progress)
+
+    progress.clear()
+    summary = api.upload_tree(str(local_dir), -1, callback=lambda name, total_size, now: progress.append(now))
+    assert summary == {'uploaded': 0, 'skipped': 4, 'failed': []}
+    assert server.state.calls['upload'] == 4
+    assert progress[-1] == total
+
+
+def test_skipped_subtree_is_reported(stub, make_api, tmp_path):
+    server = stub(files_per_page=0, pages=0, folders_per_dir=0)
+    api = make_api(server)
+    local_dir = tmp_path / 'dist'
+    _make_tree(local_dir)
+
+    create = api._create_folder
+    api._create_folder = lambda parent_id, name: None if name == 'deep' else create(parent_id, name)
+    summary = api.upload_tree(str(local_dir), -1, journal_path=str(tmp_path / 'first.journal'), overwrite='keep')
+    assert summary == {'uploaded': 3, 'skipped': 0, 'failed': ['sub/deep/d.zip']}
+
+    server.state.broken_folders.add(-1)  # 列举根目录的子文件夹失败，所有子目录中的文件都记为失败
+    summary = api.upload_tree(str(local_dir), -1, journal_path=str(tmp_path / 'second.journal'), overwrite='keep')
+    assert summary['uploaded'] == 2 and sorted(summary['failed']) == ['sub/c.zip', 'sub/deep/d.zip']
+
+
+def test_journal_after_half_written_line(tmp_path):
+    path = tmp_path / 'upload.journal'
+    with UploadJournal(str(path)) as journal:
+        journal.record('a.zip', 1, 1.0, [1])
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"path": "b.zip", "si')  # 上次中断时写了半行
+
+    with UploadJournal(str(path)) as journal:
+        journal.record('c.zip', 3, 3.0, [3])
+    journal = UploadJournal(str(path))
+    journal.close()
+    assert journal.is_done('a.zip', 1, 1.0) and journal.is_done('c.zip', 3, 3.0)
+    assert len(journal) == 2
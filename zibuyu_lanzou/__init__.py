@@ -10,9 +10,60 @@ description:
 --------------------------------------------
 """
 
-from .api import LanZouApi
-from .utils import get_direct_download_url
-from .type import LanZouCookie, LanZouShareInfo, LanZouFolder, LanZouFile, LanZouFileDetail
+import importlib
+from typing import TYPE_CHECKING
+
+from .type import LanZouCookie, LanZouCookieError, LanZouListError, LanZouShareInfo, LanZouFolder, LanZouFile, \
+    LanZouFileDetail, LanZouCaptchaWait, LanZouBatchResult
+
+# 其余对象在第一次访问时才导入对应模块：aiohttp、requests 等依赖导入较慢，只用到其中一部分时不必全部加载
+_LAZY_IMPORTS = {
+    'LanZouApi': '.api',
+    'AsyncLanZouApi': '.async_api',
+    'get_direct_download_url': '.utils',
+    'resolve_many': '.resolver',
+    'DirectUrlCache': '.cache',
+    'MemoryDirectUrlCache': '.cache',
+    'SQLiteDirectUrlCache': '.cache',
+    'LanZouIndex': '.index',
+    'DomainHealth': '.health',
+    'RetryPolicy': '.retry',
+    'Metrics': '.metrics',
+    'RequestEvent': '.metrics',
+    'AccountPool': '.pool',
+    'AdaptiveRateLimiter': '.throttle',
+    'AcwTokenStore': '.acw',
+    'MemoryAcwTokenStore': '.acw',
+    'SQLiteAcwTokenStore': '.acw',
+}
+
+if TYPE_CHECKING:  # 供 IDE 与类型检查使用
+    from .api import LanZouApi
+    from .async_api import AsyncLanZouApi
+    from .utils import get_direct_download_url
+    from .resolver import resolve_many
+    from .cache import DirectUrlCache, MemoryDirectUrlCache, SQLiteDirectUrlCache
+    from .index import LanZouIndex
+    from .health import DomainHealth
+    from .retry import RetryPolicy
+    from .metrics import Metrics, RequestEvent
+    from .pool import AccountPool
+    from .throttle import AdaptiveRateLimiter
+    from .acw import AcwTokenStore, MemoryAcwTokenStore, SQLiteAcwTokenStore
+
+
+def __getattr__(name: str):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # 之后直接从模块字典中取，不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
+
 
 __author__ = '子不语'
 __version__ = '0.0.1'
@@ -21,10 +72,29 @@ __copyright__ = 'Copyright 2024, zibuyu'
 
 __all__ = [
     'LanZouApi',
+    'AsyncLanZouApi',
     'LanZouCookie',
+    'LanZouCookieError',
+    'LanZouListError',
     'LanZouShareInfo',
     'LanZouFolder',
     'LanZouFile',
     'LanZouFileDetail',
+    'LanZouCaptchaWait',
+    'LanZouBatchResult',
     'get_direct_download_url',
+    'resolve_many',
+    'DirectUrlCache',
+    'MemoryDirectUrlCache',
+    'SQLiteDirectUrlCache',
+    'LanZouIndex',
+    'DomainHealth',
+    'RetryPolicy',
+    'Metrics',
+    'RequestEvent',
+    'AccountPool',
+    'AdaptiveRateLimiter',
+    'AcwTokenStore',
+    'MemoryAcwTokenStore',
+    'SQLiteAcwTokenStore',
 ]
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: acw_sc__v2 共享存储，按站点保存，服务器重新下发验证页面之前所有客户端共用
+--------------------------------------------
+"""
+
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from .throttle import site_of
+
+
+class AcwTokenStore(object):
+    """
+    acw_sc__v2 存储基类，子类实现 _get / _set / _delete 即可
+
+    遇到验证页面时算出的 acw_sc__v2 写入存储，其他客户端(线程、进程)请求同一个站点前先取出来带上，
+    不必各自再被验证页面拦截一次；服务器再次下发验证页面说明旧值已失效，用新算出的值覆盖。
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[str]:
+        token = self._get(site_of(url))
+        with self._lock:
+            if token is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return token
+
+    def set(self, url: str, token: str):
+        if not token:
+            return
+        self._set(site_of(url), token)
+        with self._lock:
+            self.updates += 1
+
+    def invalidate(self, url: str, token: str):
+        """删除已失效的值；其他客户端已经写入了新值时保留新值"""
+        self._delete(site_of(url), token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'updates': self.updates}
+
+    def _get(self, site: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _set(self, site: str, token: str):
+        raise NotImplementedError
+
+    def _delete(self, site: str, token: str):
+        raise NotImplementedError
+
+
+class MemoryAcwTokenStore(AcwTokenStore):
+    """进程内共享"""
+
+    def __init__(self):
+        super().__init__()
+        self._tokens: Dict[str, str] = {}
+
+    def _get(self, site):
+        return self._tokens.get(site)
+
+    def _set(self, site, token):
+        self._tokens[site] = token
+
+    def _delete(self, site, token):
+        with self._lock:
+            if self._tokens.get(site) == token:
+                del self._tokens[site]
+
+
+class SQLiteAcwTokenStore(AcwTokenStore):
+    """基于 SQLite，多个进程指向同一个数据库文件即可共享"""
+
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS acw_token (site TEXT PRIMARY KEY, token TEXT NOT NULL, updated_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """sqlite3 连接不能跨线程使用，每个线程各自持有一个"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')  # 允许多进程同时读写
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _get(self, site):
+        row = self._connect().execute('SELECT token FROM acw_token WHERE site = ?', (site,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, site, token):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO acw_token VALUES (?, ?, ?)', (site, token, time.time()))
+
+    def _delete(self, site, token):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM acw_token WHERE site = ? AND token = ?', (site, token))
+
+
+_shared_store = MemoryAcwTokenStore()
+
+
+def shared_acw_store() -> AcwTokenStore:
+    """进程内共享的 acw_sc__v2 存储，未指定 acw_store 的客户端都使用它"""
+    return _shared_store
@@ -10,172 +10,281 @@ description:
 --------------------------------------------
 """
 
-import re
+import io
 import os
+import csv
+import json
 import time
 import logging
 import requests
-from datetime import datetime
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from contextlib import nullcontext
 from urllib3 import disable_warnings
-from typing import List, Optional, Union, Callable
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from typing import List, Optional, Union, Callable, Iterable, Iterator, Tuple, Dict, TextIO, Generator, TypeVar
 from urllib3.exceptions import InsecureRequestWarning
 
-from fake_useragent import UserAgent
-from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+from requests_toolbelt import MultipartEncoder
 
-from .type import LanZouCookie, LanZouShareInfo, LanZouFolder, LanZouFile, LanZouFileDetail
-from .utils import get_logger, time_format, is_name_valid, name_format, get_mime_type, is_file_url, calc_acw_sc__v2, \
-    remove_notes
+from .acw import AcwTokenStore
+from .base import LanZouApiBase, Call, DONE, RETRY
+from .cache import DirectUrlCache
+from .index import LanZouIndex
+from .journal import UploadJournal
+from .download import RangeDownloader
+from .health import DomainHealth
+from .metrics import Metrics, operation_label, OK
+from .retry import RetryPolicy, operation
+from .throttle import AdaptiveRateLimiter, site_of
+from .stream import UploadSource, EncoderStream, open_upload_body
+from .split import FileSlice, part_name, manifest_name, split_ranges, file_sha256, build_manifest, parse_manifest
+from .type import LanZouCookie, LanZouListError, LanZouShareInfo, LanZouFolder, LanZouFile, LanZouFileDetail, \
+    LanZouCaptchaWait, LanZouBatchResult
+from .utils import is_name_valid, name_format, get_mime_type, is_file_url, HostLimiter
 
+T = TypeVar('T')
 
-class LanZouApi(object):
+
+class _Adapter(HTTPAdapter):
     """
-    蓝奏云 API
+    通过 http 代理访问时 requests 创建的连接不会设置 TCP_NODELAY，
+    post 请求的请求头与请求体分两次发送，会被延迟确认卡住约 40 毫秒
     """
 
-    _timeout = 15  # 每个请求的超时(不包含下载响应体的用时)
-    _max_size = 100  # 单个文件大小上限 MB
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs.setdefault('socket_options', HTTPConnection.default_socket_options)
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+class LanZouApi(LanZouApiBase):
+    """
+    蓝奏云 API
+
+    线程安全：多个线程可以共用同一个实例，每次调用的状态都保存在局部变量中，
+    实例上只保存连接池、cookie 以及带锁的缓存；多线程使用时按线程数调整 pool_maxsize。
+    """
 
     def __init__(
             self,
             log_file_path: str = '',
             cookies: Optional[LanZouCookie] = None,
             logger: Optional[logging.Logger] = None,
+            host_limit: int = 0,
+            url_cache: Optional[DirectUrlCache] = None,
+            index: Optional[LanZouIndex] = None,
+            name_map_ttl: float = 300,
+            domain_health: Optional[DomainHealth] = None,
+            retry_policy: Optional[RetryPolicy] = None,
+            pool_connections: int = 32,
+            pool_maxsize: int = 16,
+            pool_block: bool = False,
+            host_pool_sizes: Optional[Dict[str, int]] = None,
+            metrics: Optional[Metrics] = None,
+            rate_limiter: Optional[AdaptiveRateLimiter] = None,
+            acw_store: Optional[AcwTokenStore] = None,
+            upload_block_size: int = 262144,
+            progress_interval: float = 0.1,
+            progress_step: Optional[int] = None,
     ):
         """
 
         @param cookies: LanZouCookie实例化对象
         @param logger: 日志记录对象
         @param log_file_path: 日志文件保存路径，为空表达不保存
+        @param host_limit: 每个主机同时在途的最大请求数，0 表示不限制；多线程共用一个实例时使用
+        @param url_cache: 直链缓存，相同的 (分享链接, 提取码) 在有效期内不再重复解析
+        @param index: 本地元数据索引，上传、删除、设置提取码和描述成功后同步更新
+        @param name_map_ttl: 上传时用于查找同名文件的 文件名->文件 映射的有效期(秒)，过期后重新列举文件夹
+        @param domain_health: 域名健康度统计，默认使用进程内共享的实例
+        @param retry_policy: 重试策略，控制重试次数、退避时间以及每次操作的总时限
+        @param pool_connections: 最多缓存多少个主机的连接池，分享链接的二级域名各不相同，需要比默认的 10 大
+        @param pool_maxsize: 每个主机保持的长连接数，应不小于共用本实例的线程数
+        @param pool_block: 连接都在使用中时是否等待空闲连接；为 False 时临时新建连接，用完即关闭
+        @param host_pool_sizes: 单独指定某些主机的长连接数，例如 {'pc.woozooo.com': 32}
+        @param metrics: 请求指标统计，为 None 时不统计
+        @param rate_limiter: 自适应限速，解析分享链接等不需要登录的请求按站点限速，遇到反爬验证时自动降速
+        @param acw_store: acw_sc__v2 存储，默认使用进程内共享的实例；多进程共享时传入 SQLiteAcwTokenStore
+        @param upload_block_size: 上传时每次发送的字节数
+        @param progress_interval: 上传进度回调的最小间隔(秒)
+        @param progress_step: 上传进度每增加这么多字节也回调一次，为空表示只按时间
         """
 
-        if logger and isinstance(logger, logging.Logger):
-            self.logger = logger
-        else:
-            self.logger = get_logger(log_name='lanzou_api', base_path=log_file_path)
+        super().__init__(
+            log_file_path, cookies, logger, domain_health, retry_policy, metrics, rate_limiter, acw_store,
+            upload_block_size, progress_interval, progress_step
+        )
 
         self._session = requests.session()
-        self._cookies: Optional[LanZouCookie] = cookies
+        self._mount_adapters(pool_connections, pool_maxsize, pool_block, host_pool_sizes or {})
+
+        self._host_limiter: Optional[HostLimiter] = HostLimiter(host_limit) if host_limit > 0 else None
+        self._url_cache: Optional[DirectUrlCache] = url_cache
+        self._index: Optional[LanZouIndex] = index
+
+        # 每个文件夹的 文件名 -> 同名文件列表，上传前用来查找同名文件，避免每次上传都重新列举整个文件夹
+        self._name_map_ttl = name_map_ttl
+        self._name_maps: Dict[str, Tuple[float, Dict[str, List[LanZouFile]]]] = {}
+        self._name_map_locks: Dict[str, threading.Lock] = {}
+        self._name_map_lock = threading.Lock()
 
         if isinstance(cookies, LanZouCookie):
-            self._session.cookies.update({
-                'PHPSESSID': cookies.PHPSESSID,
-                'ylogin': cookies.ylogin,
-                'phpdisk_info': cookies.phpdisk_info,
-            })
-
-            self._uid = cookies.ylogin  # uid 用于上传文件时的参数
-
-        self._headers = {
-            'User-Agent': UserAgent().random,
-            'Referer': 'https://pc.woozooo.com/mydisk.php',
-            'Accept-encoding': 'gzip, deflate, br, zstd',
-            'Accept': '*/*',
-            'Origin': 'https://pc.woozooo.com',
-            'Accept-Language': 'zh-CN,zh;q=0.9',  # 提取直连必需设置这个，否则拿不到数据
-        }
-
-        self._host_url = 'https://pan.lanzouo.com'
-        self._doupload_url = 'https://pc.woozooo.com/doupload.php'
-        self._account_url = 'https://pc.woozooo.com/account.php'
-        self._mydisk_url = 'https://pc.woozooo.com/mydisk.php'
+            self._apply_cookies(cookies)
 
         disable_warnings(InsecureRequestWarning)  # 全局禁用 SSL 警告
 
-    def check_cookie(self):
-        """检查是否传入了可用的 cookie"""
+    def _mount_adapters(self, pool_connections: int, pool_maxsize: int, pool_block: bool, host_pool_sizes: Dict[str, int]):
+        """
+        默认的 HTTPAdapter 每个主机只保留 10 个长连接，多线程共用时超出的连接用完即关，下次又要重新建立 TLS 连接
+        """
+
+        adapter = _Adapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+        for host, size in host_pool_sizes.items():  # requests 按最长前缀匹配
+            host_adapter = _Adapter(pool_connections=1, pool_maxsize=size, pool_block=pool_block)
+            self._session.mount(f'https://{host}', host_adapter)
+            self._session.mount(f'http://{host}', host_adapter)
+
+    def close(self):
+        """关闭连接池"""
+        self._session.close()
 
-        if not isinstance(self._cookies, LanZouCookie):
-            self.logger.error('cookies 参数错误, 请检查后重试。三个 cookie 字段必须都存在')
-            exit(1)
+    def __enter__(self):
+        return self
 
-        if not all([self._cookies.PHPSESSID, self._cookies.ylogin, self._cookies.phpdisk_info]):
-            self.logger.error('cookies 参数错误, 请检查后重试。三个 cookie 字段必须都存在')
-            exit(1)
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-    @staticmethod
-    def _all_possible_urls(url: str) -> List[str]:
-        """蓝奏云的主域名有时会挂掉, 此时尝试切换到备用域名"""
-        available_domains = [
-            'lanzouw.com',  # 鲁ICP备15001327号-7, 2021-09-02
-            'lanzoui.com',  # 鲁ICP备15001327号-6, 2020-06-09
-            'lanzoux.com'  # 鲁ICP备15001327号-5, 2020-06-09
-        ]
+    def _set_cookie(self, name: str, value: str):
+        self._session.cookies.set(name, value)
 
-        return [url.replace('lanzouo.com', d) for d in available_domains]
+    def _apply_cookies(self, cookies: LanZouCookie):
+        self._session.cookies.update({
+            'PHPSESSID': cookies.PHPSESSID,
+            'ylogin': cookies.ylogin,
+            'phpdisk_info': cookies.phpdisk_info,
+        })
+        self.invalidate_name_map()  # 换了账号，缓存的文件列表不再可信
 
-    def _get(self, url, need_check_cookie: bool = True, **kwargs):
+    def _limit(self, url: str):
+        """占用 url 所属主机的并发名额，未设置 host_limit 时不做限制"""
+        if self._host_limiter is None:
+            return nullcontext()
+        return self._host_limiter.limit(url)
+
+    def _request(self, method: str, url: str, need_check_cookie: bool = True, stage: str = '',
+                 **kwargs) -> Optional[requests.Response]:
         """
-        尝试使用所有可能的域名进行请求，直到成功为止。
+        按域名健康度依次尝试所有可能的域名，全部失败且错误可以重试时，按重试策略退避后再尝试下一轮
+        :param method: GET 或 POST
         :param url: 请求的 url
         :param need_check_cookie: 是否需要检查 cookie
-        :param kwargs: 其他参数
-        :return: requests.Response
+        :param stage: 统计指标用的操作名，为空时根据 url 推断(例如 doupload 的 task_47)
+        :param kwargs: 其他参数，显式传入的 timeout 不受操作截止时间限制
+        :return: requests.Response，失败时返回 None
         """
 
         if need_check_cookie:
             self.check_cookie()
 
-        for possible_url in self._all_possible_urls(url):
-            try:
-                kwargs.setdefault('timeout', self._timeout)
-                kwargs.setdefault('headers', self._headers)
-                return self._session.get(possible_url, verify=False, **kwargs)
-            except (ConnectionError, requests.RequestException):
-                self.logger.debug(f"Get 请求失败，尝试另一个 domain")
-
-        return None
+        policy = self._retry_policy
+        data = kwargs.get('data')
+        replayable = not hasattr(data, 'read') and not isinstance(data, EncoderStream)  # 上传的数据只能读取一次，不能重发
+        timeout = kwargs.pop('timeout', None)
+        kwargs.setdefault('headers', self._headers)
+        limiter = None if need_check_cookie else self._rate_limiter  # 需要登录的接口按账号限速，不在这里限制
+        label = None
+        if self._metrics is not None or self._before_hooks or self._after_hooks:
+            label = stage or operation_label(url, kwargs.get('data'))
+
+        fallback = None  # 重试用尽时仍然交给调用方处理的响应
+        with policy.scope():
+            attempt = 0
+            while True:
+                attempt += 1
+                retryable = False
+                expired = False
+                for possible_url in self._domain_health.order(self._all_possible_urls(url)):
+                    if limiter is not None:
+                        waited = limiter.acquire(possible_url)
+                        if waited and self._metrics is not None:
+                            self._metrics.observe('throttle_wait', site_of(possible_url), OK, waited)
+                    request_timeout = timeout or policy.timeout(self._timeout)
+                    if request_timeout is None:  # 操作的截止时间已过，剩下的域名也不再尝试
+                        expired = True
+                        break
+                    start = time.monotonic()
+                    event = self._request_started(label, method, possible_url, attempt)
+                    try:
+                        with self._limit(possible_url):
+                            response = self._session.request(method, possible_url, verify=False,
+                                                             timeout=request_timeout, **kwargs)
+                    except (ConnectionError, requests.RequestException) as e:
+                        self._request_error(method, possible_url, event, e)
+                        retryable = retryable or policy.retry_on_exception(e)
+                        continue
+
+                    action, retry = self._response_action(method, possible_url, response, need_check_cookie, start,
+                                                          event, limiter)
+                    if action == DONE:
+                        return response
+                    retryable = retryable or retry
+                    if action == RETRY or method == 'GET':  # 重试用尽时仍然交给调用方处理
+                        fallback = response
+                    if action == RETRY:
+                        break
+
+                if expired or not (retryable and replayable and policy.wait(attempt)):
+                    break
+
+        self.logger.debug(f"{method} 请求 {url} 失败，共尝试 {attempt} 轮")
+        return fallback
+
+    def _get(self, url, need_check_cookie: bool = True, **kwargs) -> Optional[requests.Response]:
+        """
+        GET 请求，失败时切换域名并按重试策略重试
+        :param url: 请求的 url
+        :param need_check_cookie: 是否需要检查 cookie
+        :param kwargs: 其他参数
+        :return: requests.Response
+        """
+        return self._request('GET', url, need_check_cookie, **kwargs)
 
     def _post(self, url, data, headers: Optional[dict] = None, need_check_cookie: bool = True, **kwargs) -> Optional[
         requests.Response]:
+        """POST 请求，只有状态码为 200 且响应体是 json 才算成功"""
+        return self._request('POST', url, need_check_cookie, data=data, headers=headers or self._headers, **kwargs)
 
-        if need_check_cookie:
-            self.check_cookie()
-
-        for possible_url in self._all_possible_urls(url):
-            try:
-                kwargs.setdefault('timeout', self._timeout)
-                if not headers:
-                    headers = self._headers
-                response = self._session.post(possible_url, data, verify=False, headers=headers, **kwargs)
-                if response.status_code == 200 and response.content:
-                    return response
-            except (ConnectionError, requests.RequestException):
-                self.logger.debug(f"Post 请求失败，尝试另一个 domain")
-
-        return
+    def _run(self, steps: Generator[Call, object, T]) -> T:
+        """依次发送解析流程(见 LanZouApiBase)中的请求，返回流程的结果"""
+        response = None
+        try:
+            while True:
+                method, url, kwargs = steps.send(response)
+                response = self._request(method, url, **kwargs)
+        except StopIteration as stop:
+            return stop.value
 
+    @operation
     def get_share_info(self, fid, is_file=True) -> LanZouShareInfo:
         """获取文件(夹)提取码、分享链接"""
+        return self._get_share_info(fid, is_file)
 
-        post_data = {'task': 22, 'file_id': fid} if is_file else {'task': 18, 'folder_id': fid}  # 获取分享链接和密码用
-        f_info = self._post(self._doupload_url, post_data)
-        if not f_info:
-            return LanZouShareInfo(
-                request_msg='网络异常'
-            )
-        else:
-            f_info = f_info.json()['info']
-
-        # id 有效性校验
-        if ('f_id' in f_info.keys() and f_info['f_id'] == 'i') or ('name' in f_info.keys() and not f_info['name']):
-            return LanZouShareInfo(request_msg='fid错误')
-
-        # onof=1 时，存在有效的提取码; onof=0 时不存在提取码，但是 pwd 字段还是有一个无效的随机密码
-        pwd = f_info['pwd'] if f_info['onof'] == '1' else ''
-        if 'f_id' in f_info.keys():  # 说明返回的是文件的信息
-            url = f_info['is_newd'] + '/' + f_info['f_id']  # 文件的分享链接需要拼凑
-            file_info = self._post(self._doupload_url, {'task': 12, 'file_id': fid})  # 文件信息
-            if not file_info:
-                return LanZouShareInfo(request_msg='网络异常')
-            name = file_info.json()['text']  # 无后缀的文件名(获得后缀又要发送请求,没有就没有吧,尽可能减少请求数量)
-            desc = file_info.json()['info']
-        else:
-            url = f_info['new_url']  # 文件夹的分享链接可以直接拿到
-            name = f_info['name']  # 文件夹名
-            desc = f_info['des']  # 文件夹描述
-        return LanZouShareInfo(success=True, request_msg='请求成功', name=name, url=url, desc=desc, pwd=pwd)
+    def _get_share_info(self, fid, is_file=True, file_name: Optional[str] = None) -> LanZouShareInfo:
+        """
+        @param file_name: 已知的文件名(例如来自文件列表)，传入时不再请求文件名与描述(task 12)，返回的 desc 为空
+        """
 
+        info = self._run(self._share_info_steps(fid, is_file, file_name))
+        if info.success and self._index is not None:
+            self._index.set_share(fid, info.url, info.pwd, is_file)
+        return info
+
+    @operation
     def set_passwd(self, fid, passwd='', is_file=True) -> bool:
         """
         设置网盘文件(夹)的提取码
@@ -186,112 +295,412 @@ class LanZouApi(object):
         @param is_file: 是否是文件；默认为 True
         @return:
         """
+        return self._set_passwd(fid, passwd, is_file).success
 
-        passwd_status = 0 if passwd == '' else 1  # 是否开启密码
+    def _set_passwd(self, fid, passwd: str, is_file: bool) -> LanZouBatchResult:
+        reason = self._check_passwd(passwd, is_file)
+        if reason:
+            self.logger.warning(reason)
+            return LanZouBatchResult(id=fid, request_msg=reason)
 
-        if passwd_status == 1 and is_file and (len(passwd) < 2 or len(passwd) > 6):
-            self.logger.warning(f"提取码长度不符合要求，文件的提取码长度为 2-6 位提取码，当前提取码为 {passwd}")
-            return False
+        result = self._batch_result(fid, self._post(self._doupload_url, self._passwd_form(fid, passwd, is_file)))
+        if result.success and self._index is not None:
+            self._index.set_pwd(fid, passwd, is_file)
+        return result
 
-        if passwd_status == 1 and not is_file and (len(passwd) < 1 or len(passwd) > 12):
-            self.logger.warning(f"提取码长度不符合要求，文件夹的提取码长度为 1-12 位提取码，当前提取码为 {passwd}")
-            return False
+    def _run_batch(self, func: Callable, items: list, workers: int) -> List[LanZouBatchResult]:
+        """
+        并发执行批量操作，按输入顺序返回每个 id 的结果；单个 id 出错不影响其他 id
+        @param func: 处理单个 item 的函数，返回 LanZouBatchResult
+        @param items: (id, 其他参数...) 元组列表
+        """
 
-        if is_file:
-            post_data = {"task": 23, "file_id": fid, "shows": passwd_status, "shownames": passwd}
-        else:
-            post_data = {"task": 16, "folder_id": fid, "shows": passwd_status, "shownames": passwd}
-        result = self._post(self._doupload_url, post_data)
-        if not result:
-            return False
-        return True if result.json()['zt'] == 1 else False
+        def _one(item) -> LanZouBatchResult:
+            with self._retry_policy.scope():  # 每个 id 各自是一次操作，有各自的截止时间
+                try:
+                    return func(*item)
+                except Exception as e:
+                    self.logger.error(f"批量操作 {item[0]} 时发生错误: {e!r}")
+                    return LanZouBatchResult(id=item[0], request_msg=f'发生错误: {e!r}')
 
-    def get_dir_list(self, folder_id=-1) -> List[LanZouFolder]:
-        """获取子文件夹列表"""
+        if len(items) <= 1 or workers <= 1:
+            return [_one(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(workers, len(items)), thread_name_prefix='lanzou_batch') as executor:
+            return list(executor.map(_one, items))
+
+    def set_passwd_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            passwd: str = '',
+            is_file: bool = True,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """
+        批量设置提取码
+        @param fids: 文件(夹) id，也可以直接传入列表接口返回的 LanZouFile / LanZouFolder
+        @param passwd: 待设置的密码，为空表示去除密码
+        @param is_file: 是否是文件；默认为 True
+        @param workers: 同时在途的请求数
+        @return: 与输入顺序一致的结果列表
+        """
 
-        folder_list = []
+        reason = self._check_passwd(passwd, is_file)
+        if reason:  # 所有 id 的原因都相同，不必逐个请求
+            self.logger.warning(reason)
+            return [LanZouBatchResult(id=getattr(fid, 'id', fid), request_msg=reason) for fid in fids]
+
+        items = [(getattr(fid, 'id', fid), passwd, is_file) for fid in fids]
+        return self._run_batch(self._set_passwd, items, workers)
+
+    @operation
+    def get_dir_list(self, folder_id=-1) -> List[LanZouFolder]:
+        """获取子文件夹列表，按重试策略重试后仍失败时抛出 LanZouListError"""
 
         post_data = {'task': 47, 'folder_id': folder_id, 'vei': 'VFBQUg1fUghQBA9fAFo='}
-        headers = self._headers.copy()
-        headers['content-type'] = 'application/x-www-form-urlencoded; charset=UTF-8'
         resp = self._post(self._doupload_url + "?uid=" + str(self._uid), post_data)  # 上传文件时需要 uid 参数
+        return self._parse_folders(folder_id, resp)
+
+    @operation
+    def mkdir(self, parent_id: Union[str, int] = -1, folder_name: str = '', desc: str = '') -> Optional[LanZouFolder]:
+        """
+        创建文件夹，已存在同名文件夹时直接返回已有的文件夹
+        @param parent_id: 父文件夹 id，默认为 -1，表示根目录
+        @param folder_name: 文件夹名称
+        @param desc: 文件夹描述
+        @return: 文件夹信息，失败时返回 None
+        """
 
-        if not resp:
-            return folder_list
+        folder_name = name_format(folder_name).strip()
+        if not folder_name:
+            self.logger.warning('文件夹名称不能为空')
+            return None
 
         try:
-            for folder in resp.json()['text']:
-                folder_list.append(
-                    LanZouFolder(
-                        id=folder['fol_id'],
-                        name=folder['name'],
-                        has_pwd=True if int(folder['onof']) == 1 else False,
-                        desc=folder['folder_des'].strip('[]')
-                    ))
-        except:
-            self.logger.warning(f"获取文件夹列表，解析返回数据时发生错误，返回值: 【{resp.text}】")
-        finally:
-            return folder_list
+            folders = self.get_dir_list(parent_id)
+        except LanZouListError as e:
+            self.logger.warning(f"{e}，无法确认是否已存在同名文件夹 {folder_name}")
+            return None
+
+        for folder in folders:
+            if folder.name == folder_name:
+                return folder
+
+        return self._create_folder(parent_id, folder_name, desc)
 
-    def _set_dir_info(self, folder_id, folder_name, desc='') -> bool:
-        """重命名文件夹及其描述"""
-        # 不能用于重命名文件，id 无效仍然返回成功
-        folder_name = name_format(folder_name)
-        post_data = {'task': 4, 'folder_id': folder_id, 'folder_name': folder_name, 'folder_description': desc}
+    def _create_folder(self, parent_id: Union[str, int], folder_name: str, desc: str = '') -> Optional[LanZouFolder]:
+        """直接创建文件夹，不检查是否存在同名文件夹"""
+
+        post_data = {'task': 2, 'parent_id': parent_id, 'folder_name': folder_name, 'folder_description': desc}
         result = self._post(self._doupload_url, post_data)
-        if not result:
-            return False
-        return True if result.json()['zt'] == 1 else False
+        if not result or result.json()['zt'] != 1:
+            self.logger.warning(f"创建文件夹 {folder_name} 失败")
+            return None
 
-    def set_desc(self, fid, desc, is_file=True) -> bool:
-        """设置文件(夹)描述"""
+        folder = LanZouFolder(id=result.json()['text'], name=folder_name, has_pwd=False, desc=desc)
+        if self._index is not None:
+            self._index.add_folder(parent_id, folder)
+        return folder
 
-        if is_file:
-            # 文件描述一旦设置了值，就不能再设置为空
-            post_data = {'task': 11, 'file_id': fid, 'desc': desc}
-            result = self._post(self._doupload_url, post_data)
-            if not result:
-                return False
-            elif result.json()['zt'] != 1:
-                return False
-            return True
+    @operation
+    def set_desc(self, fid, desc, is_file=True, folder_name: str = '') -> bool:
+        """
+        设置文件(夹)描述
+        @param folder_name: 文件夹名称，设置文件夹描述时需要；为空时从本地索引或分享信息中获取
+        """
+        return self._set_desc(fid, desc, is_file, folder_name).success
+
+    def _folder_name(self, folder_id) -> str:
+        """修改文件夹描述的接口需要同时提交名称：优先使用本地索引，没有时才请求分享信息"""
+
+        if self._index is not None:
+            folder = self._index.get_folder(folder_id)
+            if folder is not None:
+                return folder.name
+        info = self.get_share_info(folder_id, is_file=False)
+        return info.name if info.success else ''
+
+    def _set_desc(self, fid, desc: str, is_file: bool, folder_name: str = '') -> LanZouBatchResult:
+        if not is_file:
+            folder_name = folder_name or self._folder_name(fid)
+            if not folder_name:
+                return LanZouBatchResult(id=fid, request_msg='获取文件夹名称失败')
+
+        post_data = self._desc_form(fid, desc, is_file, folder_name)
+        result = self._batch_result(fid, self._post(self._doupload_url, post_data))
+        if result.success and self._index is not None:
+            self._index.set_desc(fid, desc, is_file)
+        return result
+
+    def set_desc_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            desc: str,
+            is_file: bool = True,
+            folder_names: Optional[Dict[Union[str, int], str]] = None,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """
+        批量设置描述
+
+        设置文件夹描述时需要文件夹名称，依次从传入的 LanZouFolder、folder_names、本地索引中获取，
+        都没有时才逐个请求分享信息；因此最好直接传入 get_dir_list 返回的文件夹。
+
+        @param fids: 文件(夹) id，也可以直接传入列表接口返回的 LanZouFile / LanZouFolder
+        @param desc: 描述
+        @param is_file: 是否是文件；默认为 True
+        @param folder_names: 已知的 文件夹 id -> 名称
+        @param workers: 同时在途的请求数
+        @return: 与输入顺序一致的结果列表
+        """
+
+        names = {str(k): v for k, v in (folder_names or {}).items()}
+        items = []
+        for fid in fids:
+            if isinstance(fid, LanZouFolder):
+                items.append((fid.id, desc, is_file, fid.name))
+            else:
+                fid = getattr(fid, 'id', fid)
+                items.append((fid, desc, is_file, names.get(str(fid), '')))
+        return self._run_batch(self._set_desc, items, workers)
+
+    def _get_file_page(self, folder_id: Union[str, int], page: int) -> dict:
+        """获取文件列表的某一页，失败时抛出 LanZouListError"""
+
+        post_data = {'task': 5, 'folder_id': folder_id, 'pg': page, 'vei': "VFBQUg1fUghQBA9fAFo="}
+        return self._file_page(folder_id, page, self._post(self._doupload_url, post_data))
+
+    def iter_file_list(
+            self,
+            folder_id: Union[str, int] = -1,
+            prefetch: int = 4,
+    ) -> Iterator[LanZouFile]:
+        """
+        逐页获取文件列表，边请求边返回
+
+        同时保持 prefetch 个分页请求在途，按页码顺序逐个返回文件；遇到第一个空页(info == 0)即停止，
+        因此最多会多请求 prefetch - 1 个空页。某一页按重试策略重试后仍失败时抛出 LanZouListError，
+        已经返回的文件不是完整的列表。
+
+        @param folder_id: 文件夹 id，默认为 -1，表示根目录
+        @param prefetch: 同时在途的分页请求数，1 表示逐页串行请求
+        @return: LanZouFile 生成器
+        """
+
+        prefetch = max(1, prefetch)
+        if prefetch == 1:
+            page = 1
+            while True:
+                resp = self._get_file_page(folder_id, page)
+                if resp["info"] == 0:
+                    return  # 已经拿到了全部的文件信息
+                page += 1
+                for file in resp["text"]:
+                    yield self._parse_file(file)
+
+        executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='lanzou_file_list')
+        try:
+            futures = deque(executor.submit(self._get_file_page, folder_id, page)
+                            for page in range(1, prefetch + 1))
+            next_page = prefetch + 1
+            while futures:
+                resp = futures.popleft().result()
+                if resp["info"] == 0:
+                    return  # 已经拿到了全部的文件信息
+
+                # 先补上下一页的请求，再处理当前页，保证始终有 prefetch 个请求在途
+                futures.append(executor.submit(self._get_file_page, folder_id, next_page))
+                next_page += 1
+
+                for file in resp["text"]:
+                    yield self._parse_file(file)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_file_list(self, folder_id: Union[str, int] = -1) -> List[LanZouFile]:
+        """获取文件列表，某一页失败时抛出 LanZouListError"""
+        return list(self.iter_file_list(folder_id, prefetch=1))
+
+    def _list_folder(self, folder_id: Union[str, int]) -> Tuple[List[LanZouFolder], List[LanZouFile]]:
+        """同时获取子文件夹列表和文件列表"""
+        return self.get_dir_list(folder_id), self.get_file_list(folder_id)
+
+    def walk(
+            self,
+            root_folder_id: Union[str, int] = -1,
+            workers: int = 4,
+            max_depth: Optional[int] = None,
+            folder_filter: Optional[Callable[[LanZouFolder], bool]] = None,
+            onerror: Optional[Callable[[str, LanZouFolder, LanZouListError], None]] = None
+    ) -> Iterator[Tuple[str, LanZouFolder, List[LanZouFile]]]:
+        """
+        按层遍历整个网盘(或某个文件夹)的目录树，多个文件夹同时列举
+
+        for path, folder, files in handler.walk(workers=8):
+            print(path, folder.id, len(files))
+
+        @param root_folder_id: 起始文件夹 id，默认为 -1，表示根目录
+        @param workers: 同时列举的文件夹数量
+        @param max_depth: 最大深度，起始文件夹为 0，为空表示不限制
+        @param folder_filter: 过滤函数，参数为 LanZouFolder，返回 False 的文件夹及其子文件夹都会被跳过
+        @param onerror: 列举某个文件夹失败时调用，参数为 (路径, 文件夹, LanZouListError)，之后跳过该文件夹及其子文件夹；
+                        为空时直接抛出 LanZouListError
+        @return: (路径, 文件夹, 文件列表) 生成器，路径形如 /a/b，起始文件夹的路径为 /；返回顺序不固定
+        """
+
+        return self._walk(root_folder_id, workers, max_depth, folder_filter, onerror)
+
+    def _walk(
+            self,
+            root_folder_id: Union[str, int],
+            workers: int,
+            max_depth: Optional[int],
+            folder_filter: Optional[Callable[[LanZouFolder], bool]],
+            onerror: Optional[Callable[[str, LanZouFolder, LanZouListError], None]],
+            gate: Optional[threading.Semaphore] = None
+    ) -> Iterator[Tuple[str, LanZouFolder, List[LanZouFile]]]:
+        """walk 的实现；gate 不为空时，每次列举文件夹都要先获取 gate，用来与其他请求共用并发上限"""
+
+        def _list(folder_id):
+            with gate if gate is not None else nullcontext():
+                return self._list_folder(folder_id)
+
+        root = LanZouFolder(id=root_folder_id, name='', has_pwd=False, desc='')
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='lanzou_walk') as executor:
+            pending = {executor.submit(_list, root_folder_id): ('/', root, 0)}
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, folder, depth = pending.pop(future)
+                    try:
+                        sub_folders, files = future.result()
+                    except LanZouListError as e:
+                        if onerror is None:
+                            raise
+                        onerror(path, folder, e)
+                        continue
+
+                    if max_depth is None or depth < max_depth:
+                        for sub_folder in sub_folders:
+                            if folder_filter is not None and not folder_filter(sub_folder):
+                                continue
+                            sub_path = path.rstrip('/') + '/' + sub_folder.name
+                            pending[executor.submit(_list, sub_folder.id)] = (sub_path, sub_folder, depth + 1)
+
+                    yield path, folder, files
+
+    def iter_shares(
+            self,
+            folder_id: Union[str, int] = -1,
+            recursive: bool = False,
+            workers: int = 8
+    ) -> Iterator[dict]:
+        """
+        逐个返回文件夹中文件的分享链接与提取码，边列举边请求
+
+        文件名直接使用文件列表中的完整文件名，每个文件只请求一次分享信息(task 22)，按列举的顺序返回；
+        递归时列举文件夹与请求分享信息共用同一个并发上限，两者合计最多 workers 个请求同时在途。
+
+        @param folder_id: 文件夹 id，默认为 -1，表示根目录
+        @param recursive: 是否包含子文件夹中的文件
+        @param workers: 同时在途的请求数
+        @return: {'id', 'name', 'url', 'pwd', 'path'} 字典生成器，path 为文件所在的文件夹路径；获取失败时 url 为空
+        """
+
+        workers = max(1, workers)
+        gate = threading.BoundedSemaphore(workers)  # 列举与分享信息共用，合计不超过 workers
+
+        if recursive:
+            walking = self._walk(folder_id, max(1, workers // 2), None, None, None, gate=gate)
+            listing = ((path, file) for path, _, files in walking for file in files)
         else:
-            # 文件夹描述可以置空
-            info = self.get_share_info(fid, is_file=False)
+            def _files() -> Iterator[Tuple[str, LanZouFile]]:
+                page = 1
+                while True:  # 逐页串行获取，每一页同样先获取 gate
+                    with gate:
+                        resp = self._get_file_page(folder_id, page)
+                    if resp["info"] == 0:
+                        return
+                    page += 1
+                    for file in resp["text"]:
+                        yield '/', self._parse_file(file)
+
+            listing = _files()
+
+        def _one(file: LanZouFile) -> LanZouShareInfo:
+            with gate, self._retry_policy.scope():
+                try:
+                    return self._get_share_info(file.id, file_name=file.name)
+                except Exception as e:
+                    return LanZouShareInfo(request_msg=f'发生错误: {e!r}')
+
+        def _row(path: str, file: LanZouFile, info: LanZouShareInfo) -> dict:
             if not info.success:
-                return False
-            return self._set_dir_info(fid, info.name, desc)
+                self.logger.warning(f"获取文件 {file.name}({file.id}) 的分享链接失败: {info.request_msg}")
+            return {'id': file.id, 'name': file.name, 'url': info.url, 'pwd': info.pwd, 'path': path}
 
-    def get_file_list(self, folder_id: Union[str, int] = -1) -> List[LanZouFile]:
-        """获取文件列表"""
-
-        page = 1
-        file_list: List[LanZouFile] = []
-        while True:
-            post_data = {'task': 5, 'folder_id': folder_id, 'pg': page, 'vei': "VFBQUg1fUghQBA9fAFo="}
-            resp = self._post(self._doupload_url, post_data)
-            if not resp:  # 网络异常，重试
-                continue
-            else:
-                resp = resp.json()
-            if resp["info"] == 0:
-                break  # 已经拿到了全部的文件信息
-            else:
-                page += 1  # 下一页
-            # 文件信息处理
-            for file in resp["text"]:
-                file_list.append(LanZouFile(
-                    id=file['id'],
-                    name=file['name_all'].replace("&amp;", "&"),
-                    time=time_format(file['time']),  # 上传时间
-                    size=file['size'].replace(",", ""),  # 文件大小
-                    type=file['name_all'].split('.')[-1],  # 文件类型
-                    downs=file['downs'],  # 下载次数
-                    has_pwd=True if int(file['onof']) == 1 else False,  # 是否存在提取码
-                    has_des=True if int(file['is_des']) == 1 else False  # 是否存在描述
-                ))
-        return file_list
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lanzou_share')
+        try:
+            futures = deque()
+            for path, file in listing:
+                futures.append((path, file, executor.submit(_one, file)))
+                if len(futures) >= workers * 2:  # 只保留有限的在途请求，先返回最早提交的
+                    path, file, future = futures.popleft()
+                    yield _row(path, file, future.result())
+            while futures:
+                path, file, future = futures.popleft()
+                yield _row(path, file, future.result())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
+    def export_shares(
+            self,
+            folder_id: Union[str, int] = -1,
+            output: Union[str, TextIO] = 'shares.jsonl',
+            recursive: bool = False,
+            fmt: Optional[str] = None,
+            workers: int = 8
+    ) -> int:
+        """
+        导出文件夹中所有文件的分享链接，边获取边写入
+
+        handler.export_shares(folder_id, 'shares.csv', recursive=True, workers=16)
+
+        @param folder_id: 文件夹 id，默认为 -1，表示根目录
+        @param output: 输出文件路径，或已打开的文本文件对象
+        @param recursive: 是否包含子文件夹中的文件
+        @param fmt: jsonl 或 csv，为空时根据输出文件的后缀判断，默认为 jsonl
+        @param workers: 同时在途的请求数
+        @return: 写入的行数
+        """
+
+        if fmt is None:
+            name = output if isinstance(output, str) else getattr(output, 'name', '')
+            fmt = 'csv' if str(name).lower().endswith('.csv') else 'jsonl'
+        if fmt not in ('jsonl', 'csv'):
+            raise ValueError(f'不支持的导出格式: {fmt}')
+
+        file = open(output, 'w', encoding='utf-8', newline='') if isinstance(output, str) else output
+        try:
+            fields = ['id', 'name', 'url', 'pwd', 'path']
+            writer = csv.DictWriter(file, fieldnames=fields) if fmt == 'csv' else None
+            if writer is not None:
+                writer.writeheader()
+
+            count = 0
+            for row in self.iter_shares(folder_id, recursive=recursive, workers=workers):
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    file.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+            return count
+        finally:
+            if isinstance(output, str):
+                file.close()
+
+    @operation
     def delete_file_or_folder(self, fid, is_file=True) -> bool:
         """
         把网盘的文件、无子文件夹的文件夹放到回收站
@@ -300,11 +709,87 @@ class LanZouApi(object):
         @return:
         """
 
-        post_data = {'task': 6, 'file_id': fid} if is_file else {'task': 3, 'folder_id': fid}
-        result = self._post(self._doupload_url, post_data)
-        if not result:
-            return False
-        return True if result.json()['zt'] == 1 else False
+        return self._delete(fid, is_file).success
+
+    def _delete(self, fid, is_file: bool) -> LanZouBatchResult:
+        result = self._batch_result(fid, self._post(self._doupload_url, self._delete_form(fid, is_file)))
+        if not result.success:
+            return result
+
+        if self._index is not None:
+            self._index.remove(fid, is_file)
+        if is_file:
+            self._forget_name(fid)
+        else:
+            self.invalidate_name_map(fid)
+        return result
+
+    def delete_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            is_file: bool = True,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """
+        批量把文件、无子文件夹的文件夹放到回收站
+        @param fids: 文件(夹) id，也可以直接传入列表接口返回的 LanZouFile / LanZouFolder
+        @param is_file: 是否是文件；默认为 True
+        @param workers: 同时在途的请求数
+        @return: 与输入顺序一致的结果列表
+        """
+        items = [(getattr(fid, 'id', fid), is_file) for fid in fids]
+        return self._run_batch(self._delete, items, workers)
+
+    def _folder_name_lock(self, folder_id: str) -> threading.Lock:
+        with self._name_map_lock:
+            return self._name_map_locks.setdefault(folder_id, threading.Lock())
+
+    def _get_name_map(self, folder_id: Union[str, int]) -> Dict[str, List[LanZouFile]]:
+        """获取文件夹的 文件名 -> 同名文件列表 映射，不存在或已过期时列举一次文件夹；调用方需持有该文件夹的锁"""
+
+        key = str(folder_id)
+        item = self._name_maps.get(key)
+        if item is not None and time.monotonic() - item[0] < self._name_map_ttl:
+            return item[1]
+
+        name_map: Dict[str, List[LanZouFile]] = {}
+        for file_obj in self.iter_file_list(folder_id):
+            name_map.setdefault(file_obj.name, []).append(file_obj)
+
+        self._name_maps[key] = (time.monotonic(), name_map)
+        return name_map
+
+    def invalidate_name_map(self, folder_id: Union[str, int, None] = None):
+        """
+        使同名文件映射失效，下一次上传时重新列举文件夹；在其他途径修改了网盘文件后调用
+        @param folder_id: 文件夹 id，为空表示清空所有文件夹的映射
+        """
+        with self._name_map_lock:
+            if folder_id is None:
+                self._name_maps.clear()
+            else:
+                self._name_maps.pop(str(folder_id), None)
+
+    def _forget_name(self, fid: Union[str, int]):
+        """文件被删除后，从各个文件夹的映射中移除"""
+        fid = str(fid)
+        with self._name_map_lock:
+            folder_ids = list(self._name_maps.keys())
+
+        for folder_id in folder_ids:
+            with self._folder_name_lock(folder_id):
+                item = self._name_maps.get(folder_id)
+                if item is None:
+                    continue
+                name_map = item[1]
+                for name, file_objs in list(name_map.items()):
+                    remain = [f for f in file_objs if str(f.id) != fid]
+                    if len(remain) != len(file_objs):
+                        if remain:
+                            name_map[name] = remain
+                        else:
+                            name_map.pop(name, None)
+                        return
 
     def __upload_small_file(
             self,
@@ -312,13 +797,15 @@ class LanZouApi(object):
             folder_id: Union[str, int] = -1,
             *, callback: Optional[Callable] = None,
             need_delete: bool = False,
-            uploaded_handler: Optional[Callable] = None
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace'
     ) -> List[LanZouFile]:
         """
         上传不超过 max_size 的文件
         @param file_path: 本地文件路径
         @param folder_id: 文件夹 id，默认为 -1，表示根目录
         @param need_delete: 上传完成是否删除
+        @param overwrite: 存在同名文件时的处理方式，replace 删除同名文件后上传，skip 不上传并返回已有文件，keep 保留两者
         @param callback: 上传进度回调函数，参数为已上传大小，单位为字节
         @param uploaded_handler: 上传完成后的回调函数，参数为文件信息对象，返回值为是否删除文件
         @return:
@@ -334,94 +821,335 @@ class LanZouApi(object):
             self.logger.warning(f"文件 {file_path} 的后缀不允许上传，请使用其他后缀重新命名")
             return file_obj_list
 
-        # 文件已经存在同名文件就删除
-        filename = name_format(os.path.basename(file_path))
-        file_list = self.get_file_list(folder_id)
+        self.logger.debug(f'正在上传文件: 【{file_path}】')
+        with open_upload_body(file_path) as body:  # mmap 映射文件，不经过文件对象 8 KB 的缓冲区
+            file_obj_list = self._upload_fileobj(
+                body, os.path.basename(file_path), folder_id,
+                mime_type=get_mime_type(file_path), callback=callback,
+                uploaded_handler=uploaded_handler, overwrite=overwrite
+            )
 
-        for file_obj in file_list:
-            if file_obj.name == filename:
-                self.logger.info(f"文件 {file_path} 已存在同名文件，删除同名文件")
-                self.delete_file_or_folder(file_obj.id)
+        if file_obj_list and need_delete:
+            os.remove(file_path)
+        return file_obj_list
 
-        # MultipartEncoderMonitor 每上传 8129 bytes数据调用一次回调函数，问题根源是 httplib 库
-        # issue : https://github.com/requests/toolbelt/issues/75
-        # 上传完成后，回调函数会被错误的多调用一次(强迫症受不了)。因此，下面重新封装了回调函数，修改了接受的参数，并阻断了多余的一次调用
-        self._upload_finished_flag = False  # 上传完成的标志
+    def _upload_fileobj(
+            self,
+            fileobj,
+            filename: str,
+            folder_id: Union[str, int] = -1,
+            *, mime_type: Optional[str] = None,
+            callback: Optional[Callable] = None,
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace'
+    ) -> List[LanZouFile]:
+        """
+        上传一个可读对象，MultipartEncoder 需要能通过 len() 或 fileno() 得到其长度
+        @param fileobj: 可读对象，例如打开的文件、FileSlice
+        @param filename: 上传后的文件名
+        @param folder_id: 文件夹 id
+        @param mime_type: 文件的 MIME 类型
+        @return:
+        """
 
-        def _call_back(read_monitor):
-            if callback is not None:
-                if not self._upload_finished_flag:
-                    callback(filename, read_monitor.len, read_monitor.bytes_read)
-                if read_monitor.len == read_monitor.bytes_read:
-                    self._upload_finished_flag = True
+        file_obj_list: List[LanZouFile] = []
 
-        self.logger.debug(f'正在上传文件: 【{file_path}】')
-        last_modified_date = datetime.now().strftime('%a %b %d %Y %H:%M:%S GMT%z (%Z)')
-
-        with open(file_path, 'rb') as file:
-            post_data = {
-                "task": "1",
-                "vie": "2",
-                "ve": "2",
-                "id": "WU_FILE_0",
-                "name": filename,
-                'type': get_mime_type(file_path),
-                'lastModifiedDate': last_modified_date,
-                "folder_id_bb_n": str(folder_id),
-                "upload_file": (filename, file, 'application/octet-stream')
-            }
+        if overwrite not in ('replace', 'skip', 'keep'):
+            self.logger.warning(f"overwrite 参数错误，只能是 replace、skip 或 keep，当前为 {overwrite}")
+            return file_obj_list
+
+        filename = name_format(filename)
+
+        # 同一个文件夹只在第一次上传(或映射过期)时列举一次，之后随上传、删除增量更新
+        if overwrite != 'keep':
+            try:
+                with self._folder_name_lock(str(folder_id)):
+                    same_name_files = list(self._get_name_map(folder_id).get(filename, []))
+            except LanZouListError as e:
+                self.logger.warning(f"{e}，无法检查同名文件，取消上传 {filename}")
+                return file_obj_list
+
+            if same_name_files and overwrite == 'skip':
+                self.logger.info(f"文件 {filename} 已存在同名文件，跳过上传")
+                return same_name_files
+
+            for file_obj in same_name_files:  # 文件已经存在同名文件就删除
+                self.logger.info(f"文件 {filename} 已存在同名文件，删除同名文件")
+                self.delete_file_or_folder(file_obj.id)
 
-            post_data = MultipartEncoder(post_data)
-            tmp_header = self._headers.copy()
-            tmp_header['Content-Type'] = post_data.content_type
+        # 进度回调按时间(或字节数)合并，发送完成时只调用一次；回调状态在 EncoderStream 上，多个线程同时上传时互不影响
+        def _progress(bytes_sent, total):
+            callback(filename, total, bytes_sent)
 
-            monitor = MultipartEncoderMonitor(post_data, _call_back)
-            result = self._post('https://pc.woozooo.com/html5up.php', data=monitor, headers=tmp_header, timeout=3600)
+        post_data = MultipartEncoder(self._upload_form(filename, folder_id, fileobj, mime_type))
+        tmp_header = self._headers.copy()
+        tmp_header['Content-Type'] = post_data.content_type
+
+        stream = EncoderStream(
+            post_data, self._upload_block_size,
+            progress=_progress if callback is not None else None,
+            interval=self._progress_interval, step=self._progress_step
+        )
+        result = self._post(self._upload_url, data=stream, headers=tmp_header, timeout=3600)
+        self._record_upload(stream)
 
         if not result:  # 网络异常
             return file_obj_list
 
         try:
-            resp_json = result.json()
-
-            if resp_json["zt"] != 1:
-                self.logger.debug(f'文件上传失败，响应数据是：【{result.text}】')
+            file_obj_list = self._parse_uploaded(result)
+            if not file_obj_list:
                 return file_obj_list  # 上传失败
 
-            file_info_list = resp_json["text"]
-
-            for file_dict in file_info_list:
-                obj = LanZouFile(
-                    id=file_dict.get("id"),
-                    name=file_dict.get("name"),
-                    time=file_dict.get('time'),  # 上传时间
-                    size=file_dict.get('size'),  # 文件大小
-                    type=file_dict.get("icon"),  # 文件类型
-                    downs=file_dict.get("downs"),  # 下载次数
-                    has_pwd=False,  # 是否存在提取码
-                    has_des=False,  # 是否存在描述
-                )
-                file_obj_list.append(obj)
-
             self.logger.info('上传文件成功')
 
+            with self._folder_name_lock(str(folder_id)):
+                item = self._name_maps.get(str(folder_id))
+                if item is not None:
+                    for obj in file_obj_list:
+                        item[1].setdefault(obj.name, []).append(obj)
+
+            if self._index is not None:
+                for obj in file_obj_list:
+                    self._index.add_file(folder_id, obj)
+
             if uploaded_handler is not None and callable(uploaded_handler):
                 for obj in file_obj_list:
                     uploaded_handler(obj.id, is_file=True)  # 对已经上传的文件再进一步处理
-
-            if need_delete:
-                os.remove(file_path)
         except:
             self.logger.error('上传文件时发生错误', exc_info=True)
         finally:
             return file_obj_list
 
+    def upload_split_file(
+            self,
+            file_path: str,
+            folder_id: Union[str, int] = -1,
+            *, part_size: int = 0,
+            workers: int = 4,
+            callback: Optional[Callable] = None,
+            uploaded_handler: Optional[Callable] = None
+    ) -> List[LanZouFile]:
+        """
+        分块上传大文件
+
+        在 folder_id 下创建与文件同名的文件夹，把文件切成若干数据块并发上传到该文件夹，
+        最后上传清单文件(文件名.manifest.txt)，记录数据块的顺序、大小、sha256 和分享链接。
+        使用 download_split_file 可以根据清单还原文件。
+
+        @param file_path: 本地文件路径
+        @param folder_id: 存放数据块文件夹的父文件夹 id
+        @param part_size: 数据块大小(字节)，默认为单文件上限的 90%
+        @param workers: 同时上传的数据块数量
+        @param callback: 上传进度回调函数，参数为 (文件名, 文件总大小, 已上传大小)，汇总了所有数据块的进度
+        @param uploaded_handler: 上传完成后的回调函数，参数为清单文件 id
+        @return: 清单文件信息，失败时为空列表
+        """
+
+        filename = name_format(os.path.basename(file_path))
+        total_size = os.path.getsize(file_path)
+        part_size = part_size or self._max_size * 1048576 * 9 // 10
+        if not 0 < part_size <= self._max_size * 1048576:
+            self.logger.warning(f"数据块大小必须大于 0 且不能超过 {self._max_size} MB")
+            return []
+
+        if not is_name_valid(part_name(filename, 1)):
+            self.logger.warning(f"文件 {file_path} 的数据块名称不允许上传，请重新命名")
+            return []
+
+        parts_folder = self.mkdir(folder_id, filename, desc='分块上传的数据块，请勿单独修改')
+        if parts_folder is None:
+            self.logger.error(f"创建数据块文件夹失败，文件 {file_path} 上传失败")
+            return []
+
+        progress_lock = threading.Lock()
+        uploaded = {}
+        progress = {'done': 0}  # 所有数据块已上传的字节数，随回调增量累加，不必每次对所有数据块求和
+
+        def _part_callback(index, length):
+            def _inner(_name, _total, now_size):
+                if callback is None:
+                    return
+                now_size = min(now_size, length)  # now_size 包含 multipart 的表单字段，不能超过数据块大小
+                with progress_lock:  # 在锁内回调，调用方看到的进度不会倒退
+                    progress['done'] += now_size - uploaded.get(index, 0)
+                    uploaded[index] = now_size
+                    callback(filename, total_size, progress['done'])
+
+            return _inner
+
+        def _upload_part(index, offset, length) -> Optional[dict]:
+            name = part_name(filename, index)
+            sha256 = file_sha256(file_path, offset, length)
+            with FileSlice(file_path, offset, length) as part:
+                files = self._upload_fileobj(part, name, parts_folder.id, callback=_part_callback(index, length))
+            if not files:
+                return None
+
+            info = self._get_share_info(files[0].id, file_name=name)  # 文件名已知，不必再请求文件名与描述
+            return {
+                'index': index, 'name': name, 'offset': offset, 'size': length, 'sha256': sha256,
+                'id': files[0].id, 'url': info.url, 'pwd': info.pwd,
+            }
+
+        ranges = split_ranges(total_size, part_size)
+        self.logger.info(f"文件 {file_path} 分为 {len(ranges)} 个数据块上传")
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='lanzou_split_upload') as executor:
+            parts = list(executor.map(lambda args: _upload_part(*args),
+                                      [(i + 1, offset, length) for i, (offset, length) in enumerate(ranges)]))
+
+        if not all(parts):
+            failed = [i + 1 for i, part in enumerate(parts) if not part]
+            self.logger.error(f"文件 {file_path} 的数据块 {failed} 上传失败")
+            return []
+
+        content = build_manifest(filename, total_size, part_size, parts)
+        manifest = self._upload_fileobj(io.BytesIO(content), manifest_name(filename), parts_folder.id,
+                                        mime_type='text/plain', uploaded_handler=uploaded_handler)
+        if not manifest:
+            self.logger.error(f"文件 {file_path} 的清单上传失败")
+        return manifest
+
+    def download_split_file(self, manifest_url: str, save_path: str, pwd: str = '', workers: int = 4) -> bool:
+        """
+        根据清单下载分块上传的文件，并校验每个数据块的 sha256
+        @param manifest_url: 清单文件的分享链接
+        @param save_path: 保存路径
+        @param pwd: 清单文件的提取码
+        @param workers: 同时下载的数据块数量
+        @return: 是否成功
+        """
+
+        direct_url = self.get_direct_url_by_url(manifest_url, pwd)
+        if not direct_url:
+            self.logger.error(f"获取清单 {manifest_url} 的直链失败")
+            return False
+
+        resp = self._get(direct_url, need_check_cookie=False, stage='split_manifest')
+        try:
+            if not resp:
+                raise ValueError('请求失败')
+            manifest = parse_manifest(resp.content)
+        except ValueError as e:
+            self.logger.error(f"下载清单 {manifest_url} 失败: {e!r}")
+            return False
+
+        with open(save_path, 'wb') as file:
+            file.truncate(manifest['size'])  # 预先分配空间，各数据块直接写入对应位置
+
+        def _download_part(part) -> bool:
+            def _resolve_url(expired: bool) -> str:
+                if not expired:
+                    return self.get_direct_url_by_url(part['url'], part['pwd'])
+                return self._get_file_info_by_url(part['url'], part['pwd']).direct_url  # 绕过缓存
+
+            # 与 download 一样交给 RangeDownloader：按重试策略重试、直链过期时刷新、中断后可以继续
+            part_path = f"{save_path}.part{part['index']}"
+            downloader = RangeDownloader(
+                self._session, _resolve_url, part_path, connections=1,
+                headers={'User-Agent': self._headers['User-Agent'], 'Accept-Language': self._headers['Accept-Language']},
+                timeout=self._timeout, retry_policy=self._retry_policy, logger=self.logger,
+            )
+            try:
+                if not downloader.run():
+                    self.logger.error(f"下载数据块 {part['name']} 失败")
+                    return False
+            except (requests.RequestException, RuntimeError) as e:
+                self.logger.error(f"下载数据块 {part['name']} 失败: {e!r}")
+                return False
+
+            try:
+                if file_sha256(part_path) != part['sha256']:
+                    self.logger.error(f"数据块 {part['name']} 校验失败")
+                    return False
+                with open(part_path, 'rb') as src, open(save_path, 'r+b') as dst:
+                    dst.seek(part['offset'])
+                    while True:
+                        chunk = src.read(1048576)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+            finally:
+                os.remove(part_path)  # 校验失败的数据块下次重新下载
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='lanzou_split_download') as executor:
+            results = list(executor.map(_download_part, manifest['parts']))
+
+        if not all(results):
+            return False
+        self.logger.info(f"文件 {manifest['name']} 下载完成: {save_path}")
+        return True
+
+    def download(
+            self,
+            share_url_or_file_id: Union[str, int],
+            save_path: str,
+            pwd: str = '',
+            *, connections: int = 4,
+            segment_size: int = 8 * 1048576,
+            callback: Optional[Callable] = None
+    ) -> bool:
+        """
+        多连接分段下载文件
+
+        文件按 segment_size 分段，connections 个连接同时下载，直接写入目标文件的对应位置；
+        进度保存在 保存路径.lzdl 中，中断后再次调用会继续下载；下载过程中直链过期会自动重新获取。
+
+        @param share_url_or_file_id: 分享链接，或登录用户自己的文件 id
+        @param save_path: 保存路径，为已存在的目录时使用网盘中的文件名
+        @param pwd: 提取码，传入文件 id 时不需要
+        @param connections: 同时下载的连接数
+        @param segment_size: 每段大小(字节)
+        @param callback: 下载进度回调函数，参数为 (文件名, 文件总大小, 已下载大小)
+        @return: 是否下载成功
+        """
+
+        share_url = str(share_url_or_file_id)
+        if not share_url.startswith('http'):
+            info = self.get_share_info(share_url_or_file_id, is_file=True)
+            if not info.success:
+                self.logger.error(f"获取文件 {share_url_or_file_id} 的分享链接失败: {info.request_msg}")
+                return False
+            share_url, pwd = info.url, info.pwd
+
+        detail = self.get_file_info_by_url(share_url, pwd)
+        if not detail.direct_url:
+            self.logger.error(f"获取 {share_url} 的直链失败: {detail.request_info}")
+            return False
+
+        if os.path.isdir(save_path):
+            save_path = os.path.join(save_path, name_format(detail.name))
+
+        def _resolve_url(expired: bool) -> str:
+            if not expired:
+                return detail.direct_url
+            fresh = self._get_file_info_by_url(share_url, pwd)  # 绕过缓存，缓存里的就是过期的直链
+            if fresh.direct_url and self._url_cache is not None:
+                self._url_cache.set(share_url, pwd, fresh)
+            return fresh.direct_url
+
+        downloader = RangeDownloader(
+            self._session, _resolve_url, save_path,
+            connections=connections, segment_size=segment_size,
+            headers={'User-Agent': self._headers['User-Agent'], 'Accept-Language': self._headers['Accept-Language']},
+            timeout=self._timeout, retry_policy=self._retry_policy, callback=callback, logger=self.logger,
+        )
+        if not downloader.run():
+            self.logger.error(f"下载 {share_url} 失败，再次调用可以继续下载")
+            return False
+
+        self.logger.info(f"下载完成: {save_path}")
+        return True
+
     def upload_file(
             self,
             file_path,
             folder_id=-1,
             *, callback: Optional[Callable] = None,
-            uploaded_handler: Optional[Callable] = None
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace',
+            split: bool = False
     ) -> Optional[List[LanZouFile]]:
 
         """
@@ -440,6 +1168,8 @@ class LanZouApi(object):
         @param folder_id:
         @param callback: 用于显示上传进度的回调函数
         @param uploaded_handler: uploaded_handler 用于进一步处理上传完成后的文件, 对大文件而已是处理文件夹(数据块默认关闭密码)
+        @param overwrite: 存在同名文件时的处理方式: replace(默认) 删除同名文件后上传; skip 跳过上传，返回已有文件; keep 保留两者
+        @param split: 文件超过 max_size 时是否分块上传，参见 upload_split_file
         @return:
         """
 
@@ -449,10 +1179,180 @@ class LanZouApi(object):
 
             # 单个文件不超过 max_size 直接上传
         if os.path.getsize(file_path) <= self._max_size * 1048576:
-            return self.__upload_small_file(file_path, folder_id, callback=callback, uploaded_handler=uploaded_handler)
+            return self.__upload_small_file(file_path, folder_id, callback=callback, uploaded_handler=uploaded_handler,
+                                            overwrite=overwrite)
+
+        if split:
+            return self.upload_split_file(file_path, folder_id, callback=callback, uploaded_handler=uploaded_handler)
+
+        self.logger.warning(f"文件 {file_path} 大小超过 {self._max_size} MB，无法直接上传，可以设置 split=True 分块上传")
+
+    def upload_stream(
+            self,
+            source: UploadSource,
+            name: str,
+            size: Optional[int] = None,
+            folder_id: Union[str, int] = -1,
+            *, callback: Optional[Callable] = None,
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace'
+    ) -> List[LanZouFile]:
+        """
+        上传内存中的数据、文件对象或生成器，不需要先写入临时文件
+
+        handler.upload_stream(b'...', 'report.zip')
+        handler.upload_stream(proc.stdout, 'build.zip', size=expected_size)  # 管道需要指定长度
+        handler.upload_stream(iter_chunks(), 'data.zip', size=total)  # 逐块产生 bytes 的生成器
+
+        @param source: bytes / bytearray / memoryview / mmap、BytesIO、可读的文件对象、逐块产生 bytes 的可迭代对象或本地文件路径
+        @param name: 上传后的文件名，后缀必须是允许上传的格式
+        @param size: 数据长度；管道、生成器等无法预先得到长度的数据源需要指定，否则会先全部读入内存
+        @param folder_id: 文件夹 id，默认为 -1，表示根目录
+        @param callback: 上传进度回调函数，参数为 (文件名, 总大小, 已上传大小)
+        @param uploaded_handler: 上传完成后的回调函数
+        @param overwrite: 存在同名文件时的处理方式，同 upload_file
+        @return: 上传成功的文件信息，失败时为空列表
+        """
+
+        if not is_name_valid(name):
+            self.logger.warning(f"文件 {name} 的后缀不允许上传，请使用其他后缀重新命名")
+            return []
 
-        self.logger.warning(f"文件 {file_path} 大小超过 {self._max_size} MB，无法直接上传")
+        with open_upload_body(source, size) as body:
+            if body.size > self._max_size * 1048576:
+                self.logger.warning(f"文件 {name} 大小超过 {self._max_size} MB，无法直接上传")
+                return []
 
+            self.logger.debug(f'正在上传文件: 【{name}】')
+            return self._upload_fileobj(
+                body, name, folder_id,
+                mime_type=get_mime_type(name), callback=callback,
+                uploaded_handler=uploaded_handler, overwrite=overwrite
+            )
+
+    def upload_tree(
+            self,
+            local_dir: str,
+            remote_folder_id: Union[str, int] = -1,
+            *, workers: int = 4,
+            journal_path: str = '',
+            callback: Optional[Callable] = None,
+            overwrite: str = 'replace'
+    ) -> dict:
+        """
+        上传整个本地目录，在网盘中创建对应的文件夹结构，多个文件同时上传
+
+        def callback(file_name, total_size, now_size):
+            # file_name 为刚刚报告进度的文件(相对路径)，total_size、now_size 为整个目录的总大小和已上传大小
+            print(f"\r{now_size}/{total_size}", end='')
+
+        @param local_dir: 本地目录
+        @param remote_folder_id: 网盘中的目标文件夹 id，本地目录下的内容会上传到该文件夹下
+        @param workers: 同时上传的文件数
+        @param journal_path: 断点续传记录文件，为空表示使用 local_dir 下的 .lanzou_upload.journal；
+                             重新运行时会跳过记录中已完成的文件
+        @param callback: 汇总后的上传进度回调函数
+        @param overwrite: 存在同名文件时的处理方式，参见 upload_file
+        @return: {'uploaded': 上传的文件数, 'skipped': 跳过的文件数, 'failed': [上传失败的相对路径]}；
+                 远程文件夹创建失败时，该目录(包括子目录)中的文件都在 failed 中
+        """
+
+        local_dir = os.path.abspath(local_dir)
+        journal_path = journal_path or os.path.join(local_dir, '.lanzou_upload.journal')
+        summary = {'uploaded': 0, 'skipped': 0, 'failed': []}
+
+        # 收集待上传的文件，并按层创建远程文件夹；同一个父文件夹只列举一次
+        remote_ids = {'': remote_folder_id}
+        existing: Dict[str, Dict[str, LanZouFolder]] = {}
+        tasks = []
+
+        for dir_path, dir_names, file_names in os.walk(local_dir):
+            dir_names.sort()
+            rel_dir = os.path.relpath(dir_path, local_dir).replace(os.sep, '/')
+            rel_dir = '' if rel_dir == '.' else rel_dir
+            parent_id = remote_ids.get(rel_dir)
+            if parent_id is None:
+                # 远程文件夹没有创建成功，目录下的文件都无法上传；继续遍历子目录，把整个子树的文件都记为失败
+                summary['failed'].extend(
+                    f'{rel_dir}/{file_name}'.lstrip('/') for file_name in sorted(file_names)
+                    if os.path.abspath(os.path.join(dir_path, file_name)) != os.path.abspath(journal_path)
+                )
+                continue
+
+            for dir_name in dir_names:
+                key = str(parent_id)
+                if key not in existing:
+                    try:
+                        existing[key] = {f.name: f for f in self.get_dir_list(parent_id)}
+                    except LanZouListError as e:
+                        self.logger.error(f"{e}，目录 {rel_dir or '/'} 的子目录中的文件都记为失败")
+                        break
+                folder = existing[key].get(name_format(dir_name)) or self._create_folder(parent_id, name_format(dir_name))
+                if folder is None:
+                    self.logger.error(f"创建文件夹 {dir_name} 失败，该目录中的文件都记为失败")
+                    continue
+                remote_ids[f'{rel_dir}/{dir_name}'.lstrip('/')] = folder.id
+
+            for file_name in sorted(file_names):
+                file_path = os.path.join(dir_path, file_name)
+                if os.path.abspath(file_path) == os.path.abspath(journal_path):
+                    continue
+                stat = os.stat(file_path)
+                tasks.append((f'{rel_dir}/{file_name}'.lstrip('/'), file_path, parent_id, stat.st_size, stat.st_mtime))
+
+        total_size = sum(task[3] for task in tasks)
+        progress_lock = threading.Lock()
+        progress: Dict[str, int] = {}
+        running = {'done': 0}  # 所有文件已上传的字节数，增量累加；文件很多时不必每次回调都对全部文件求和
+
+        def _report(rel_path, now_size):
+            if callback is None:
+                return
+            with progress_lock:  # 在锁内回调，调用方看到的进度不会倒退
+                running['done'] += now_size - progress.get(rel_path, 0)
+                progress[rel_path] = now_size
+                callback(rel_path, total_size, running['done'])
+
+        with UploadJournal(journal_path) as journal:
+
+            def _upload_one(rel_path, file_path, folder_id, size, mtime):
+                if journal.is_done(rel_path, size, mtime):
+                    _report(rel_path, size)
+                    return 'skipped'
+
+                files = self.upload_file(
+                    file_path, folder_id, overwrite=overwrite,
+                    split=size > self._max_size * 1048576,
+                    callback=lambda _name, _total, now_size: _report(rel_path, min(now_size, size)),
+                )
+                if not files:
+                    return 'failed'
+
+                _report(rel_path, size)
+                journal.record(rel_path, size, mtime, [f.id for f in files])
+                return 'uploaded'
+
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='lanzou_upload_tree') as executor:
+                futures = {executor.submit(_upload_one, *task): task[0] for task in tasks}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"上传文件 {futures[future]} 时发生错误: {e!r}")
+                        result = 'failed'
+
+                    if result == 'failed':
+                        summary['failed'].append(futures[future])
+                    else:
+                        summary[result] += 1
+
+        self.logger.info(
+            f"目录 {local_dir} 上传完成，上传 {summary['uploaded']} 个，跳过 {summary['skipped']} 个，"
+            f"失败 {len(summary['failed'])} 个"
+        )
+        return summary
+
+    @operation
     def logout(self) -> bool:
         """
         登陆失败
@@ -464,180 +1364,90 @@ class LanZouApi(object):
             self.logger.error('退出登陆失败')
             return False
 
-        # 重置请求session
-        self._session = requests.Session()
+        # 只清空 cookie，不替换 session：其他线程可能正在使用它，连接池也可以继续复用
+        self._session.cookies.clear()
+        self._session_valid = True
+        self.invalidate_name_map()
 
         self.logger.info('成功退出登陆')
         return True if '退出系统成功' in html.text else False
 
+    @operation
     def get_file_info_by_url(self, share_url, pwd='') -> LanZouFileDetail:
         """
-        获取文件各种信息(包括下载直链)
+        获取文件各种信息(包括下载直链)，设置了 url_cache 时优先读取缓存
         :param share_url: 文件分享链接
         :param pwd: 文件提取码(如果有的话)
         """
 
-        if not is_file_url(share_url):  # 非文件链接返回错误
-            return LanZouFileDetail(request_info='URL错误', share_pwd=pwd, share_url=share_url)
+        if self._url_cache is None:
+            return self._get_file_info_by_url(share_url, pwd)
+
+        detail = self._url_cache.get(share_url, pwd, need_info=True)
+        if detail is not None:
+            return detail
 
-        first_page = self._get(share_url, need_check_cookie=False)  # 文件分享页面(第一页)
-        if not first_page:
-            return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
+        detail = self._get_file_info_by_url(share_url, pwd)
+        self._url_cache.set(share_url, pwd, detail)
+        return detail
 
-        if "acw_sc__v2" in first_page.text:
-            # 在页面被过多访问或其他情况下，有时候会先返回一个加密的页面，其执行计算出一个acw_sc__v2后放入页面后再重新访问页面才能获得正常页面
-            # 若该页面进行了js加密，则进行解密，计算acw_sc__v2，并加入cookie
-            acw_sc__v2 = calc_acw_sc__v2(first_page.text)
-            self._session.cookies.set("acw_sc__v2", acw_sc__v2)
-            self.logger.debug(f"Set Cookie: acw_sc__v2={acw_sc__v2}")
-            first_page = self._get(share_url, need_check_cookie=False)  # 文件分享页面(第一页)
-            if not first_page:
-                return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
+    @operation
+    def begin_file_info(self, share_url, pwd='') -> Union[LanZouFileDetail, LanZouCaptchaWait]:
+        """
+        解析直链的前半段，遇到验证码时不等待，直接返回 LanZouCaptchaWait，
+        调用方可以先处理其他链接，到 ready_at 之后再调用 finish_file_info；get_file_info_by_url 相当于两者连续调用
+        :param share_url: 文件分享链接
+        :param pwd: 文件提取码(如果有的话)
+        """
 
-        first_page = remove_notes(first_page.text)  # 去除网页里的注释
+        if self._url_cache is not None:
+            detail = self._url_cache.get(share_url, pwd, need_info=True)
+            if detail is not None:
+                return detail
 
-        if '文件取消' in first_page or '文件不存在' in first_page:
-            return LanZouFileDetail(request_info='文件已取消分享', share_pwd=pwd, share_url=share_url)
+        result = self._resolve_until_captcha(share_url, pwd)
+        if self._url_cache is not None and isinstance(result, LanZouFileDetail):
+            self._url_cache.set(share_url, pwd, result)
+        return result
 
-        # 这里获取下载直链 304 重定向前的链接
-        try:
-            if 'id="pwdload"' in first_page or 'id="passwddiv"' in first_page:  # 文件设置了提取码时
-                if len(pwd) == 0:
-                    # 没给提取码直接退出
-                    return LanZouFileDetail(
-                        request_info='文件密码错误', share_pwd=pwd,
-                        share_url=share_url
-                    )
-
-                    # data : 'action=downprocess&sign=AGZRbwEwU2IEDQU6BDRUaFc8DzxfMlRjCjTPlVkWzFSYFY7ATpWYw_c_c&p='+pwd,
-                sign = re.search(r"var skdklds = '(.*?)';", first_page).group(1)
-                post_data = {'action': 'downprocess', 'sign': sign, 'p': pwd}
-                link_info = self._post(self._host_url + '/ajaxm.php', post_data)  # 保存了重定向前的链接信息和文件名
-                second_page = self._get(share_url, need_check_cookie=False)  # 再次请求文件分享页面，可以看见文件名，时间，大小等信息(第二页)
-                if not link_info or not second_page.text:
-                    return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
-                link_info = link_info.json()
-                second_page = remove_notes(second_page.text)
-                # 提取文件信息
-                f_name = link_info['inf'].replace("*", "_")
-                f_size = re.search(r'大小.+?(\d[\d.,]+\s?[BKM]?)<', second_page)
-                f_size = f_size.group(1).replace(",", "") if f_size else '0 M'
-                f_time = re.search(r'class="n_file_infos">(.+?)</span>', second_page)
-                f_time = time_format(f_time.group(1)) if f_time else time_format('0 小时前')
-                f_desc = re.search(r'class="n_box_des">(.*?)</div>', second_page)
-                f_desc = f_desc.group(1) if f_desc else ''
-            else:  # 文件没有设置提取码时,文件信息都暴露在分享页面上
-                para = re.search(r'<iframe.*?src="(.+?)"', first_page).group(1)  # 提取下载页面 URL 的参数
-                # 文件名位置变化很多
-                f_name = re.search(r"<title>(.+?) - 蓝奏云</title>", first_page) or \
-                         re.search(r'<div class="filethetext".+?>([^<>]+?)</div>', first_page) or \
-                         re.search(r'<div style="font-size.+?>([^<>].+?)</div>', first_page) or \
-                         re.search(r"var filename = '(.+?)';", first_page) or \
-                         re.search(r'id="filenajax">(.+?)</div>', first_page) or \
-                         re.search(r'<div class="b"><span>([^<>]+?)</span></div>', first_page)
-                f_name = f_name.group(1).replace("*", "_") if f_name else "未匹配到文件名"
-                # 匹配文件时间，文件没有时间信息就视为今天，统一表示为 2020-01-01 格式
-                f_time = re.search(r'>(\d+\s?[秒天分小][钟时]?前|[昨前]天\s?[\d:]+?|\d+\s?天前|\d{4}-\d\d-\d\d)<',
-                                   first_page)
-                f_time = time_format(f_time.group(1)) if f_time else time_format('0 小时前')
-                # 匹配文件大小
-                f_size = re.search(r'大小.+?(\d[\d.,]+\s?[BKM]?)<', first_page)
-                f_size = f_size.group(1).replace(",", "") if f_size else '0 M'
-                f_desc = re.search(r'文件描述.+?<br>\n?\s*(.*?)\s*</td>', first_page)
-                f_desc = f_desc.group(1) if f_desc else ''
-                first_page = self._get(self._host_url + para, need_check_cookie=False)
-                if not first_page:
-                    return LanZouFileDetail(
-                        request_info='网络错误',
-                        name=f_name, time=f_time,
-                        size=f_size, desc=f_desc,
-                        share_pwd=pwd, share_url=share_url
-                    )
-
-                first_page = remove_notes(first_page.text)
-                # 一般情况 sign 的值就在 data 里，有时放在变量后面
-                sign = re.search(r"'sign':(.+?),", first_page).group(1)
-                if len(sign) < 20:  # 此时 sign 保存在变量里面, 变量名是 sign 匹配的字符
-                    sign = re.search(rf"var {sign}\s*=\s*'(.+?)';", first_page).group(1)
-                post_data = {'action': 'downprocess', 'sign': sign, 'ves': 1}
-
-                # 某些特殊情况 share_url 会出现 webpage 参数, post_data 需要更多参数
-                # https://github.com/zaxtyson/LanZouCloud-API/issues/74
-                # https://github.com/zaxtyson/LanZouCloud-API/issues/81
-                if "?webpage=" in share_url:
-                    ajax_data = re.search(r"var ajaxdata\s*=\s*'(.+?)';", first_page).group(1)
-                    web_sign = re.search(r"var a?websigna?\s*=\s*'(.+?)';", first_page).group(1)
-                    web_sign_key = re.search(r"var c?websignkeyc?\s*=\s*'(.+?)';", first_page).group(1)
-                    post_data = {'action': 'downprocess', 'signs': ajax_data, 'sign': sign, 'ves': 1,
-                                 'websign': web_sign, 'websignkey': web_sign_key}
-
-                link_info = self._post(self._host_url + '/ajaxm.php', post_data)
-                if not link_info:
-                    return LanZouFileDetail(
-                        request_info='网络错误',
-                        time=f_time, size=f_size,
-                        desc=f_desc, name=f_name,
-                        share_pwd=pwd, share_url=share_url
-                    )
-                link_info = link_info.json()
-        except AttributeError as e:  # 正则匹配失败
-            self.logger.error(e, exc_info=True)
-            return LanZouFileDetail(request_info='直链获取失败', )
-
-        # 这里开始获取文件直链
-        if link_info['zt'] != 1:  # 返回信息异常，无法获取直链
-            return LanZouFileDetail(
-                request_info='直链获取失败',
-                name=f_name, time=f_time,
-                size=f_size, desc=f_desc,
-                share_pwd=pwd,
-                share_url=share_url
-            )
+    @operation
+    def finish_file_info(self, pending: LanZouCaptchaWait) -> LanZouFileDetail:
+        """
+        提交 begin_file_info 返回的验证码，获取下载直链；未到 ready_at 时先等待剩余的时间
+        :param pending: begin_file_info 的返回值
+        """
 
-        fake_url = link_info['dom'] + '/file/' + link_info['url']  # 假直连，存在流量异常检测
-        download_page = self._get(fake_url, need_check_cookie=False, allow_redirects=False)
-        if not download_page:
-            return LanZouFileDetail(
-                request_info='网络错误',
-                name=f_name, time=f_time,
-                size=f_size, desc=f_desc,
-                share_pwd=pwd, share_url=share_url
-            )
+        remaining = pending.ready_at - time.monotonic()
+        if remaining > 0:
+            with self._stage_timer('captcha_wait'):
+                time.sleep(remaining)
+        detail = self._finish_captcha(pending)
+        if self._url_cache is not None:
+            self._url_cache.set(detail.share_url, detail.share_pwd, detail)
+        return detail
 
-        download_page.encoding = 'utf-8'
-        download_page_html = remove_notes(download_page.text)
-        if '网络异常' not in download_page_html:  # 没有遇到验证码
-            direct_url = download_page.headers['Location']  # 重定向后的真直链
-        else:  # 遇到验证码，验证后才能获取下载直链
-            try:
-                file_token = re.findall("'file':'(.+?)'", download_page_html)[0]
-                file_sign = re.findall("'sign':'(.+?)'", download_page_html)[0]
-                check_api = 'https://vip.d0.baidupan.com/file/ajax.php'
-                post_data = {'file': file_token, 'el': 2, 'sign': file_sign}
-                time.sleep(2)  # 这里必需等待2s, 否则直链返回 ?SignError
-                resp = self._post(check_api, post_data)
-                direct_url = resp.json()['url']
-                if not direct_url:
-                    return LanZouFileDetail(
-                        request_info='直链获取失败',
-                        time=f_time, size=f_size,
-                        desc=f_desc, name=f_name,
-                        share_pwd=pwd, share_url=share_url
-                    )
-
-            except IndexError as e:
-                self.logger.error(e, exc_info=True)
-                return LanZouFileDetail(request_info='直链获取失败', )
-
-        f_type = f_name.split('.')[-1]
-        return LanZouFileDetail(
-            request_info='请求成功',
-            name=f_name, size=f_size,
-            desc=f_desc, share_pwd=pwd,
-            file_type=f_type, time=f_time,
-            share_url=share_url, direct_url=direct_url
-        )
+    def _get_file_info_by_url(self, share_url, pwd='') -> LanZouFileDetail:
+        """实际请求并解析分享页面，遇到验证码时在当前线程等待"""
+
+        result = self._resolve_until_captcha(share_url, pwd)
+        if isinstance(result, LanZouFileDetail):
+            return result
+        with self._stage_timer('captcha_wait'):
+            time.sleep(max(0.0, result.ready_at - time.monotonic()))
+        return self._finish_captcha(result)
+
+    def _resolve_until_captcha(self, share_url, pwd='') -> Union[LanZouFileDetail, LanZouCaptchaWait]:
+        """请求并解析分享页面，直到获取直链或遇到验证码"""
+
+        if not is_file_url(share_url):  # 非文件链接返回错误
+            return LanZouFileDetail(request_info='URL错误', share_pwd=pwd, share_url=share_url)
+        return self._run(self._resolve_steps(share_url, pwd))
+
+    def _finish_captcha(self, pending: LanZouCaptchaWait) -> LanZouFileDetail:
+        """提交验证码，获取下载直链；调用前应已等待到 pending.ready_at"""
+        return self._run(self._captcha_steps(pending))
 
+    @operation
     def get_file_info_by_id(self, file_id) -> LanZouFileDetail:
         """通过 id 获取文件信息"""
         info = self.get_share_info(file_id)
@@ -645,12 +1455,14 @@ class LanZouApi(object):
             return LanZouFileDetail(request_info='请求失败')
         return self.get_file_info_by_url(info.url, info.pwd)
 
+    @operation
     def get_direct_url_by_url(self, share_url, pwd='') -> str:
         """通过分享链接获取下载直链"""
         file_info = self.get_file_info_by_url(share_url, pwd)
         if file_info.direct_url:
             return file_info.direct_url
 
+    @operation
     def get_direct_url_by_id(self, file_id) -> str:
         """登录用户通过id获取直链"""
         info = self.get_share_info(file_id, is_file=True)  # 能获取直链，一定是文件
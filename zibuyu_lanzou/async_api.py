@@ -0,0 +1,664 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 基于 asyncio 的蓝奏云 API，接口与 LanZouApi 保持一致
+--------------------------------------------
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Generator, Iterable, List, Optional, Tuple, Union, Callable, TypeVar
+
+from requests_toolbelt import MultipartEncoder
+
+from .acw import AcwTokenStore
+from .base import LanZouApiBase, Call, DONE, RETRY
+from .health import DomainHealth
+from .metrics import Metrics, operation_label, OK
+from .retry import RetryPolicy, async_operation
+from .stream import EncoderStream, open_upload_body
+from .throttle import AdaptiveRateLimiter, site_of
+from .type import LanZouCookie, LanZouListError, LanZouShareInfo, LanZouFolder, LanZouFile, LanZouFileDetail, \
+    LanZouCaptchaWait, LanZouBatchResult
+from .utils import is_name_valid, name_format, get_mime_type, is_file_url
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，仅异步客户端需要
+    aiohttp = None
+
+T = TypeVar('T')
+
+
+class _AsyncResponse(object):
+    """aiohttp 响应体读取后的快照，字段与 requests.Response 常用部分对齐"""
+
+    def __init__(self, status_code: int, content: bytes, headers, encoding: str = 'utf-8', url: str = ''):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __bool__(self):
+        return 200 <= self.status_code < 400  # 与 requests.Response 一致，4xx、5xx 视为失败
+
+
+class AsyncLanZouApi(LanZouApiBase):
+    """
+    蓝奏云异步 API
+
+    所有请求共用同一个 aiohttp 连接池，并通过信号量限制同时在途的请求数，
+    因此单个事件循环内可以放心地并发调用成百上千次。
+    换域名、重试、请求指标、限速以及页面解析与 LanZouApi 共用 LanZouApiBase 中的实现。
+
+    async with AsyncLanZouApi(cookies=cookie) as api:
+        files = await api.get_file_list(-1)
+    """
+
+    def __init__(
+            self,
+            log_file_path: str = '',
+            cookies: Optional[LanZouCookie] = None,
+            logger: Optional[logging.Logger] = None,
+            max_concurrency: int = 100,
+            limit_per_host: int = 0,
+            session: Optional['aiohttp.ClientSession'] = None,
+            domain_health: Optional[DomainHealth] = None,
+            acw_store: Optional[AcwTokenStore] = None,
+            retry_policy: Optional[RetryPolicy] = None,
+            metrics: Optional[Metrics] = None,
+            rate_limiter: Optional[AdaptiveRateLimiter] = None,
+            proxy: Optional[str] = None,
+            upload_block_size: int = 262144,
+            progress_interval: float = 0.1,
+            progress_step: Optional[int] = None,
+            name_map_ttl: float = 300,
+    ):
+        """
+
+        @param cookies: LanZouCookie实例化对象
+        @param logger: 日志记录对象
+        @param log_file_path: 日志文件保存路径，为空表达不保存
+        @param max_concurrency: 同时在途的最大请求数，同时也是连接池大小
+        @param limit_per_host: 单个主机的最大连接数，0 表示不限制
+        @param session: 外部传入的 aiohttp.ClientSession，多个客户端可共用一个连接池；由调用方负责关闭
+        @param domain_health: 域名健康度统计，默认与 LanZouApi 共用进程内共享的实例
+        @param acw_store: acw_sc__v2 存储，默认与 LanZouApi 共用进程内共享的实例
+        @param retry_policy: 重试策略，截止时间按 asyncio 任务分别计算
+        @param metrics: 请求指标统计，为 None 时不统计
+        @param rate_limiter: 自适应限速，可以与 LanZouApi 共用同一个实例；等待令牌时不阻塞事件循环
+        @param proxy: http 代理地址，例如 http://127.0.0.1:7890
+        @param upload_block_size: 上传时每次发送的字节数
+        @param progress_interval: 上传进度回调的最小间隔(秒)
+        @param progress_step: 上传进度每增加这么多字节也回调一次，为空表示只按时间
+        @param name_map_ttl: 上传时用于查找同名文件的 文件名->文件 映射的有效期(秒)，过期后重新列举文件夹
+        """
+
+        if aiohttp is None:
+            raise ImportError('AsyncLanZouApi 依赖 aiohttp，请先执行: pip install aiohttp')
+
+        super().__init__(
+            log_file_path, cookies, logger, domain_health, retry_policy, metrics, rate_limiter, acw_store,
+            upload_block_size, progress_interval, progress_step
+        )
+
+        # 每个文件夹的 文件名 -> 同名文件列表，与 LanZouApi 相同；锁在事件循环内使用，列举文件夹期间同一文件夹的上传排队
+        self._name_map_ttl = name_map_ttl
+        self._name_maps: Dict[str, Tuple[float, Dict[str, List[LanZouFile]]]] = {}
+        self._name_map_locks: Dict[str, asyncio.Lock] = {}
+
+        self._cookie_dict = {}
+        if isinstance(cookies, LanZouCookie):
+            self._apply_cookies(cookies)
+
+        self._max_concurrency = max_concurrency
+        self._limit_per_host = limit_per_host
+        self._proxy = proxy
+        self._session = session
+        self._own_session = session is None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """关闭自身创建的连接池"""
+        if self._own_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """连接池需要在事件循环内创建，因此延迟到第一次请求时再初始化"""
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_concurrency,
+                limit_per_host=self._limit_per_host,
+                ssl=False,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            )
+            self._own_session = True
+
+        if self._cookie_dict:
+            self._session.cookie_jar.update_cookies(self._cookie_dict)
+            self._cookie_dict = {}
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        return self._session
+
+    def _set_cookie(self, name: str, value: str):
+        self._get_session().cookie_jar.update_cookies({name: value})
+
+    def _apply_cookies(self, cookies: LanZouCookie):
+        # 连接池可能还没有创建，下一次获取会话时再写入
+        self._cookie_dict = {
+            'PHPSESSID': cookies.PHPSESSID,
+            'ylogin': cookies.ylogin,
+            'phpdisk_info': cookies.phpdisk_info,
+        }
+        self.invalidate_name_map()  # 换了账号，缓存的文件列表不再可信
+
+    async def _send(self, method: str, url: str, timeout: float, **kwargs) -> _AsyncResponse:
+        """发送一次请求，并在释放连接之前读完响应体"""
+
+        session = self._get_session()
+        if self._proxy:
+            kwargs.setdefault('proxy', self._proxy)
+
+        async with self._semaphore:
+            async with session.request(
+                    method, url, ssl=False,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    **kwargs
+            ) as response:
+                content = await response.read()
+                return _AsyncResponse(response.status, content, response.headers, response.charset or 'utf-8',
+                                      str(response.url))
+
+    async def _request(self, method: str, url: str, need_check_cookie: bool = True, stage: str = '',
+                       **kwargs) -> Optional[_AsyncResponse]:
+        """
+        与 LanZouApi._request 相同：按域名健康度依次尝试所有可能的域名，全部失败且错误可以重试时，
+        按重试策略退避后再尝试下一轮；退避与限速等待都不阻塞事件循环
+        :param method: GET 或 POST
+        :param url: 请求的 url
+        :param need_check_cookie: 是否需要检查 cookie
+        :param stage: 统计指标用的操作名，为空时根据 url 推断(例如 doupload 的 task_47)
+        :param kwargs: 其他参数，显式传入的 timeout 不受操作截止时间限制
+        :return: _AsyncResponse，失败时返回 None
+        """
+
+        if need_check_cookie:
+            self.check_cookie()
+
+        policy = self._retry_policy
+        replayable = not hasattr(kwargs.get('data'), '__aiter__')  # 上传的数据是异步生成器，只能读取一次
+        timeout = kwargs.pop('timeout', None)
+        kwargs.setdefault('headers', self._headers)
+        limiter = None if need_check_cookie else self._rate_limiter  # 需要登录的接口按账号限速，不在这里限制
+        label = None
+        if self._metrics is not None or self._before_hooks or self._after_hooks:
+            label = stage or operation_label(url, kwargs.get('data'))
+
+        fallback = None  # 重试用尽时仍然交给调用方处理的响应
+        with policy.task_scope():
+            attempt = 0
+            while True:
+                attempt += 1
+                retryable = False
+                expired = False
+                for possible_url in self._domain_health.order(self._all_possible_urls(url)):
+                    if limiter is not None:
+                        waited = limiter.reserve(possible_url)
+                        if waited > 0:
+                            await asyncio.sleep(waited)
+                            if self._metrics is not None:
+                                self._metrics.observe('throttle_wait', site_of(possible_url), OK, waited)
+                    request_timeout = timeout or policy.task_timeout(self._timeout)
+                    if request_timeout is None:  # 操作的截止时间已过，剩下的域名也不再尝试
+                        expired = True
+                        break
+                    start = time.monotonic()
+                    event = self._request_started(label, method, possible_url, attempt)
+                    try:
+                        response = await self._send(method, possible_url, request_timeout, **kwargs)
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        self._request_error(method, possible_url, event, e)
+                        retryable = retryable or policy.retry_on_exception(e) or isinstance(
+                            e, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+                        continue
+
+                    action, retry = self._response_action(method, possible_url, response, need_check_cookie, start,
+                                                          event, limiter)
+                    if action == DONE:
+                        return response
+                    retryable = retryable or retry
+                    if action == RETRY or method == 'GET':  # 重试用尽时仍然交给调用方处理
+                        fallback = response
+                    if action == RETRY:
+                        break
+
+                if expired or not (retryable and replayable and await policy.async_wait(attempt)):
+                    break
+
+        self.logger.debug(f"{method} 请求 {url} 失败，共尝试 {attempt} 轮")
+        return fallback
+
+    async def _get(self, url, need_check_cookie: bool = True, **kwargs) -> Optional[_AsyncResponse]:
+        """
+        GET 请求，失败时切换域名并按重试策略重试
+        :param url: 请求的 url
+        :param need_check_cookie: 是否需要检查 cookie
+        :param kwargs: 其他参数
+        :return: _AsyncResponse，所有域名都失败时返回 None
+        """
+        return await self._request('GET', url, need_check_cookie, **kwargs)
+
+    async def _post(self, url, data, headers: Optional[dict] = None, need_check_cookie: bool = True, **kwargs) -> \
+            Optional[_AsyncResponse]:
+        """POST 请求，只有状态码为 200 且响应体是 json 才算成功"""
+        return await self._request('POST', url, need_check_cookie, data=data, headers=headers or self._headers,
+                                   **kwargs)
+
+    async def _run(self, steps: Generator[Call, object, T]) -> T:
+        """依次发送解析流程(见 LanZouApiBase)中的请求，返回流程的结果"""
+        response = None
+        try:
+            while True:
+                method, url, kwargs = steps.send(response)
+                response = await self._request(method, url, **kwargs)
+        except StopIteration as stop:
+            return stop.value
+
+    @async_operation
+    async def get_share_info(self, fid, is_file=True) -> LanZouShareInfo:
+        """获取文件(夹)提取码、分享链接"""
+        return await self._run(self._share_info_steps(fid, is_file))
+
+    @async_operation
+    async def set_passwd(self, fid, passwd='', is_file=True) -> bool:
+        """
+        设置网盘文件(夹)的提取码
+
+        @param fid: 文件id或文件夹id
+        @param passwd: 待设置的密码，文件夹提取码长度 0-12 位  文件提取码 2-6 位；为空表示去除密码；
+        @param is_file: 是否是文件；默认为 True
+        @return:
+        """
+        return (await self._set_passwd(fid, passwd, is_file)).success
+
+    async def _set_passwd(self, fid, passwd: str, is_file: bool) -> LanZouBatchResult:
+        reason = self._check_passwd(passwd, is_file)
+        if reason:
+            self.logger.warning(reason)
+            return LanZouBatchResult(id=fid, request_msg=reason)
+        return self._batch_result(fid, await self._post(self._doupload_url, self._passwd_form(fid, passwd, is_file)))
+
+    async def _run_batch(self, func: Callable, items: list, workers: int) -> List[LanZouBatchResult]:
+        """
+        并发执行批量操作，按输入顺序返回每个 id 的结果；单个 id 出错不影响其他 id，与 LanZouApi._run_batch 一致
+        @param func: 处理单个 item 的协程函数，返回 LanZouBatchResult
+        @param items: (id, 其他参数...) 元组列表
+        """
+
+        semaphore = asyncio.Semaphore(max(1, workers))
+
+        async def _one(item) -> LanZouBatchResult:
+            async with semaphore:
+                with self._retry_policy.task_scope():  # 每个 id 各自是一次操作，有各自的截止时间
+                    try:
+                        return await func(*item)
+                    except Exception as e:
+                        self.logger.error(f"批量操作 {item[0]} 时发生错误: {e!r}")
+                        return LanZouBatchResult(id=item[0], request_msg=f'发生错误: {e!r}')
+
+        return list(await asyncio.gather(*(_one(item) for item in items)))
+
+    async def set_passwd_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            passwd: str = '',
+            is_file: bool = True,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """批量设置提取码，参数与返回值同 LanZouApi.set_passwd_many"""
+
+        reason = self._check_passwd(passwd, is_file)
+        if reason:  # 所有 id 的原因都相同，不必逐个请求
+            self.logger.warning(reason)
+            return [LanZouBatchResult(id=getattr(fid, 'id', fid), request_msg=reason) for fid in fids]
+
+        items = [(getattr(fid, 'id', fid), passwd, is_file) for fid in fids]
+        return await self._run_batch(self._set_passwd, items, workers)
+
+    @async_operation
+    async def get_dir_list(self, folder_id=-1) -> List[LanZouFolder]:
+        """获取子文件夹列表，按重试策略重试后仍失败时抛出 LanZouListError"""
+
+        post_data = {'task': 47, 'folder_id': folder_id, 'vei': 'VFBQUg1fUghQBA9fAFo='}
+        resp = await self._post(self._doupload_url + "?uid=" + str(self._uid), post_data)
+        return self._parse_folders(folder_id, resp)
+
+    @async_operation
+    async def set_desc(self, fid, desc, is_file=True, folder_name: str = '') -> bool:
+        """
+        设置文件(夹)描述
+        @param folder_name: 文件夹名称，设置文件夹描述时需要；为空时从分享信息中获取
+        """
+        return (await self._set_desc(fid, desc, is_file, folder_name)).success
+
+    async def _set_desc(self, fid, desc: str, is_file: bool, folder_name: str = '') -> LanZouBatchResult:
+        if not is_file and not folder_name:
+            info = await self.get_share_info(fid, is_file=False)
+            if not info.success:
+                return LanZouBatchResult(id=fid, request_msg='获取文件夹名称失败')
+            folder_name = info.name
+
+        post_data = self._desc_form(fid, desc, is_file, folder_name)
+        return self._batch_result(fid, await self._post(self._doupload_url, post_data))
+
+    async def set_desc_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            desc: str,
+            is_file: bool = True,
+            folder_names: Optional[Dict[Union[str, int], str]] = None,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """批量设置描述，参数与返回值同 LanZouApi.set_desc_many；文件夹最好直接传入 get_dir_list 返回的 LanZouFolder"""
+
+        names = {str(k): v for k, v in (folder_names or {}).items()}
+        items = []
+        for fid in fids:
+            if isinstance(fid, LanZouFolder):
+                items.append((fid.id, desc, is_file, fid.name))
+            else:
+                fid = getattr(fid, 'id', fid)
+                items.append((fid, desc, is_file, names.get(str(fid), '')))
+        return await self._run_batch(self._set_desc, items, workers)
+
+    async def get_file_list(self, folder_id: Union[str, int] = -1) -> List[LanZouFile]:
+        """获取文件列表；某一页按重试策略重试后仍失败时抛出 LanZouListError，与 LanZouApi.get_file_list 一致"""
+
+        page = 1
+        file_list: List[LanZouFile] = []
+        while True:
+            post_data = {'task': 5, 'folder_id': folder_id, 'pg': page, 'vei': "VFBQUg1fUghQBA9fAFo="}
+            resp = self._file_page(folder_id, page, await self._post(self._doupload_url, post_data))
+            if resp["info"] == 0:
+                break  # 已经拿到了全部的文件信息
+            page += 1  # 下一页
+            file_list.extend(self._parse_file(file) for file in resp["text"])
+        return file_list
+
+    @async_operation
+    async def delete_file_or_folder(self, fid, is_file=True) -> bool:
+        """把网盘的文件、无子文件夹的文件夹放到回收站"""
+        return (await self._delete(fid, is_file)).success
+
+    async def _delete(self, fid, is_file: bool) -> LanZouBatchResult:
+        result = self._batch_result(fid, await self._post(self._doupload_url, self._delete_form(fid, is_file)))
+        if result.success:
+            if is_file:
+                self._forget_name(fid)
+            else:
+                self.invalidate_name_map(fid)
+        return result
+
+    async def delete_many(
+            self,
+            fids: Iterable[Union[str, int, LanZouFile, LanZouFolder]],
+            is_file: bool = True,
+            workers: int = 8
+    ) -> List[LanZouBatchResult]:
+        """批量把文件、无子文件夹的文件夹放到回收站，参数与返回值同 LanZouApi.delete_many"""
+        items = [(getattr(fid, 'id', fid), is_file) for fid in fids]
+        return await self._run_batch(self._delete, items, workers)
+
+    async def _get_name_map(self, folder_id: Union[str, int]) -> Dict[str, List[LanZouFile]]:
+        """获取文件夹的 文件名 -> 同名文件列表 映射，不存在或已过期时列举一次文件夹；调用方需持有该文件夹的锁"""
+
+        key = str(folder_id)
+        item = self._name_maps.get(key)
+        if item is not None and time.monotonic() - item[0] < self._name_map_ttl:
+            return item[1]
+
+        name_map: Dict[str, List[LanZouFile]] = {}
+        for file_obj in await self.get_file_list(folder_id):
+            name_map.setdefault(file_obj.name, []).append(file_obj)
+
+        self._name_maps[key] = (time.monotonic(), name_map)
+        return name_map
+
+    def invalidate_name_map(self, folder_id: Union[str, int, None] = None):
+        """
+        使同名文件映射失效，下一次上传时重新列举文件夹；在其他途径修改了网盘文件后调用
+        @param folder_id: 文件夹 id，为空表示清空所有文件夹的映射
+        """
+        if folder_id is None:
+            self._name_maps.clear()
+        else:
+            self._name_maps.pop(str(folder_id), None)
+
+    def _forget_name(self, fid: Union[str, int]):
+        """文件被删除后，从各个文件夹的映射中移除；没有 await，不会与其他协程交错"""
+        fid = str(fid)
+        for _, name_map in self._name_maps.values():
+            for name, file_objs in list(name_map.items()):
+                remain = [f for f in file_objs if str(f.id) != fid]
+                if len(remain) != len(file_objs):
+                    if remain:
+                        name_map[name] = remain
+                    else:
+                        name_map.pop(name, None)
+                    return
+
+    async def _upload_small_file(
+            self,
+            file_path: str,
+            folder_id: Union[str, int] = -1,
+            *, callback: Optional[Callable] = None,
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace'
+    ) -> List[LanZouFile]:
+        """
+        上传不超过 max_size 的文件
+        @param file_path: 本地文件路径
+        @param folder_id: 文件夹 id，默认为 -1，表示根目录
+        @param callback: 上传进度回调函数，参数为 (文件名, 文件总大小, 已上传大小)
+        @param uploaded_handler: 上传完成后的回调函数，可以是普通函数或协程函数
+        @param overwrite: 存在同名文件时的处理方式，同 LanZouApi.upload_file
+        @return:
+        """
+
+        file_obj_list: List[LanZouFile] = []
+
+        if overwrite not in ('replace', 'skip', 'keep'):
+            self.logger.warning(f"overwrite 参数错误，只能是 replace、skip 或 keep，当前为 {overwrite}")
+            return file_obj_list
+
+        if not is_name_valid(os.path.basename(file_path)):  # 不允许上传的格式
+            self.logger.warning(f"文件 {file_path} 的后缀不允许上传，请使用其他后缀重新命名")
+            return file_obj_list
+
+        filename = name_format(os.path.basename(file_path))
+
+        # 同一个文件夹只在第一次上传(或映射过期)时列举一次，之后随上传、删除增量更新
+        if overwrite != 'keep':
+            try:
+                async with self._name_map_locks.setdefault(str(folder_id), asyncio.Lock()):
+                    same_name_files = list((await self._get_name_map(folder_id)).get(filename, []))
+            except LanZouListError as e:
+                self.logger.warning(f"{e}，无法检查同名文件，取消上传 {file_path}")
+                return file_obj_list
+
+            if same_name_files and overwrite == 'skip':
+                self.logger.info(f"文件 {filename} 已存在同名文件，跳过上传")
+                return same_name_files
+
+            for file_obj in same_name_files:  # 文件已经存在同名文件就删除
+                self.logger.info(f"文件 {file_path} 已存在同名文件，删除同名文件")
+                await self.delete_file_or_folder(file_obj.id)
+
+        def _progress(bytes_sent, total):
+            callback(filename, total, bytes_sent)
+
+        self.logger.debug(f'正在上传文件: 【{file_path}】')
+        with open_upload_body(file_path) as body:
+            encoder = MultipartEncoder(self._upload_form(filename, folder_id, body, get_mime_type(file_path)))
+            stream = EncoderStream(
+                encoder, self._upload_block_size,
+                progress=_progress if callback is not None else None,
+                interval=self._progress_interval, step=self._progress_step
+            )
+
+            tmp_header = self._headers.copy()
+            tmp_header['Content-Type'] = encoder.content_type
+            tmp_header['Content-Length'] = str(len(stream))  # 显式给出长度，避免 aiohttp 改用 chunked 编码
+
+            async def _body():
+                # 异步生成器只能被消费一次，因此上传不走备用域名重试
+                for chunk in stream:
+                    yield chunk
+
+            result = await self._post(self._upload_url, data=_body(), headers=tmp_header, timeout=3600)
+            self._record_upload(stream)
+
+        if not result:
+            self.logger.error('上传文件时网络异常')
+            return file_obj_list
+
+        try:
+            file_obj_list = self._parse_uploaded(result)
+            if not file_obj_list:
+                return file_obj_list  # 上传失败
+
+            self.logger.info('上传文件成功')
+
+            item = self._name_maps.get(str(folder_id))
+            if item is not None:
+                for obj in file_obj_list:
+                    item[1].setdefault(obj.name, []).append(obj)
+
+            if uploaded_handler is not None and callable(uploaded_handler):
+                for obj in file_obj_list:
+                    ret = uploaded_handler(obj.id, is_file=True)  # 对已经上传的文件再进一步处理
+                    if asyncio.iscoroutine(ret):
+                        await ret
+        except:
+            self.logger.error('上传文件时发生错误', exc_info=True)
+        finally:
+            return file_obj_list
+
+    async def upload_file(
+            self,
+            file_path,
+            folder_id=-1,
+            *, callback: Optional[Callable] = None,
+            uploaded_handler: Optional[Callable] = None,
+            overwrite: str = 'replace'
+    ) -> Optional[List[LanZouFile]]:
+        """
+        上传文件，参数含义与 LanZouApi.upload_file 相同(不支持分块上传)
+
+        @param file_path:
+        @param folder_id:
+        @param callback: 用于显示上传进度的回调函数
+        @param uploaded_handler: 用于进一步处理上传完成后的文件，可以是协程函数
+        @param overwrite: 存在同名文件时的处理方式: replace(默认) 删除同名文件后上传; skip 跳过上传，返回已有文件; keep 保留两者
+        @return:
+        """
+
+        if not os.path.isfile(file_path):
+            self.logger.warning(f"文件 {file_path} 不存在")
+            return
+
+        # 单个文件不超过 max_size 直接上传
+        if os.path.getsize(file_path) <= self._max_size * 1048576:
+            return await self._upload_small_file(file_path, folder_id, callback=callback,
+                                                 uploaded_handler=uploaded_handler, overwrite=overwrite)
+
+        self.logger.warning(f"文件 {file_path} 大小超过 {self._max_size} MB，无法直接上传")
+
+    @async_operation
+    async def get_file_info_by_url(self, share_url, pwd='') -> LanZouFileDetail:
+        """
+        获取文件各种信息(包括下载直链)
+        :param share_url: 文件分享链接
+        :param pwd: 文件提取码(如果有的话)
+        """
+
+        result = await self.begin_file_info(share_url, pwd)
+        if isinstance(result, LanZouFileDetail):
+            return result
+        return await self.finish_file_info(result)
+
+    @async_operation
+    async def begin_file_info(self, share_url, pwd='') -> Union[LanZouFileDetail, LanZouCaptchaWait]:
+        """
+        解析直链的前半段，遇到验证码时不等待，直接返回 LanZouCaptchaWait，含义同 LanZouApi.begin_file_info
+        :param share_url: 文件分享链接
+        :param pwd: 文件提取码(如果有的话)
+        """
+
+        # VIP 链接需要额外请求一次页面才能判断，放到线程池里，避免阻塞事件循环
+        if not await asyncio.to_thread(is_file_url, share_url):  # 非文件链接返回错误
+            return LanZouFileDetail(request_info='URL错误', share_pwd=pwd, share_url=share_url)
+        return await self._run(self._resolve_steps(share_url, pwd))
+
+    @async_operation
+    async def finish_file_info(self, pending: LanZouCaptchaWait) -> LanZouFileDetail:
+        """
+        提交 begin_file_info 返回的验证码，获取下载直链；未到 ready_at 时先等待剩余的时间(不阻塞其他协程)
+        :param pending: begin_file_info 的返回值
+        """
+
+        remaining = pending.ready_at - time.monotonic()
+        if remaining > 0:
+            with self._stage_timer('captcha_wait'):
+                await asyncio.sleep(remaining)
+        return await self._run(self._captcha_steps(pending))
+
+    @async_operation
+    async def get_file_info_by_id(self, file_id) -> LanZouFileDetail:
+        """通过 id 获取文件信息"""
+        info = await self.get_share_info(file_id)
+        if not info.success:
+            return LanZouFileDetail(request_info='请求失败')
+        return await self.get_file_info_by_url(info.url, info.pwd)
+
+    async def get_direct_url_by_url(self, share_url, pwd='') -> str:
+        """通过分享链接获取下载直链"""
+        file_info = await self.get_file_info_by_url(share_url, pwd)
+        if file_info.direct_url:
+            return file_info.direct_url
+
+    @async_operation
+    async def get_direct_url_by_id(self, file_id) -> str:
+        """登录用户通过id获取直链"""
+        info = await self.get_share_info(file_id, is_file=True)  # 能获取直链，一定是文件
+        return await self.get_direct_url_by_url(info.url, info.pwd)
@@ -0,0 +1,642 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: LanZouApi 与 AsyncLanZouApi 共用的部分：接口地址、响应判断、请求指标与钩子，以及与收发方式无关的解析流程
+--------------------------------------------
+"""
+
+import time
+import logging
+import threading
+from dataclasses import replace
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Generator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from .acw import AcwTokenStore, shared_acw_store
+from .health import DomainHealth, shared_domain_health
+from .metrics import Metrics, RequestEvent, OK, RETRY_STATUS, HTTP_ERROR, NOT_JSON, RETRY_ZT, EXCEPTION
+from .parser import parse_share_page, parse_password_info, parse_download_frame, parse_captcha_page, is_acw_page
+from .retry import RetryPolicy
+from .stream import EncoderStream
+from .throttle import AdaptiveRateLimiter, site_of, ACW, CAPTCHA, TOO_MANY_REQUESTS
+from .type import LanZouCookie, LanZouCookieError, LanZouListError, LanZouShareInfo, LanZouFolder, LanZouFile, \
+    LanZouFileDetail, LanZouCaptchaWait, LanZouBatchResult
+from .utils import get_logger, user_agent, time_format, get_mime_type, calc_acw_sc__v2, name_format
+
+# 一次请求的结果
+DONE = 'done'  # 成功，把这个响应交给调用方
+NEXT = 'next'  # 换下一个域名
+RETRY = 'retry'  # 域名没有问题，是接口要求稍后再试，结束这一轮
+
+Call = Tuple[str, str, dict]  # 解析流程中要发送的请求: (method, url, 传给 _request 的参数)
+
+
+class LanZouApiBase(object):
+    """
+    同步与异步客户端的公共部分
+
+    需要多次请求的流程(获取分享信息、解析直链、提交验证码)写成生成器：每次 yield 一个要发送的请求，
+    子类用各自的方式发送后把响应(失败时为 None)send 回生成器，生成器的返回值就是最终结果。
+    """
+
+    _timeout = 15  # 每个请求的超时(不包含下载响应体的用时)
+    _max_size = 100  # 单个文件大小上限 MB
+    _login_expired_zt = 9  # 登录失效后 doupload、html5up 等需要登录的接口返回 zt=9，见 _is_login_expired
+
+    def __init__(
+            self,
+            log_file_path: str = '',
+            cookies: Optional[LanZouCookie] = None,
+            logger: Optional[logging.Logger] = None,
+            domain_health: Optional[DomainHealth] = None,
+            retry_policy: Optional[RetryPolicy] = None,
+            metrics: Optional[Metrics] = None,
+            rate_limiter: Optional[AdaptiveRateLimiter] = None,
+            acw_store: Optional[AcwTokenStore] = None,
+            upload_block_size: int = 262144,
+            progress_interval: float = 0.1,
+            progress_step: Optional[int] = None,
+    ):
+        if logger and isinstance(logger, logging.Logger):
+            self.logger = logger
+        else:
+            self.logger = get_logger(log_name='lanzou_api', base_path=log_file_path)
+
+        self._cookies: Optional[LanZouCookie] = cookies
+        self._session_valid = True  # 最近一次需要登录的请求是否没有返回登录失效；换 cookie 后重新置为 True
+        if isinstance(cookies, LanZouCookie):
+            self._uid = cookies.ylogin  # uid 用于上传文件时的参数
+
+        self._headers = {
+            'User-Agent': user_agent(),
+            'Referer': 'https://pc.woozooo.com/mydisk.php',
+            'Accept-encoding': 'gzip, deflate, br, zstd',
+            'Accept': '*/*',
+            'Origin': 'https://pc.woozooo.com',
+            'Accept-Language': 'zh-CN,zh;q=0.9',  # 提取直连必需设置这个，否则拿不到数据
+        }
+
+        self._host_url = 'https://pan.lanzouo.com'
+        self._doupload_url = 'https://pc.woozooo.com/doupload.php'
+        self._account_url = 'https://pc.woozooo.com/account.php'
+        self._mydisk_url = 'https://pc.woozooo.com/mydisk.php'
+        self._upload_url = 'https://pc.woozooo.com/html5up.php'
+        self._captcha_url = 'https://vip.d0.baidupan.com/file/ajax.php'
+        self._captcha_delay = 2  # 遇到验证码后需要等待的时间(秒)
+
+        self._domain_health: DomainHealth = domain_health or shared_domain_health()
+        self._retry_policy: RetryPolicy = retry_policy or RetryPolicy()
+        self._metrics: Optional[Metrics] = metrics
+        self._rate_limiter: Optional[AdaptiveRateLimiter] = rate_limiter
+        self._acw_store: AcwTokenStore = acw_store or shared_acw_store()
+        self._acw_token: Optional[str] = None  # 当前 session 中的 acw_sc__v2
+        self._upload_block_size = upload_block_size
+        self._progress_interval = progress_interval
+        self._progress_step = progress_step
+        self._upload_stats = {'files': 0, 'bytes': 0, 'seconds': 0.0, 'last_throughput': 0.0}
+        self._upload_stats_lock = threading.Lock()
+        self._before_hooks: Tuple[Callable[[RequestEvent], None], ...] = ()  # 注册时整体替换，请求时不需要加锁
+        self._after_hooks: Tuple[Callable[[RequestEvent], None], ...] = ()
+
+    def check_cookie(self):
+        """检查是否传入了可用的 cookie，不可用时抛出 LanZouCookieError"""
+
+        if not isinstance(self._cookies, LanZouCookie) or \
+                not all([self._cookies.PHPSESSID, self._cookies.ylogin, self._cookies.phpdisk_info]):
+            self.logger.error('cookies 参数错误, 请检查后重试。三个 cookie 字段必须都存在')
+            raise LanZouCookieError('cookies 参数错误，三个 cookie 字段必须都存在')
+
+    def set_cookies(self, cookies: LanZouCookie):
+        """
+        更换 cookie，例如登录失效后重新登录得到了新的 cookie
+        @param cookies: 新的 cookie
+        """
+        self._cookies = cookies
+        self._uid = cookies.ylogin
+        self._session_valid = True
+        self._apply_cookies(cookies)
+
+    def _apply_cookies(self, cookies: LanZouCookie):
+        """把 cookie 写入当前会话"""
+        raise NotImplementedError
+
+    @property
+    def session_valid(self) -> bool:
+        """
+        最近一次需要登录的请求是否没有返回登录失效
+
+        只反映最近一次的结果，不会阻止之后的请求：偶尔一次异常的返回不会让客户端一直不可用；
+        需要停用失效账号的场景(例如 AccountPool)自行记录
+        """
+        return self._session_valid
+
+    @staticmethod
+    def _all_possible_urls(url: str) -> List[str]:
+        """蓝奏云的主域名有时会挂掉, 此时尝试切换到备用域名"""
+        available_domains = [
+            'lanzouw.com',  # 鲁ICP备15001327号-7, 2021-09-02
+            'lanzoui.com',  # 鲁ICP备15001327号-6, 2020-06-09
+            'lanzoux.com'  # 鲁ICP备15001327号-5, 2020-06-09
+        ]
+
+        if 'lanzouo.com' not in url:
+            return [url]  # pc.woozooo.com 等没有备用域名的接口，不要对同一个主机重复请求
+        return [url.replace('lanzouo.com', d) for d in available_domains]
+
+    @property
+    def domain_ranking(self) -> List[dict]:
+        """当前各域名的健康状况，按优先级排列"""
+        return self._domain_health.ranking()
+
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        return self._metrics
+
+    def add_request_hook(
+            self,
+            before: Optional[Callable[[RequestEvent], None]] = None,
+            after: Optional[Callable[[RequestEvent], None]] = None,
+    ):
+        """
+        注册请求钩子，每次尝试请求(包括换域名与重试)前调用 before，结束后调用 after，参数为 RequestEvent
+        钩子在发起请求的线程中同步执行，抛出的异常只记录日志，不影响请求
+        """
+        if before is not None:
+            self._before_hooks += (before,)
+        if after is not None:
+            self._after_hooks += (after,)
+
+    def remove_request_hook(self, hook: Callable[[RequestEvent], None]):
+        self._before_hooks = tuple(h for h in self._before_hooks if h is not hook)
+        self._after_hooks = tuple(h for h in self._after_hooks if h is not hook)
+
+    def _call_hooks(self, hooks, event: RequestEvent):
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception:
+                self.logger.warning(f"请求钩子 {hook!r} 执行出错", exc_info=True)
+
+    def _request_started(self, label: Optional[str], method: str, url: str, attempt: int) -> Optional[RequestEvent]:
+        """没有统计也没有钩子时返回 None，之后的 _request_finished 直接跳过"""
+        if label is None:
+            return None
+        event = RequestEvent(label, method, url, urlparse(url).netloc, attempt)
+        self._call_hooks(self._before_hooks, event)
+        event.elapsed = time.monotonic()  # 先借用 elapsed 保存开始时间
+        return event
+
+    def _request_finished(self, event: Optional[RequestEvent], outcome: str, status_code: Optional[int] = None,
+                          error: Optional[BaseException] = None):
+        if event is None:
+            return
+        event.elapsed = time.monotonic() - event.elapsed
+        event.outcome, event.status_code, event.error = outcome, status_code, error
+        if self._metrics is not None:
+            self._metrics.record(event)
+        self._call_hooks(self._after_hooks, event)
+
+    def _request_error(self, method: str, url: str, event: Optional[RequestEvent], error: BaseException):
+        """请求没有得到响应(连接失败、超时等)"""
+        self.logger.debug(f"{method} 请求 {url} 失败: {error!r}，尝试另一个 domain")
+        self._domain_health.record_failure(url)
+        self._request_finished(event, EXCEPTION, error=error)
+
+    def _response_action(self, method: str, url: str, response, need_check_cookie: bool, start: float,
+                         event: Optional[RequestEvent], limiter: Optional[AdaptiveRateLimiter]) -> Tuple[str, bool]:
+        """
+        判断一次请求的响应，同时记录域名健康度、请求指标与限速
+        GET 请求只要状态码不需要重试就算成功；POST 接口都返回 json，返回网页一般是被防火墙拦截了
+
+        @return: (DONE / NEXT / RETRY, 没有成功时是否值得重试)
+        """
+
+        policy = self._retry_policy
+        if policy.retry_on_status(response.status_code):
+            self._domain_health.record_failure(url)
+            self._request_finished(event, RETRY_STATUS, response.status_code)
+            if response.status_code == 429 and not need_check_cookie:
+                self._throttle_signal(url, TOO_MANY_REQUESTS)
+            return NEXT, True
+
+        if method == 'GET':
+            self._domain_health.record_success(url, time.monotonic() - start)
+            self._request_finished(event, OK, response.status_code)
+            signal = None if need_check_cookie else self._challenge_signal(response)
+            if signal is not None:  # 验证页面说明请求过快，不能算作成功，否则限速器反而会提速
+                self._throttle_signal(url, signal)
+            elif limiter is not None:
+                limiter.success(url)
+            return DONE, False
+
+        if response.status_code != 200 or not response.content:
+            self._domain_health.record_failure(url)
+            self._request_finished(event, HTTP_ERROR, response.status_code)
+            return NEXT, not response.content
+
+        try:
+            body = response.json()
+        except ValueError:
+            self.logger.debug(f"{url} 返回值不是 json: 【{response.text[:200]}】")
+            self._domain_health.record_failure(url)
+            self._request_finished(event, NOT_JSON, response.status_code)
+            return NEXT, True
+
+        self._domain_health.record_success(url, time.monotonic() - start)
+        if need_check_cookie:
+            expired = self._is_login_expired(body)
+            if expired:
+                self.logger.error(f"登录已失效: {body.get('info')}")
+            self._session_valid = not expired
+        if policy.retry_on_zt(response):  # 域名本身没有问题，是接口要求稍后再试
+            self._request_finished(event, RETRY_ZT, response.status_code)
+            return RETRY, True
+        self._request_finished(event, OK, response.status_code)
+        if limiter is not None:
+            limiter.success(url)
+        return DONE, False
+
+    @staticmethod
+    def _challenge_signal(response) -> Optional[str]:
+        """不需要登录的 GET 请求返回了 acw_sc__v2 验证页面或验证码页面时，返回对应的限速信号"""
+        if response.status_code != 200 or 'text/html' not in response.headers.get('Content-Type', ''):
+            return None
+        text = response.text
+        if is_acw_page(text):
+            return ACW
+        if parse_captcha_page(text) is not None:
+            return CAPTCHA
+        return None
+
+    def _is_login_expired(self, body) -> bool:
+        """
+        需要登录的接口是否返回了登录失效
+
+        cookie 失效后 doupload.php、html5up.php 返回 {"zt": 9, "info": "登录信息已失效..."}；
+        返回码以外再看 info 中的提示，服务端改了返回码也能识别
+        """
+        if not isinstance(body, dict):
+            return False
+        if body.get('zt') == self._login_expired_zt:
+            return True
+        info = body.get('info')
+        return body.get('zt') != 1 and isinstance(info, str) and ('重新登录' in info or '请先登录' in info)
+
+    def _throttle_signal(self, url: str, signal: str):
+        """遇到反爬信号：通知限速器降速，并计入指标"""
+        self.logger.debug(f"{url} 触发限速信号: {signal}")
+        if self._rate_limiter is not None:
+            self._rate_limiter.penalize(url, signal)
+        if self._metrics is not None:
+            self._metrics.inc('throttle_signals', site=site_of(url), signal=signal)
+
+    def _set_cookie(self, name: str, value: str):
+        """在当前会话中设置 cookie"""
+        raise NotImplementedError
+
+    def _apply_acw_token(self, url: str):
+        """带上其他客户端已经算出的 acw_sc__v2，避免再被验证页面拦截一次"""
+        token = self._acw_store.get(url)
+        if token and token != self._acw_token:
+            self._set_cookie("acw_sc__v2", token)
+            self._acw_token = token
+
+    def _stage_timer(self, stage: str):
+        """统计不发送请求的阶段(例如等待验证码)的耗时"""
+        return nullcontext() if self._metrics is None else self._metrics.timer(stage)
+
+    def _record_upload(self, stream: EncoderStream):
+        """记录上传速度，同时写入 Metrics(upload_bytes_total 与 upload_transfer 耗时)"""
+
+        if not stream.bytes_sent:
+            return
+        with self._upload_stats_lock:
+            stats = self._upload_stats
+            stats['files'] += 1
+            stats['bytes'] += stream.bytes_sent
+            stats['seconds'] += stream.elapsed
+            stats['last_throughput'] = stream.throughput
+        if self._metrics is not None:
+            domain = urlparse(self._upload_url).netloc
+            self._metrics.inc('upload_bytes', stream.bytes_sent, domain=domain)
+            self._metrics.observe('upload_transfer', domain, OK, stream.elapsed)
+        self.logger.debug(f'上传 {stream.bytes_sent} 字节，用时 {stream.elapsed:.2f} 秒，'
+                          f'{stream.throughput / 1048576:.2f} MB/s，进度回调 {stream.callbacks} 次')
+
+    def upload_throughput(self) -> dict:
+        """
+        本实例累计的上传速度
+        @return: files 上传次数，bytes 字节数，seconds 发送用时，throughput 平均速度与 last_throughput 最近一次的速度(字节/秒)
+        """
+        with self._upload_stats_lock:
+            stats = dict(self._upload_stats)
+        stats['throughput'] = stats['bytes'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+
+    @staticmethod
+    def _check_passwd(passwd: str, is_file: bool) -> str:
+        """检查提取码长度，不符合要求时返回原因"""
+
+        if passwd and is_file and (len(passwd) < 2 or len(passwd) > 6):
+            return f"提取码长度不符合要求，文件的提取码长度为 2-6 位提取码，当前提取码为 {passwd}"
+        if passwd and not is_file and (len(passwd) < 1 or len(passwd) > 12):
+            return f"提取码长度不符合要求，文件夹的提取码长度为 1-12 位提取码，当前提取码为 {passwd}"
+        return ''
+
+    @staticmethod
+    def _batch_result(fid, resp) -> LanZouBatchResult:
+        """把 doupload.php 的返回值转换为单个 id 的结果"""
+
+        if not resp:
+            return LanZouBatchResult(id=fid, request_msg='网络异常')
+        result = resp.json()
+        if result.get('zt') != 1:
+            return LanZouBatchResult(id=fid, request_msg=str(result.get('info') or '请求失败'))
+        return LanZouBatchResult(id=fid, success=True, request_msg='请求成功')
+
+    @staticmethod
+    def _passwd_form(fid, passwd: str, is_file: bool) -> dict:
+        """设置提取码的表单：文件为 task 23，文件夹为 task 16；passwd 为空表示去除密码"""
+        shows = 0 if passwd == '' else 1  # 是否开启密码
+        if is_file:
+            return {"task": 23, "file_id": fid, "shows": shows, "shownames": passwd}
+        return {"task": 16, "folder_id": fid, "shows": shows, "shownames": passwd}
+
+    @staticmethod
+    def _desc_form(fid, desc: str, is_file: bool, folder_name: str = '') -> dict:
+        """
+        设置描述的表单
+
+        文件为 task 11，描述一旦设置了值就不能再置空；
+        文件夹为 task 4(同时修改名称与描述)，需要提交原来的名称，描述可以置空
+        """
+        if is_file:
+            return {'task': 11, 'file_id': fid, 'desc': desc}
+        return {'task': 4, 'folder_id': fid, 'folder_name': name_format(folder_name), 'folder_description': desc}
+
+    @staticmethod
+    def _delete_form(fid, is_file: bool) -> dict:
+        """放到回收站的表单：文件为 task 6，文件夹为 task 3"""
+        return {'task': 6, 'file_id': fid} if is_file else {'task': 3, 'folder_id': fid}
+
+    @staticmethod
+    def _parse_file(file: dict) -> LanZouFile:
+        """把 task 5 返回的单条文件数据转换为 LanZouFile"""
+        return LanZouFile(
+            id=file['id'],
+            name=file['name_all'].replace("&amp;", "&"),
+            time=time_format(file['time']),  # 上传时间
+            size=file['size'].replace(",", ""),  # 文件大小
+            type=file['name_all'].split('.')[-1],  # 文件类型
+            downs=file['downs'],  # 下载次数
+            has_pwd=True if int(file['onof']) == 1 else False,  # 是否存在提取码
+            has_des=True if int(file['is_des']) == 1 else False  # 是否存在描述
+        )
+
+    def _parse_folders(self, folder_id: Union[str, int], resp) -> List[LanZouFolder]:
+        """把 task 47 的返回值转换为 LanZouFolder 列表，请求或解析失败时抛出 LanZouListError"""
+
+        if not resp:
+            raise LanZouListError(folder_id)
+
+        try:
+            return [
+                LanZouFolder(
+                    id=folder['fol_id'],
+                    name=folder['name'],
+                    has_pwd=True if int(folder['onof']) == 1 else False,
+                    desc=folder['folder_des'].strip('[]')
+                ) for folder in resp.json()['text']
+            ]
+        except Exception as e:
+            self.logger.warning(f"获取文件夹列表，解析返回数据时发生错误，返回值: 【{resp.text}】")
+            raise LanZouListError(folder_id, msg=repr(e)) from e
+
+    @staticmethod
+    def _file_page(folder_id: Union[str, int], page: int, resp) -> dict:
+        """检查文件列表某一页(task 5)的返回值，失败时抛出 LanZouListError"""
+
+        if not resp:
+            raise LanZouListError(folder_id, page)
+
+        result = resp.json()
+        if result.get('info') != 0 and not isinstance(result.get('text'), list):  # 例如登录失效
+            raise LanZouListError(folder_id, page, str(result.get('info')))
+        return result
+
+    @staticmethod
+    def _upload_form(filename: str, folder_id: Union[str, int], fileobj, mime_type: Optional[str] = None) -> dict:
+        """html5up.php 的表单字段，交给 MultipartEncoder"""
+        return {
+            "task": "1",
+            "vie": "2",
+            "ve": "2",
+            "id": "WU_FILE_0",
+            "name": filename,
+            'type': mime_type or get_mime_type(filename),
+            'lastModifiedDate': datetime.now().strftime('%a %b %d %Y %H:%M:%S GMT%z (%Z)'),
+            "folder_id_bb_n": str(folder_id),
+            "upload_file": (filename, fileobj, 'application/octet-stream')
+        }
+
+    def _parse_uploaded(self, result) -> List[LanZouFile]:
+        """html5up.php 的返回值转换为 LanZouFile 列表，上传失败时为空列表"""
+
+        resp_json = result.json()
+        if resp_json["zt"] != 1:
+            self.logger.debug(f'文件上传失败，响应数据是：【{result.text}】')
+            return []
+
+        return [LanZouFile(
+            id=file_dict.get("id"),
+            name=file_dict.get("name"),
+            time=file_dict.get('time'),  # 上传时间
+            size=file_dict.get('size'),  # 文件大小
+            type=file_dict.get("icon"),  # 文件类型
+            downs=file_dict.get("downs"),  # 下载次数
+            has_pwd=False,  # 是否存在提取码
+            has_des=False,  # 是否存在描述
+        ) for file_dict in resp_json["text"]]
+
+    def _share_info_steps(self, fid, is_file=True, file_name: Optional[str] = None) \
+            -> Generator[Call, object, LanZouShareInfo]:
+        """
+        获取文件(夹)提取码、分享链接
+        @param file_name: 已知的文件名(例如来自文件列表)，传入时不再请求文件名与描述(task 12)，返回的 desc 为空
+        """
+
+        post_data = {'task': 22, 'file_id': fid} if is_file else {'task': 18, 'folder_id': fid}  # 获取分享链接和密码用
+        f_info = yield 'POST', self._doupload_url, {'data': post_data}
+        if not f_info:
+            return LanZouShareInfo(
+                request_msg='网络异常'
+            )
+        else:
+            f_info = f_info.json()['info']
+
+        # id 有效性校验
+        if ('f_id' in f_info.keys() and f_info['f_id'] == 'i') or ('name' in f_info.keys() and not f_info['name']):
+            return LanZouShareInfo(request_msg='fid错误')
+
+        # onof=1 时，存在有效的提取码; onof=0 时不存在提取码，但是 pwd 字段还是有一个无效的随机密码
+        pwd = f_info['pwd'] if f_info['onof'] == '1' else ''
+        if 'f_id' in f_info.keys():  # 说明返回的是文件的信息
+            url = f_info['is_newd'] + '/' + f_info['f_id']  # 文件的分享链接需要拼凑
+            if file_name is not None:
+                name, desc = file_name, ''
+            else:
+                file_info = yield 'POST', self._doupload_url, {'data': {'task': 12, 'file_id': fid}}  # 文件信息
+                if not file_info:
+                    return LanZouShareInfo(request_msg='网络异常')
+                name = file_info.json()['text']  # 无后缀的文件名(获得后缀又要发送请求,没有就没有吧,尽可能减少请求数量)
+                desc = file_info.json()['info']
+        else:
+            url = f_info['new_url']  # 文件夹的分享链接可以直接拿到
+            name = f_info['name']  # 文件夹名
+            desc = f_info['des']  # 文件夹描述
+        return LanZouShareInfo(success=True, request_msg='请求成功', name=name, url=url, desc=desc, pwd=pwd)
+
+    def _resolve_steps(self, share_url, pwd='') -> Generator[Call, object, Union[LanZouFileDetail, LanZouCaptchaWait]]:
+        """请求并解析分享页面，直到获取直链或遇到验证码；调用前需先用 is_file_url 检查链接"""
+
+        self._apply_acw_token(share_url)
+        share_page = {'need_check_cookie': False}
+        first_page = yield 'GET', share_url, dict(share_page, stage='share_page')  # 文件分享页面(第一页)
+        if not first_page:
+            return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
+
+        page = parse_share_page(first_page.text)
+        if page.kind == 'acw':  # 限速信号已经在 _response_action 中发出
+            # 在页面被过多访问或其他情况下，有时候会先返回一个加密的页面，其执行计算出一个acw_sc__v2后放入页面后再重新访问页面才能获得正常页面
+            # 若该页面进行了js加密，则进行解密，计算acw_sc__v2，并加入cookie
+            acw_sc__v2 = calc_acw_sc__v2(first_page.text)
+            self._set_cookie("acw_sc__v2", acw_sc__v2)
+            self._acw_token = acw_sc__v2
+            self._acw_store.set(share_url, acw_sc__v2)  # 覆盖已经失效的旧值，其他客户端直接使用
+            self.logger.debug(f"Set Cookie: acw_sc__v2={acw_sc__v2}")
+            first_page = yield 'GET', share_url, dict(share_page, stage='acw_retry')  # 文件分享页面(第一页)
+            if not first_page:
+                return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
+            page = parse_share_page(first_page.text)
+            if page.kind == 'acw':  # 新算出的值也没有通过验证，不要让其他客户端继续使用
+                self._acw_store.invalidate(share_url, acw_sc__v2)
+
+        if page.kind == 'cancelled':
+            return LanZouFileDetail(request_info='文件已取消分享', share_pwd=pwd, share_url=share_url)
+
+        # 这里获取下载直链 304 重定向前的链接
+        if page.kind == 'password':  # 文件设置了提取码时
+            if len(pwd) == 0:
+                # 没给提取码直接退出
+                return LanZouFileDetail(request_info='文件密码错误', share_pwd=pwd, share_url=share_url)
+            if not page.sign:
+                self.logger.error(f"分享页面 {share_url} 中没有找到 sign")
+                return LanZouFileDetail(request_info='直链获取失败', share_pwd=pwd, share_url=share_url)
+
+            post_data = {'action': 'downprocess', 'sign': page.sign, 'p': pwd}
+            # 保存了重定向前的链接信息和文件名
+            link_info = yield 'POST', self._host_url + '/ajaxm.php', dict(share_page, data=post_data, stage='ajaxm')
+            # 再次请求文件分享页面，可以看见文件名，时间，大小等信息(第二页)
+            second_page = yield 'GET', share_url, dict(share_page, stage='password_page')
+            if not link_info or not second_page:
+                return LanZouFileDetail(request_info='网络错误', share_pwd=pwd, share_url=share_url)
+            link_info = link_info.json()
+            f_name = link_info['inf'].replace("*", "_")
+            f_size, f_time, f_desc = parse_password_info(second_page.text)
+            f_time = time_format(f_time)
+        else:  # 文件没有设置提取码时,文件信息都暴露在分享页面上
+            if page.kind != 'file' or not page.iframe:
+                self.logger.error(f"分享页面 {share_url} 解析失败")
+                return LanZouFileDetail(request_info='直链获取失败', share_pwd=pwd, share_url=share_url)
+
+            f_name, f_size, f_desc = page.name, page.size, page.desc
+            f_time = time_format(page.time)
+            frame_page = yield 'GET', self._host_url + page.iframe, dict(share_page, stage='iframe')  # 下载页面
+            if not frame_page:
+                return LanZouFileDetail(
+                    request_info='网络错误',
+                    name=f_name, time=f_time,
+                    size=f_size, desc=f_desc,
+                    share_pwd=pwd, share_url=share_url
+                )
+
+            # 某些特殊情况 share_url 会出现 webpage 参数, post_data 需要更多参数
+            post_data = parse_download_frame(frame_page.text, webpage="?webpage=" in share_url)
+            if post_data is None:
+                self.logger.error(f"下载页面 {share_url} 中没有找到 sign")
+                return LanZouFileDetail(request_info='直链获取失败', share_pwd=pwd, share_url=share_url)
+
+            link_info = yield 'POST', self._host_url + '/ajaxm.php', dict(share_page, data=post_data, stage='ajaxm')
+            if not link_info:
+                return LanZouFileDetail(
+                    request_info='网络错误',
+                    time=f_time, size=f_size,
+                    desc=f_desc, name=f_name,
+                    share_pwd=pwd, share_url=share_url
+                )
+            link_info = link_info.json()
+
+        # 这里开始获取文件直链
+        if link_info['zt'] != 1:  # 返回信息异常，无法获取直链
+            return LanZouFileDetail(
+                request_info='直链获取失败',
+                name=f_name, time=f_time,
+                size=f_size, desc=f_desc,
+                share_pwd=pwd,
+                share_url=share_url
+            )
+
+        fake_url = link_info['dom'] + '/file/' + link_info['url']  # 假直连，存在流量异常检测
+        download_page = yield 'GET', fake_url, dict(share_page, allow_redirects=False, stage='redirect')
+        if not download_page:
+            return LanZouFileDetail(
+                request_info='网络错误',
+                name=f_name, time=f_time,
+                size=f_size, desc=f_desc,
+                share_pwd=pwd, share_url=share_url
+            )
+
+        download_page.encoding = 'utf-8'
+        detail = LanZouFileDetail(
+            name=f_name, time=f_time,
+            size=f_size, desc=f_desc,
+            share_pwd=pwd, share_url=share_url
+        )
+        captcha = parse_captcha_page(download_page.text)
+        if captcha is None:  # 没有遇到验证码
+            direct_url = download_page.headers.get('Location', '')  # 重定向后的真直链；被拦截时没有跳转
+            return self._with_direct_url(detail, direct_url)
+
+        # 遇到验证码，验证后才能获取下载直链；限速信号已经在 _response_action 中发出
+        file_token, file_sign = captcha
+        if not (file_token and file_sign):
+            return self._with_direct_url(detail, '')
+        return LanZouCaptchaWait(
+            detail=detail,
+            post_data={'file': file_token, 'el': 2, 'sign': file_sign},
+            ready_at=time.monotonic() + self._captcha_delay,  # 这里必需等待2s, 否则直链返回 ?SignError
+        )
+
+    def _captcha_steps(self, pending: LanZouCaptchaWait) -> Generator[Call, object, LanZouFileDetail]:
+        """提交验证码，获取下载直链；调用前应已等待到 pending.ready_at"""
+        resp = yield 'POST', self._captcha_url, {'data': pending.post_data, 'need_check_cookie': False,
+                                                 'stage': 'captcha'}
+        return self._with_direct_url(pending.detail, resp.json()['url'] if resp else '')
+
+    @staticmethod
+    def _with_direct_url(detail: LanZouFileDetail, direct_url: str) -> LanZouFileDetail:
+        if not direct_url:
+            return replace(detail, request_info='直链获取失败')
+        return replace(
+            detail,
+            request_info='请求成功',
+            file_type=detail.name.split('.')[-1],
+            direct_url=direct_url
+        )
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 下载直链缓存，以 (分享链接, 提取码) 为键
+--------------------------------------------
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from dataclasses import asdict
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .type import LanZouFileDetail
+
+# 直链带有时效签名，过期后返回 SignError；默认缓存 10 分钟，给拿到直链后开始下载留出余量
+DEFAULT_TTL = 10 * 60
+
+
+class DirectUrlCache(object):
+    """
+    直链缓存基类，子类实现 _get / _set 即可
+
+    只缓存成功解析出直链的结果；命中、未命中、淘汰、过期次数分别计数，通过 stats() 查看。
+    get_direct_download_url 写入的条目只有直链，没有文件名等信息，需要完整信息时传入 need_info=True，这类条目按未命中计
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        """
+        @param ttl: 缓存有效期，单位秒
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(share_url: str, pwd: str) -> Tuple[str, str]:
+        return share_url.strip(), pwd or ''
+
+    def get(self, share_url: str, pwd: str = '', need_info: bool = False) -> Optional[LanZouFileDetail]:
+        """
+        @param share_url: 分享链接
+        @param pwd: 提取码
+        @param need_info: 为 True 时只返回带有文件信息的条目
+        """
+        detail = self._get(self._key(share_url, pwd))
+        if detail is not None and need_info and not detail.name:
+            detail = None
+        with self._lock:
+            if detail is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return detail
+
+    def set(self, share_url: str, pwd: str, detail: LanZouFileDetail):
+        if not detail.direct_url:
+            return
+        self._set(self._key(share_url, pwd), detail, time.time() + self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _get(self, key: Tuple[str, str]) -> Optional[LanZouFileDetail]:
+        raise NotImplementedError
+
+    def _set(self, key: Tuple[str, str], detail: LanZouFileDetail, expires_at: float):
+        raise NotImplementedError
+
+
+class MemoryDirectUrlCache(DirectUrlCache):
+    """进程内的 LRU 缓存，超过 max_size 时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size: int = 4096, ttl: float = DEFAULT_TTL):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._data: 'OrderedDict[Tuple[str, str], Tuple[float, LanZouFileDetail]]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, detail = item
+            if expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                return None
+
+            self._data.move_to_end(key)
+            return detail
+
+    def _set(self, key, detail, expires_at):
+        with self._lock:
+            self._data[key] = (expires_at, detail)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+
+class SQLiteDirectUrlCache(DirectUrlCache):
+    """
+    基于 SQLite 的缓存，多个进程指向同一个数据库文件即可共享
+
+    计数器只统计当前进程内的访问
+    """
+
+    def __init__(self, db_path: str, max_size: int = 100000, ttl: float = DEFAULT_TTL):
+        super().__init__(ttl)
+        self.db_path = db_path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._pending_trim = 0
+        self._trim_interval = max(1, min(64, max_size // 100))
+
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS direct_url_cache ('
+                'share_url TEXT NOT NULL, pwd TEXT NOT NULL, detail TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+                'PRIMARY KEY (share_url, pwd))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_direct_url_cache_accessed ON direct_url_cache (accessed_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """sqlite3 连接不能跨线程使用，每个线程各自持有一个"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')  # 允许多进程同时读写
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM direct_url_cache').fetchone()[0]
+
+    def _get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT detail, expires_at FROM direct_url_cache WHERE share_url = ? AND pwd = ?', key
+            ).fetchone()
+            if row is None:
+                return None
+
+            if row[1] <= now:
+                conn.execute('DELETE FROM direct_url_cache WHERE share_url = ? AND pwd = ?', key)
+                with self._lock:
+                    self.expirations += 1
+                return None
+
+            conn.execute('UPDATE direct_url_cache SET accessed_at = ? WHERE share_url = ? AND pwd = ?', (now, *key))
+        return LanZouFileDetail(**json.loads(row[0]))
+
+    def _set(self, key, detail, expires_at):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO direct_url_cache VALUES (?, ?, ?, ?, ?)',
+                (*key, json.dumps(asdict(detail), ensure_ascii=False), expires_at, now)
+            )
+
+            with self._lock:
+                self._pending_trim += 1
+                if self._pending_trim < self._trim_interval:
+                    return  # 统计行数需要扫描索引，攒够一批写入后再检查容量
+                self._pending_trim = 0
+
+            overflow = conn.execute('SELECT COUNT(*) FROM direct_url_cache').fetchone()[0] - self.max_size
+            if overflow > 0:
+                # 先清理已过期的，再按最近访问时间淘汰
+                conn.execute('DELETE FROM direct_url_cache WHERE expires_at <= ?', (now,))
+                overflow = conn.execute('SELECT COUNT(*) FROM direct_url_cache').fetchone()[0] - self.max_size
+            if overflow > 0:
+                conn.execute(
+                    'DELETE FROM direct_url_cache WHERE rowid IN '
+                    '(SELECT rowid FROM direct_url_cache ORDER BY accessed_at LIMIT ?)', (overflow,)
+                )
+                with self._lock:
+                    self.evictions += overflow
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 多连接分段下载，支持断点续传和直链过期后自动刷新
+--------------------------------------------
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Optional, Tuple
+
+import requests
+
+from .retry import RetryPolicy
+
+# 直链过期或签名失效时，CDN 返回的状态码
+_EXPIRED_STATUS = (401, 403, 404, 410)
+
+
+class RangeDownloader(object):
+    """
+    把文件按 HTTP Range 切成若干段，多个连接同时下载，直接写入预先分配好的目标文件
+
+    每完成一段就把进度写入 目标文件.lzdl，程序中断后重新运行会跳过已完成的段；
+    直链过期时调用 resolve_url 重新获取直链后继续下载。
+    """
+
+    def __init__(
+            self,
+            session: requests.Session,
+            resolve_url: Callable[[bool], str],
+            save_path: str,
+            *, connections: int = 4,
+            segment_size: int = 8 * 1048576,
+            headers: Optional[dict] = None,
+            timeout: float = 15,
+            max_refresh: int = 3,
+            retry_policy: Optional[RetryPolicy] = None,
+            callback: Optional[Callable] = None,
+            logger: Optional[logging.Logger] = None,
+    ):
+        """
+        @param session: requests.Session
+        @param resolve_url: 获取直链的函数，参数为是否强制刷新(当前直链已过期)
+        @param save_path: 保存路径
+        @param connections: 同时下载的连接数
+        @param segment_size: 每段大小(字节)
+        @param headers: 请求头
+        @param timeout: 单个请求的超时
+        @param max_refresh: 直链过期时最多重新获取几次
+        @param retry_policy: 重试策略，决定每段最多尝试几次以及两次尝试之间等待多久
+        @param callback: 下载进度回调函数，参数为 (文件名, 文件总大小, 已下载大小)
+        @param logger: 日志记录对象
+        """
+        self._session = session
+        self._resolve_url = resolve_url
+        self.save_path = save_path
+        self.state_path = save_path + '.lzdl'
+        self.connections = max(1, connections)
+        self.segment_size = segment_size
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.max_refresh = max_refresh
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.callback = callback
+        self.logger = logger or logging.getLogger('lanzou_api')
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # 获取直链期间持有；请求分享页面时不持有 _lock
+        self._url = ''
+        self._generation = 0  # 直链每替换一次加 1
+        self._refresh_count = 0
+        self._size = 0
+        self._done = set()
+        self._downloaded = 0
+        self._segment_progress = {}  # 正在下载的段已经写入的字节数
+
+    # ------------------------------------------------------------------ 直链
+
+    def _current_url(self) -> str:
+        with self._lock:
+            if self._url:
+                return self._url
+
+        with self._refresh_lock:
+            with self._lock:
+                if self._url:  # 等待期间其他线程已经获取到了
+                    return self._url
+            return self._swap_url(self._resolve_url(False))
+
+    def _refresh_url(self, expired_url: str) -> str:
+        """
+        直链过期时重新获取；多个线程同时发现过期时只刷新一次
+
+        获取直链需要请求分享页面(可能还要等待验证码)，因此在 _lock 之外进行，不阻塞其他连接记录进度；
+        _refresh_lock 保证同一时间只有一个线程在获取，其余线程等它完成后按代数判断是否已经刷新过
+        """
+        with self._lock:
+            if self._url != expired_url:
+                return self._url
+            generation = self._generation
+
+        with self._refresh_lock:
+            with self._lock:
+                if self._generation != generation:
+                    return self._url
+                if self._refresh_count >= self.max_refresh:
+                    raise RuntimeError('直链多次过期，放弃下载')
+                self._refresh_count += 1
+                count = self._refresh_count
+
+            self.logger.info(f'直链已过期，第 {count} 次重新获取')
+            return self._swap_url(self._resolve_url(True))
+
+    def _swap_url(self, url: str) -> str:
+        with self._lock:
+            self._url = url
+            self._generation += 1
+        return url
+
+    def _get(self, url: str, start: int, end: int) -> requests.Response:
+        headers = dict(self.headers, Range=f'bytes={start}-{end}')
+        return self._session.get(url, headers=headers, stream=True, timeout=self.timeout, verify=False)
+
+    def _open_range(self, start: int, end: int) -> Tuple[requests.Response, str]:
+        """请求一段数据，直链过期时自动刷新"""
+        url = self._current_url()
+        while True:
+            if not url:
+                raise RuntimeError('获取直链失败')
+            resp = self._get(url, start, end)
+            # 签名失效时有的 CDN 返回错误码，有的返回 200 的错误页面
+            expired_page = resp.status_code == 200 and 'text/html' in resp.headers.get('Content-Type', '')
+            if resp.status_code in _EXPIRED_STATUS or expired_page:
+                resp.close()
+                url = self._refresh_url(url)
+                continue
+            resp.raise_for_status()
+            return resp, url
+
+    # ------------------------------------------------------------------ 进度文件
+
+    def _load_state(self):
+        if not (os.path.isfile(self.state_path) and os.path.isfile(self.save_path)):
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except ValueError:
+            return
+        if state.get('size') == self._size and state.get('segment_size') == self.segment_size:
+            self._done = set(state.get('done', []))
+
+    def _save_state(self):
+        """先写临时文件再替换，避免中断时留下半个进度文件"""
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'size': self._size, 'segment_size': self.segment_size, 'done': sorted(self._done)}, file)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------------------------------------------------------------ 下载
+
+    def _report(self, size: int):
+        if self.callback is None:
+            return
+        with self._lock:
+            self._downloaded += size
+            downloaded = self._downloaded
+        self.callback(os.path.basename(self.save_path), self._size, downloaded)
+
+    def _download_segment(self, fd: int, index: int):
+        start = index * self.segment_size
+        end = min(start + self.segment_size, self._size) - 1
+        resp, _ = self._open_range(start, end)
+
+        with resp:
+            if resp.status_code != 206 and self._size > end - start + 1:
+                raise RuntimeError('服务器不支持分段下载')
+            offset = start
+            for chunk in resp.iter_content(256 * 1024):
+                _pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                self._segment_progress[index] = offset - start
+                self._report(len(chunk))
+
+        if offset != end + 1:
+            raise RuntimeError(f'第 {index} 段数据不完整: {offset - start}/{end - start + 1}')
+
+        with self._lock:
+            self._done.add(index)
+            self._segment_progress.pop(index, None)
+            self._save_state()
+
+    def _probe(self) -> int:
+        """请求第一个字节，从 Content-Range 中拿到文件总大小"""
+        resp, _ = self._open_range(0, 0)
+        with resp:
+            content_range = resp.headers.get('Content-Range', '')
+            if resp.status_code == 206 and '/' in content_range:
+                return int(content_range.rsplit('/', 1)[1])
+            return int(resp.headers.get('Content-Length') or 0)
+
+    def run(self) -> bool:
+        self._size = self._probe()
+        if self._size <= 0:
+            self.logger.error('无法获取文件大小')
+            return False
+
+        self._load_state()
+        if not self._done or not os.path.isfile(self.save_path):
+            self._done = set()
+            with open(self.save_path, 'wb') as file:
+                file.truncate(self._size)  # 预先分配空间，各段直接写入对应位置
+
+        segments = [i for i in range((self._size + self.segment_size - 1) // self.segment_size) if i not in self._done]
+        self._downloaded = sum(min(self.segment_size, self._size - i * self.segment_size) for i in self._done)
+        if self._done:
+            self.logger.info(f'断点续传，已完成 {len(self._done)} 段，剩余 {len(segments)} 段')
+
+        errors = []
+        queue = list(reversed(segments))
+
+        def _worker():
+            fd = os.open(self.save_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                while True:
+                    with self._lock:
+                        if not queue or errors:
+                            return
+                        index = queue.pop()
+                    attempts = self.retry_policy.max_attempts
+                    for attempt in range(1, attempts + 1):
+                        try:
+                            self._download_segment(fd, index)
+                            break
+                        except (requests.RequestException, RuntimeError, OSError) as e:
+                            self.logger.warning(f'下载第 {index} 段失败(第 {attempt} 次): {e!r}')
+                            self._report(-self._segment_progress.pop(index, 0))  # 重试时从头下载该段
+                            if attempt == attempts:
+                                with self._lock:
+                                    errors.append(e)
+                            else:
+                                time.sleep(self.retry_policy.delay(attempt))
+            finally:
+                os.close(fd)
+
+        threads = [threading.Thread(target=_worker, name=f'lanzou_download_{i}', daemon=True)
+                   for i in range(min(self.connections, len(segments)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            return False
+
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+        return True
+
+
+if hasattr(os, 'pwrite'):
+    def _pwrite(fd: int, data: bytes, offset: int):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+else:
+    def _pwrite(fd: int, data: bytes, offset: int):
+        # Windows 没有 pwrite；每个下载线程各自打开文件，文件位置互不影响
+        os.lseek(fd, offset, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
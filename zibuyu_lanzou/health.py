@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 域名健康度统计与熔断，多个备用域名之间优先使用最快的可用域名
+--------------------------------------------
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+CLOSED = 'closed'  # 正常
+OPEN = 'open'  # 熔断中，冷却时间内不再请求
+HALF_OPEN = 'half_open'  # 冷却结束，放行一个探测请求
+
+
+class _HostStat(object):
+    __slots__ = ('latency', 'successes', 'failures', 'consecutive_failures', 'state', 'open_until', 'cooldown',
+                 'probe_since', 'last_failure')
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # 最近请求耗时的指数加权平均
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.probe_since = 0.0
+        self.last_failure = 0.0
+
+
+class DomainHealth(object):
+    """
+    记录每个主机最近的请求耗时与失败次数，多个 LanZouApi 实例共享同一份统计
+
+    连续失败 failure_threshold 次后熔断该主机，冷却 cooldown 秒后放行一个探测请求：
+    探测成功恢复正常，失败则冷却时间翻倍(不超过 max_cooldown)。
+    """
+
+    def __init__(self, failure_threshold: int = 2, cooldown: float = 30, max_cooldown: float = 600,
+                 alpha: float = 0.3):
+        """
+        @param failure_threshold: 连续失败几次后熔断
+        @param cooldown: 第一次熔断的冷却时间(秒)
+        @param max_cooldown: 冷却时间上限(秒)
+        @param alpha: 耗时指数加权平均的系数，越大越看重最近的请求
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostStat] = {}
+
+    def _stat(self, host: str) -> _HostStat:
+        stat = self._hosts.get(host)
+        if stat is None:
+            stat = self._hosts[host] = _HostStat()
+        return stat
+
+    def order(self, urls: List[str]) -> List[str]:
+        """
+        按健康度排列候选 url
+
+        冷却结束的熔断主机排在最前面作为探测，其余正常主机按最近是否失败、耗时排序，从未请求过的主机保持原有顺序；
+        熔断中的主机不参与，除非所有主机都在熔断中，此时按冷却结束时间排序全部尝试一遍。
+        """
+
+        now = time.monotonic()
+        probes, healthy, blocked = [], [], []
+        with self._lock:
+            for position, url in enumerate(urls):
+                stat = self._stat(urlparse(url).netloc)
+                if stat.state == CLOSED:
+                    latency = float('inf') if stat.latency is None else stat.latency
+                    # 偶尔失败一次的主机只在冷却时间内排到后面，之后按耗时恢复原来的位置
+                    recently_failed = stat.consecutive_failures > 0 and now - stat.last_failure < self.cooldown
+                    healthy.append(((recently_failed, latency, position), url))
+                elif now >= stat.open_until and (stat.state == OPEN or now - stat.probe_since >= stat.cooldown):
+                    # 每个冷却周期只放行一个探测请求，探测请求迟迟没有结果时下个周期再放行
+                    stat.state = HALF_OPEN
+                    stat.probe_since = now
+                    probes.append(url)
+                else:
+                    blocked.append((stat.open_until, url))
+
+        ordered = probes + [url for _, url in sorted(healthy)]
+        return ordered or [url for _, url in sorted(blocked)]
+
+    def record_success(self, url: str, latency: float):
+        with self._lock:
+            stat = self._stat(urlparse(url).netloc)
+            stat.successes += 1
+            stat.consecutive_failures = 0
+            stat.latency = latency if stat.latency is None else self.alpha * latency + (1 - self.alpha) * stat.latency
+            stat.state = CLOSED
+            stat.cooldown = 0.0
+
+    def record_failure(self, url: str):
+        with self._lock:
+            stat = self._stat(urlparse(url).netloc)
+            stat.failures += 1
+            stat.consecutive_failures += 1
+            stat.last_failure = time.monotonic()
+            if stat.state == HALF_OPEN or stat.consecutive_failures >= self.failure_threshold:
+                stat.cooldown = min(stat.cooldown * 2, self.max_cooldown) if stat.cooldown else self.cooldown
+                stat.open_until = time.monotonic() + stat.cooldown
+                stat.state = OPEN
+
+    def ranking(self) -> List[dict]:
+        """当前所有主机的健康状况，按优先级排列，用于监控"""
+
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                'host': host,
+                'state': stat.state,
+                'latency': stat.latency,
+                'successes': stat.successes,
+                'failures': stat.failures,
+                'consecutive_failures': stat.consecutive_failures,
+                'retry_in': max(0.0, stat.open_until - now) if stat.state != CLOSED else 0.0,
+            } for host, stat in self._hosts.items()]
+
+        def _key(row):
+            latency = float('inf') if row['latency'] is None else row['latency']
+            return row['state'] != CLOSED, row['retry_in'], row['consecutive_failures'], latency
+
+        return sorted(rows, key=_key)
+
+    def reset(self, url_or_host: Optional[str] = None):
+        """清空统计；传入 url 或主机名时只清空该主机"""
+        with self._lock:
+            if url_or_host is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(urlparse(url_or_host).netloc or url_or_host, None)
+
+
+_shared_health = DomainHealth()
+
+
+def shared_domain_health() -> DomainHealth:
+    """进程内共享的域名健康度统计，未指定 domain_health 的客户端都使用它"""
+    return _shared_health
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 网盘文件(夹)元数据的本地 SQLite 索引
+--------------------------------------------
+"""
+
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import List, Optional, Union, TYPE_CHECKING
+
+from .type import LanZouFolder, LanZouFile
+
+if TYPE_CHECKING:
+    from .api import LanZouApi
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    has_pwd INTEGER NOT NULL DEFAULT 0,
+    desc TEXT NOT NULL DEFAULT '',
+    share_url TEXT NOT NULL DEFAULT '',
+    share_pwd TEXT NOT NULL DEFAULT '',
+    listing_hash TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_folders_path ON folders (path);
+CREATE INDEX IF NOT EXISTS idx_folders_name ON folders (name);
+CREATE INDEX IF NOT EXISTS idx_folders_parent ON folders (parent_id, name);
+
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    folder_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL DEFAULT '',
+    downs TEXT NOT NULL DEFAULT '',
+    has_pwd INTEGER NOT NULL DEFAULT 0,
+    has_des INTEGER NOT NULL DEFAULT 0,
+    share_url TEXT NOT NULL DEFAULT '',
+    share_pwd TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_files_name ON files (name);
+CREATE INDEX IF NOT EXISTS idx_files_folder ON files (folder_id, name);
+"""
+
+_FILE_COLUMNS = 'id, name, time, size, type, downs, has_pwd, has_des'
+_FOLDER_COLUMNS = 'id, name, has_pwd, desc'
+
+
+def _join_path(parent_path: str, name: str) -> str:
+    return parent_path.rstrip('/') + '/' + name
+
+
+def _subtree_range(path: str) -> tuple:
+    """path 下所有子孙路径的取值范围('0' 紧跟在 '/' 之后)，可以直接利用路径索引"""
+    prefix = path.rstrip('/')
+    return prefix + '/', prefix + '0'
+
+
+def _listing_hash(folder: LanZouFolder, files: List[LanZouFile]) -> str:
+    """
+    文件夹自身信息和文件列表的摘要，用来判断刷新时是否需要重写
+
+    不包含上传时间和下载次数：列表中的时间是"3 分钟前"这类相对时间，换算出的绝对时间每次刷新都不同，
+    下载次数也随时在变，放进摘要会让每个文件夹每次都被重写
+    """
+    rows = sorted(
+        (str(f.id), f.name, f.size, f.has_pwd, f.has_des) for f in files
+    )
+    payload = json.dumps([folder.name, folder.has_pwd, folder.desc, rows], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class LanZouIndex(object):
+    """
+    网盘元数据的本地索引
+
+    按 id、名称、路径查询都走 B 树索引；refresh() 从网盘同步，LanZouApi(index=...) 会在
+    上传、删除、设置提取码和描述之后同步更新索引，不需要每次重新列举。
+
+    index = LanZouIndex('lanzou.db')
+    index.refresh(handler, workers=8)
+    index.get_file_by_path('/备份/2024/data.zip')
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """sqlite3 连接不能跨线程使用，每个线程各自持有一个"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_file(row) -> LanZouFile:
+        return LanZouFile(
+            id=row[0], name=row[1], time=row[2], size=row[3], type=row[4], downs=row[5],
+            has_pwd=bool(row[6]), has_des=bool(row[7])
+        )
+
+    @staticmethod
+    def _to_folder(row) -> LanZouFolder:
+        return LanZouFolder(id=row[0], name=row[1], has_pwd=bool(row[2]), desc=row[3])
+
+    # ------------------------------------------------------------------ 查询
+
+    def get_file(self, file_id: Union[str, int]) -> Optional[LanZouFile]:
+        row = self._connect().execute(f'SELECT {_FILE_COLUMNS} FROM files WHERE id = ?', (str(file_id),)).fetchone()
+        return self._to_file(row) if row else None
+
+    def get_folder(self, folder_id: Union[str, int]) -> Optional[LanZouFolder]:
+        row = self._connect().execute(
+            f'SELECT {_FOLDER_COLUMNS} FROM folders WHERE id = ?', (str(folder_id),)
+        ).fetchone()
+        return self._to_folder(row) if row else None
+
+    def get_folder_by_path(self, path: str) -> Optional[LanZouFolder]:
+        """路径形如 /a/b，根目录为 /"""
+        row = self._connect().execute(
+            f'SELECT {_FOLDER_COLUMNS} FROM folders WHERE path = ?', (_join_path('', path.strip('/')),)
+        ).fetchone()
+        return self._to_folder(row) if row else None
+
+    def get_file_by_path(self, path: str) -> Optional[LanZouFile]:
+        """路径形如 /a/b/c.zip"""
+        folder_path, _, name = path.rstrip('/').rpartition('/')
+        row = self._connect().execute(
+            'SELECT f.id, f.name, f.time, f.size, f.type, f.downs, f.has_pwd, f.has_des '
+            'FROM folders d JOIN files f ON f.folder_id = d.id WHERE d.path = ? AND f.name = ?',
+            (_join_path('', folder_path.strip('/')), name)
+        ).fetchone()
+        return self._to_file(row) if row else None
+
+    def find_files(self, name: str) -> List[LanZouFile]:
+        """按文件名精确查找，可能存在于多个文件夹"""
+        rows = self._connect().execute(f'SELECT {_FILE_COLUMNS} FROM files WHERE name = ?', (name,)).fetchall()
+        return [self._to_file(row) for row in rows]
+
+    def find_folders(self, name: str) -> List[LanZouFolder]:
+        rows = self._connect().execute(f'SELECT {_FOLDER_COLUMNS} FROM folders WHERE name = ?', (name,)).fetchall()
+        return [self._to_folder(row) for row in rows]
+
+    def list_files(self, folder_id: Union[str, int] = -1) -> List[LanZouFile]:
+        rows = self._connect().execute(
+            f'SELECT {_FILE_COLUMNS} FROM files WHERE folder_id = ? ORDER BY name', (str(folder_id),)
+        ).fetchall()
+        return [self._to_file(row) for row in rows]
+
+    def list_folders(self, parent_id: Union[str, int] = -1) -> List[LanZouFolder]:
+        rows = self._connect().execute(
+            f'SELECT {_FOLDER_COLUMNS} FROM folders WHERE parent_id = ? ORDER BY name', (str(parent_id),)
+        ).fetchall()
+        return [self._to_folder(row) for row in rows]
+
+    def get_path(self, folder_id: Union[str, int]) -> Optional[str]:
+        row = self._connect().execute('SELECT path FROM folders WHERE id = ?', (str(folder_id),)).fetchone()
+        return row[0] if row else None
+
+    def get_share(self, fid: Union[str, int], is_file: bool = True) -> Optional[tuple]:
+        """返回已知的 (分享链接, 提取码)，未知时返回 None"""
+        table = 'files' if is_file else 'folders'
+        row = self._connect().execute(f'SELECT share_url, share_pwd FROM {table} WHERE id = ?', (str(fid),)).fetchone()
+        return (row[0], row[1]) if row and row[0] else None
+
+    # ------------------------------------------------------------------ 同步
+
+    def refresh(self, api: 'LanZouApi', root_folder_id: Union[str, int] = -1, workers: int = 4) -> dict:
+        """
+        从网盘同步 root_folder_id 下的整棵目录树
+
+        蓝奏云没有提供文件夹的修改时间，因此仍需列举每个文件夹；但只有列表摘要发生变化的文件夹才会重写文件记录，
+        已经不存在的文件夹连同其文件一起删除。列举失败的文件夹及其子文件夹保留原有记录，不参与删除。
+
+        @return: {'changed': 重写的文件夹数, 'unchanged': 未变化的文件夹数, 'removed': 删除的文件夹数,
+                  'failed': 列举失败的文件夹路径列表}
+        """
+
+        stats = {'changed': 0, 'unchanged': 0, 'removed': 0, 'failed': []}
+        root_id = str(root_folder_id)
+        root_path = self.get_path(root_id) or '/'
+        parent_ids = {root_path: self._get_parent_id(root_id)}
+        seen = set()
+
+        def _abs_path(rel_path: str) -> str:
+            return root_path if rel_path == '/' else _join_path(root_path, rel_path.strip('/'))
+
+        def _onerror(rel_path, folder, error):
+            api.logger.warning(f"{error}，保留索引中 {_abs_path(rel_path)} 下的原有记录")
+            stats['failed'].append(_abs_path(rel_path))
+
+        # walk 总是先返回父文件夹再返回子文件夹，因此可以按路径找到父文件夹 id
+        for rel_path, folder, files in api.walk(root_folder_id, workers=workers, onerror=_onerror):
+            path = _abs_path(rel_path)
+            folder_id = str(folder.id)
+            if rel_path == '/':
+                parent_id = parent_ids[root_path]
+            else:
+                parent_id = parent_ids.get(path.rpartition('/')[0] or '/')
+            parent_ids[path] = folder_id
+            seen.add(folder_id)
+
+            if rel_path == '/':
+                folder = self.get_folder(folder_id) or folder  # 起始文件夹的名称和描述不在列表结果里
+
+            digest = _listing_hash(folder, files)
+            conn = self._connect()
+            with conn:
+                row = conn.execute('SELECT listing_hash, path FROM folders WHERE id = ?', (folder_id,)).fetchone()
+                if row and row[0] == digest and row[1] == path:
+                    stats['unchanged'] += 1
+                    continue
+
+                self._upsert_folder(conn, folder, parent_id, path, digest)
+                self._replace_files(conn, folder_id, files)
+                stats['changed'] += 1
+
+        conn = self._connect()
+        with conn:
+            rows = conn.execute('SELECT id, path FROM folders WHERE path > ? AND path < ?', _subtree_range(root_path))
+            failed = [(p, *_subtree_range(p)) for p in stats['failed']]
+            stale = [r[0] for r in rows if r[0] not in seen
+                     and not any(r[1] == p or low < r[1] < high for p, low, high in failed)]
+            for folder_id in stale:
+                conn.execute('DELETE FROM files WHERE folder_id = ?', (folder_id,))
+                conn.execute('DELETE FROM folders WHERE id = ?', (folder_id,))
+            stats['removed'] = len(stale)
+
+        return stats
+
+    def _get_parent_id(self, folder_id: str) -> Optional[str]:
+        row = self._connect().execute('SELECT parent_id FROM folders WHERE id = ?', (folder_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _upsert_folder(conn, folder: LanZouFolder, parent_id: Optional[str], path: str, digest: str = ''):
+        # 路径唯一，同名文件夹被删除后重建时 id 会变化，先清掉旧记录
+        conn.execute('DELETE FROM folders WHERE path = ? AND id != ?', (path, str(folder.id)))
+        conn.execute(
+            'INSERT INTO folders (id, parent_id, name, path, has_pwd, desc, listing_hash) VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET parent_id = excluded.parent_id, name = excluded.name, '
+            'path = excluded.path, has_pwd = excluded.has_pwd, desc = excluded.desc, '
+            'listing_hash = excluded.listing_hash',
+            (str(folder.id), parent_id, folder.name, path, int(folder.has_pwd), folder.desc, digest)
+        )
+
+    @staticmethod
+    def _replace_files(conn, folder_id: str, files: List[LanZouFile]):
+        """重写某个文件夹的文件记录，保留已知的分享链接和提取码"""
+        known = {r[0]: (r[1], r[2]) for r in conn.execute(
+            'SELECT id, share_url, share_pwd FROM files WHERE folder_id = ?', (folder_id,)
+        )}
+        conn.execute('DELETE FROM files WHERE folder_id = ?', (folder_id,))
+        conn.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(str(f.id), folder_id, f.name, f.size or '', f.time or '', f.type or '', f.downs or '',
+              int(f.has_pwd), int(f.has_des), *known.get(str(f.id), ('', ''))) for f in files]
+        )
+
+    # ------------------------------------------------------------------ 增量更新，由 LanZouApi 在操作成功后调用
+
+    def add_file(self, folder_id: Union[str, int], file: LanZouFile):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(file.id), str(folder_id), file.name, file.size or '', file.time or '', file.type or '',
+                 file.downs or '', int(file.has_pwd), int(file.has_des), '', '')
+            )
+            # 文件夹内容已变化，下一次 refresh 需要重新比对
+            conn.execute("UPDATE folders SET listing_hash = '' WHERE id = ?", (str(folder_id),))
+
+    def add_folder(self, parent_id: Union[str, int], folder: LanZouFolder):
+        parent_path = self.get_path(parent_id)
+        if parent_path is None:
+            return  # 父文件夹不在索引中，等待下一次 refresh
+        with self._connect() as conn:
+            self._upsert_folder(conn, folder, str(parent_id), _join_path(parent_path, folder.name))
+
+    def remove(self, fid: Union[str, int], is_file: bool = True):
+        fid = str(fid)
+        with self._connect() as conn:
+            if is_file:
+                conn.execute(
+                    "UPDATE folders SET listing_hash = '' WHERE id = (SELECT folder_id FROM files WHERE id = ?)", (fid,)
+                )
+                conn.execute('DELETE FROM files WHERE id = ?', (fid,))
+                return
+
+            row = conn.execute('SELECT path FROM folders WHERE id = ?', (fid,)).fetchone()
+            if row is None:
+                return
+            for (folder_id,) in conn.execute(
+                    'SELECT id FROM folders WHERE id = ? OR (path > ? AND path < ?)', (fid, *_subtree_range(row[0]))
+            ).fetchall():
+                conn.execute('DELETE FROM files WHERE folder_id = ?', (folder_id,))
+                conn.execute('DELETE FROM folders WHERE id = ?', (folder_id,))
+
+    def set_pwd(self, fid: Union[str, int], pwd: str, is_file: bool = True):
+        table = 'files' if is_file else 'folders'
+        with self._connect() as conn:
+            conn.execute(f'UPDATE {table} SET has_pwd = ?, share_pwd = ? WHERE id = ?', (int(bool(pwd)), pwd, str(fid)))
+
+    def set_desc(self, fid: Union[str, int], desc: str, is_file: bool = True):
+        with self._connect() as conn:
+            if is_file:
+                conn.execute('UPDATE files SET has_des = ? WHERE id = ?', (int(bool(desc)), str(fid)))
+            else:
+                conn.execute('UPDATE folders SET desc = ? WHERE id = ?', (desc, str(fid)))
+
+    def set_share(self, fid: Union[str, int], url: str, pwd: str, is_file: bool = True):
+        table = 'files' if is_file else 'folders'
+        with self._connect() as conn:
+            conn.execute(
+                f'UPDATE {table} SET share_url = ?, share_pwd = ?, has_pwd = ? WHERE id = ?',
+                (url, pwd, int(bool(pwd)), str(fid))
+            )
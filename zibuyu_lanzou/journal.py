@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 目录上传的断点续传记录
+--------------------------------------------
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Union
+
+
+class UploadJournal(object):
+    """
+    记录已经上传完成的文件，每完成一个文件追加一行 json，任务中断后重新运行会跳过这些文件
+
+    以 (相对路径, 文件大小, 修改时间) 判断文件是否已上传，本地文件被修改过会重新上传
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self._lock = threading.Lock()
+        self._done: Dict[str, dict] = {}
+
+        broken_tail = False
+        if os.path.isfile(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    broken_tail = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 上次中断时可能写了半行
+                    self._done[record['path']] = record
+
+        self._file = open(journal_path, 'a', encoding='utf-8')
+        if broken_tail:  # 先结束上次的半行，否则新的记录会接在它后面，下次同样无法解析
+            self._file.write('\n')
+            self._file.flush()
+
+    def __len__(self):
+        return len(self._done)
+
+    def is_done(self, rel_path: str, size: int, mtime: float) -> bool:
+        record = self._done.get(rel_path)
+        return record is not None and record['size'] == size and record['mtime'] == mtime
+
+    def record(self, rel_path: str, size: int, mtime: float, file_ids: List[Union[str, int]]):
+        line = {'path': rel_path, 'size': size, 'mtime': mtime, 'ids': file_ids}
+        with self._lock:
+            self._done[rel_path] = line
+            self._file.write(json.dumps(line, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 请求指标统计(按 操作/域名/结果 计数与耗时分布)，可以导出为 Prometheus 文本格式
+--------------------------------------------
+"""
+
+import time
+import bisect
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 请求结果
+OK = 'ok'
+RETRY_STATUS = 'retry_status'  # 状态码在重试策略中，例如 503
+HTTP_ERROR = 'http_error'  # 其他非 200 状态码或空响应
+NOT_JSON = 'not_json'  # post 接口返回了网页，一般是被防火墙拦截
+RETRY_ZT = 'retry_zt'  # 接口要求稍后再试
+EXCEPTION = 'exception'  # 连接失败、超时等
+
+
+@dataclass
+class RequestEvent:
+    """传给请求钩子的一次请求(同一个请求换域名、重试时每次尝试各算一次)"""
+
+    operation: str  # 例如 task_47、upload、share_page、ajaxm
+    method: str
+    url: str
+    domain: str
+    attempt: int = 1  # 第几轮尝试
+    status_code: Optional[int] = None  # 以下字段在请求结束后才有值
+    outcome: str = ''
+    elapsed: float = 0.0
+    error: Optional[BaseException] = None
+
+
+def operation_label(url: str, data=None) -> str:
+    """没有显式指定操作名时，根据 url 与请求数据推断"""
+
+    if 'doupload.php' in url and isinstance(data, dict) and 'task' in data:
+        return f"task_{data['task']}"
+    if 'html5up.php' in url:
+        return 'upload'
+    path = urlparse(url).path.rsplit('/', 1)[-1]
+    return path.split('.', 1)[0] or 'other'
+
+
+class _Histogram(object):
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size  # 每个桶内(不累计)的次数，最后一个为 +Inf
+        self.total = 0.0
+        self.count = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics(object):
+    """
+    请求次数与耗时分布，多个 LanZouApi 实例可以共用同一个统计
+
+    计数按 (操作, 域名, 结果) 统计，耗时分布按 (操作, 域名) 统计；
+    分享链接的二级域名各不相同，域名标签的取值会随解析过的链接增多。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = 'lanzou'):
+        """
+        @param buckets: 耗时分布的桶上限(秒)，从小到大排列
+        @param prefix: 导出的指标名前缀
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str, str], int] = {}
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._events: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}  # inc() 记录的其他计数
+
+    def observe(self, operation: str, domain: str, outcome: str, seconds: float):
+        """记录一次请求(或一个阶段)的结果与耗时"""
+
+        index = bisect.bisect_left(self.buckets, seconds)  # 桶的上限是包含在内的
+        with self._lock:
+            key = (operation, domain, outcome)
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+            histogram = self._histograms.get((operation, domain))
+            if histogram is None:
+                histogram = self._histograms[(operation, domain)] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def inc(self, name: str, amount: int = 1, **labels: str):
+        """其他事件的计数，例如 inc('throttle_signals', site='lanzouo.com', signal='acw')、inc('upload_bytes', 1024)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._events[key] = self._events.get(key, 0) + amount
+
+    def count(self, name: str, **labels: str) -> int:
+        """inc() 记录的计数，只指定部分标签时返回所有匹配的计数之和"""
+        with self._lock:
+            return sum(count for (event, event_labels), count in self._events.items()
+                       if event == name and all(dict(event_labels).get(k) == v for k, v in labels.items()))
+
+    def record(self, event: RequestEvent):
+        self.observe(event.operation, event.domain, event.outcome, event.elapsed)
+
+    def timer(self, operation: str, domain: str = ''):
+        """统计一段代码的耗时，例如等待验证码的时间"""
+        return _Timer(self, operation, domain)
+
+    def snapshot(self) -> List[dict]:
+        """当前的统计结果，每个 (操作, 域名) 一行"""
+
+        with self._lock:
+            rows = {}
+            for (operation, domain), histogram in self._histograms.items():
+                rows[(operation, domain)] = {
+                    'operation': operation,
+                    'domain': domain,
+                    'count': histogram.count,
+                    'seconds': histogram.total,
+                    'outcomes': {},
+                }
+            for (operation, domain, outcome), count in self._counters.items():
+                rows[(operation, domain)]['outcomes'][outcome] = count
+        return [rows[key] for key in sorted(rows)]
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式(text/plain; version=0.0.4)"""
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(h.counts), h.total, h.count) for key, h in self._histograms.items())
+            events = sorted(self._events.items())
+
+        name = f'{self.prefix}_requests_total'
+        lines = [f'# HELP {name} 请求次数', f'# TYPE {name} counter']
+        for (operation, domain, outcome), count in counters:
+            lines.append(f'{name}{{operation="{_escape(operation)}",domain="{_escape(domain)}",'
+                         f'outcome="{_escape(outcome)}"}} {count}')
+
+        name = f'{self.prefix}_request_duration_seconds'
+        lines += [f'# HELP {name} 请求耗时', f'# TYPE {name} histogram']
+        for (operation, domain), counts, total, count in histograms:
+            labels = f'operation="{_escape(operation)}",domain="{_escape(domain)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+
+        family = None
+        for (event, labels), count in events:
+            name = f'{self.prefix}_{event}_total'
+            if event != family:
+                family = event
+                lines.append(f'# TYPE {name} counter')
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f'{name}{{{label_text}}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._events.clear()
+
+
+class _Timer(object):
+    __slots__ = ('metrics', 'operation', 'domain', 'start')
+
+    def __init__(self, metrics: Metrics, operation: str, domain: str):
+        self.metrics = metrics
+        self.operation = operation
+        self.domain = domain
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        outcome = OK if exc_type is None else EXCEPTION
+        self.metrics.observe(self.operation, self.domain, outcome, time.monotonic() - self.start)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 分享页面解析，所有正则在导入时编译，每个页面尽量只扫描一遍
+--------------------------------------------
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# 蓝奏云的前端程序员喜欢改完代码就把原来的代码注释掉,就直接推到生产环境了 =_=
+# 依次为: html 注释、前面有空白的 // 注释、紧跟在 , 或 ; 后面的 // 注释
+# 原来用两次 re.sub，其中 (.+?[,;])\s*//.+ 在每个字符位置都要向后试探整行，长的一行 js 会退化为平方复杂度
+_COMMENT = re.compile(r'<!--.+?-->|\s+//\s*.+|(?<=[,;])//.+')
+
+_ACW = 'acw_sc__v2'
+_CANCELLED = ('文件取消', '文件不存在')
+_PASSWORD = ('id="pwdload"', 'id="passwddiv"')
+
+_IFRAME = re.compile(r'<iframe.*?src="(.+?)"')
+# 文件名位置变化很多，按顺序尝试
+_NAMES = (
+    re.compile(r"<title>(.+?) - 蓝奏云</title>"),
+    re.compile(r'<div class="filethetext".+?>([^<>]+?)</div>'),
+    re.compile(r'<div style="font-size.+?>([^<>].+?)</div>'),
+    re.compile(r"var filename = '(.+?)';"),
+    re.compile(r'id="filenajax">(.+?)</div>'),
+    re.compile(r'<div class="b"><span>([^<>]+?)</span></div>'),
+)
+_TIME = re.compile(r'>(\d+\s?[秒天分小][钟时]?前|[昨前]天\s?[\d:]+?|\d+\s?天前|\d{4}-\d\d-\d\d)<')
+_SIZE = re.compile(r'大小.+?(\d[\d.,]+\s?[BKM]?)<')
+_DESC = re.compile(r'文件描述.+?<br>\n?\s*(.*?)\s*</td>')
+
+_PWD_TIME = re.compile(r'class="n_file_infos">(.+?)</span>')
+_PWD_DESC = re.compile(r'class="n_box_des">(.*?)</div>')
+
+_VAR = re.compile(r"var\s+(\w+)\s*=\s*'(.*?)';")  # 页面脚本里所有 var xxx = '...'; 一次取出
+_SIGN = re.compile(r"'sign':(.+?),")
+_WEB_SIGN_NAMES = ('websign', 'awebsign', 'websigna', 'awebsigna')  # 对应原来的 var a?websigna?
+_WEB_SIGN_KEY_NAMES = ('websignkey', 'cwebsignkey', 'websignkeyc', 'cwebsignkeyc')
+_CAPTCHA_FILE = re.compile(r"'file':'(.+?)'")
+_CAPTCHA_SIGN = re.compile(r"'sign':'(.+?)'")
+_CAPTCHA = '网络异常'
+
+DEFAULT_TIME = '0 小时前'  # 页面上没有时间信息时视为今天
+DEFAULT_SIZE = '0 M'
+
+
+@dataclass
+class SharePage:
+    """文件分享页面(第一页)的解析结果"""
+
+    kind: str = 'unknown'  # file: 无提取码; password: 需要提取码; acw: 反爬验证页面; cancelled: 已取消分享
+    name: str = ''
+    time: str = ''  # 原始的时间文本，需要再经过 time_format
+    size: str = ''
+    desc: str = ''
+    iframe: str = ''  # 无提取码时，下载页面的地址
+    sign: str = ''  # 有提取码时，提交提取码用的 sign
+
+
+def strip_comments(html: str) -> str:
+    """删除网页里的 html 注释与 js 注释，防止注释掉的旧代码干扰提取"""
+    return _COMMENT.sub('', html)
+
+
+def _first(pattern, text: str, default: str = '') -> str:
+    match = pattern.search(text)
+    return match.group(1) if match else default
+
+
+def _variables(html: str) -> Dict[str, str]:
+    """页面脚本中的变量，按出现顺序排列，同名变量以第一次出现的为准"""
+    variables = {}
+    for name, value in _VAR.findall(html):
+        variables.setdefault(name, value)
+    return variables
+
+
+def is_acw_page(html: str) -> bool:
+    """是否为 acw_sc__v2 验证页面(需要计算 cookie 后重新请求)"""
+    return _ACW in html
+
+
+def parse_share_page(html: str) -> SharePage:
+    """解析文件分享页面，html 为原始页面，不需要先去除注释"""
+
+    if is_acw_page(html):
+        return SharePage(kind='acw')
+
+    html = strip_comments(html)
+    if any(flag in html for flag in _CANCELLED):
+        return SharePage(kind='cancelled')
+
+    if any(flag in html for flag in _PASSWORD):
+        return SharePage(kind='password', sign=_variables(html).get('skdklds', ''))
+
+    name = ''
+    for pattern in _NAMES:
+        match = pattern.search(html)
+        if match:
+            name = match.group(1).replace("*", "_")
+            break
+
+    return SharePage(
+        kind='file',
+        name=name or '未匹配到文件名',
+        time=_first(_TIME, html, DEFAULT_TIME),
+        size=_first(_SIZE, html, DEFAULT_SIZE).replace(",", ""),
+        desc=_first(_DESC, html),
+        iframe=_first(_IFRAME, html),
+    )
+
+
+def parse_password_info(html: str) -> Tuple[str, str, str]:
+    """
+    提交提取码后再次请求的分享页面，返回 (大小, 原始时间文本, 描述)
+    """
+    html = strip_comments(html)
+    size = _first(_SIZE, html, DEFAULT_SIZE).replace(",", "")
+    return size, _first(_PWD_TIME, html, DEFAULT_TIME), _first(_PWD_DESC, html)
+
+
+def parse_download_frame(html: str, webpage: bool = False) -> Optional[dict]:
+    """
+    解析无提取码文件的下载页面(iframe)，返回提交给 ajaxm.php 的数据，解析失败返回 None
+
+    @param html: 下载页面的原始内容
+    @param webpage: 分享链接是否带有 ?webpage= 参数，此时需要更多参数
+    """
+
+    html = strip_comments(html)
+    sign = _first(_SIGN, html)
+    if not sign:
+        return None
+
+    variables = _variables(html)
+    if len(sign) < 20:  # 一般情况 sign 的值就在 data 里，有时放在变量里面, 变量名是 sign 匹配的字符
+        sign = variables.get(sign, '')
+        if not sign:
+            return None
+
+    if not webpage:
+        return {'action': 'downprocess', 'sign': sign, 'ves': 1}
+
+    # https://github.com/zaxtyson/LanZouCloud-API/issues/74
+    # https://github.com/zaxtyson/LanZouCloud-API/issues/81
+    ajax_data = variables.get('ajaxdata')
+    web_sign = next((v for k, v in variables.items() if k in _WEB_SIGN_NAMES), None)
+    web_sign_key = next((v for k, v in variables.items() if k in _WEB_SIGN_KEY_NAMES), None)
+    if ajax_data is None or web_sign is None or web_sign_key is None:
+        return None
+    return {'action': 'downprocess', 'signs': ajax_data, 'sign': sign, 'ves': 1,
+            'websign': web_sign, 'websignkey': web_sign_key}
+
+
+def parse_captcha_page(html: str) -> Optional[Tuple[str, str]]:
+    """
+    访问假直链时遇到验证页面返回 (file, sign)，其中解析失败的字段为空字符串；没有遇到验证返回 None
+    """
+    html = strip_comments(html)
+    if _CAPTCHA not in html:
+        return None
+    return _first(_CAPTCHA_FILE, html), _first(_CAPTCHA_SIGN, html)
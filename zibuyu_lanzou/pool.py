@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 多账号池，把上传与接口调用分摊到多个账号上，突破单个账号的限速
+--------------------------------------------
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, Union
+
+from .api import LanZouApi
+from .metrics import OK, RequestEvent
+from .type import LanZouCookie, LanZouCookieError, LanZouFile, LanZouFolder, LanZouShareInfo, LanZouFileDetail
+
+T = TypeVar('T')
+
+
+class _Account(object):
+    __slots__ = ('name', 'api', 'in_flight', 'requests', 'errors', 'recent', 'available', 'reason')
+
+    def __init__(self, name: str, api: LanZouApi):
+        self.name = name
+        self.api = api
+        self.in_flight = 0  # 正在执行的操作数
+        self.requests = 0  # 实际发出的请求数(包括换域名与重试)
+        self.errors = 0
+        self.recent = deque()  # 最近 rate_window 秒内每个请求的时间，用来计算请求速率
+        self.available = True
+        self.reason = ''  # 不可用的原因
+
+
+class AccountPool(object):
+    """
+    多账号池，每个账号一个 LanZouApi 实例
+
+    不指定账号的操作交给 正在执行的操作最少、最近请求最少 的可用账号；
+    账号的 cookie 缺失或服务器返回登录失效后标记为不可用，不再分配，正在执行的操作换一个账号重试。
+
+    文件与文件夹属于具体的账号，对已有文件的操作(设置提取码、删除等)需要通过 account 指定账号，
+    上传到根目录(-1)以外的文件夹同样需要指定。账号名为 cookie 中的 ylogin(用户 id)。
+
+    登录失效的判断见 LanZouApiBase._is_login_expired：需要登录的接口返回 zt=9(或 info 提示重新登录)时，
+    该客户端的 session_valid 变为 False，账号池随即停用该账号；之后指定该账号的操作直接抛出 LanZouCookieError，
+    调用 set_cookies 换上新的 cookie 后重新启用。
+    """
+
+    def __init__(
+            self,
+            cookies: Iterable[LanZouCookie],
+            logger: Optional[logging.Logger] = None,
+            rate_window: float = 60,
+            api_factory: Optional[Callable[[LanZouCookie], LanZouApi]] = None,
+            **api_kwargs
+    ):
+        """
+        @param cookies: 各个账号的 cookie
+        @param logger: 日志记录对象，同时传给每个 LanZouApi
+        @param rate_window: 统计请求速率的时间窗口(秒)
+        @param api_factory: 自定义创建 LanZouApi 的函数，为空时使用 LanZouApi(cookie, logger, **api_kwargs)
+        @param api_kwargs: 传给每个 LanZouApi 的其他参数，例如 pool_maxsize、retry_policy
+        """
+
+        self.logger = logger or logging.getLogger('lanzou_api')
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, _Account] = {}
+
+        for cookie in cookies:
+            if api_factory is not None:
+                api = api_factory(cookie)
+            else:
+                api = LanZouApi(cookies=cookie, logger=self.logger, **api_kwargs)
+            account = _Account(str(cookie.ylogin), api)
+            api.add_request_hook(after=self._request_hook(account))
+            self._accounts[account.name] = account
+
+        if not self._accounts:
+            raise ValueError('至少需要一个账号的 cookie')
+
+    def _request_hook(self, account: _Account):
+        def _after(event: RequestEvent):
+            now = time.monotonic()
+            with self._lock:
+                account.requests += 1
+                account.errors += event.outcome != OK
+                account.recent.append(now)
+                while account.recent and now - account.recent[0] > self.rate_window:
+                    account.recent.popleft()
+
+        return _after
+
+    @property
+    def accounts(self) -> List[str]:
+        return list(self._accounts)
+
+    def api(self, account: str) -> LanZouApi:
+        """指定账号的客户端"""
+        return self._accounts[account].api
+
+    def _pick(self, exclude=()) -> _Account:
+        with self._lock:
+            candidates = [a for a in self._accounts.values() if a.available and a.name not in exclude]
+            if not candidates:
+                raise LanZouCookieError('没有可用的账号')
+            account = min(candidates, key=lambda a: (a.in_flight, len(a.recent), a.errors))
+            account.in_flight += 1
+            return account
+
+    @contextmanager
+    def _use(self, account: _Account):
+        try:
+            yield account.api
+        finally:
+            with self._lock:
+                account.in_flight -= 1
+
+    def mark_unavailable(self, account: str, reason: str = ''):
+        with self._lock:
+            target = self._accounts[account]
+            target.available = False
+            target.reason = reason
+        self.logger.warning(f"账号 {account} 已停用: {reason}")
+
+    def set_cookies(self, account: str, cookies: LanZouCookie):
+        """更换账号的 cookie(例如重新登录之后)，并重新启用该账号"""
+        target = self._accounts[account]
+        target.api.set_cookies(cookies)
+        with self._lock:
+            target.available = True
+            target.reason = ''
+        self.logger.info(f"账号 {account} 已更换 cookie，重新启用")
+
+    def run(self, func: Callable[[LanZouApi], T], account: Optional[str] = None) -> Tuple[str, T]:
+        """
+        在一个账号上执行 func(api)，返回 (账号名, func 的返回值)
+
+        @param func: 接收 LanZouApi 的函数，例如 lambda api: api.get_share_info(fid)
+        @param account: 指定账号；为空时选择负载最低的可用账号，该账号登录失效时自动换一个账号重试
+        """
+
+        if account is not None:
+            target = self._accounts[account]
+            with self._lock:
+                if not target.available:
+                    raise LanZouCookieError(f'账号 {account} 已停用: {target.reason}')
+                target.in_flight += 1
+            with self._use(target) as api:
+                try:
+                    return account, func(api)
+                finally:
+                    self._check(target)
+
+        tried = []
+        while True:
+            target = self._pick(exclude=tried)
+            tried.append(target.name)
+            with self._use(target) as api:
+                try:
+                    result = func(api)
+                except LanZouCookieError as e:
+                    self._check(target, str(e))
+                    continue
+                except Exception:
+                    if not self._check(target):
+                        continue  # 登录失效导致的异常(例如列举文件夹时返回 zt=9)，换一个账号重试
+                    raise
+            if self._check(target):
+                return target.name, result
+            # 登录失效导致的失败，请求没有生效，换一个账号重试
+
+    def _check(self, account: _Account, reason: str = '') -> bool:
+        """检查账号是否还可用，不可用时停用并返回 False"""
+        if account.api.session_valid and not reason:
+            return True
+        with self._lock:
+            account.errors += 1
+        if account.available:
+            self.mark_unavailable(account.name, reason or '登录已失效')
+        return False
+
+    def upload_file(self, file_path: str, folder_id=-1, account: Optional[str] = None,
+                    **kwargs) -> Tuple[str, List[LanZouFile]]:
+        """上传文件，返回 (账号名, 上传成功的文件列表)，其他参数与 LanZouApi.upload_file 相同"""
+        return self.run(lambda api: api.upload_file(file_path, folder_id=folder_id, **kwargs), account)
+
+    # 以下方法与 LanZouApi 的同名方法相同，返回 (账号名, 结果)。
+    # 不指定账号时按负载选择账号，登录失效时换一个账号重试；folder_id 为 -1 以外的文件夹、已有的文件需要指定账号
+
+    def get_file_list(self, folder_id: Union[str, int] = -1,
+                      account: Optional[str] = None) -> Tuple[str, List[LanZouFile]]:
+        return self.run(lambda api: api.get_file_list(folder_id), account)
+
+    def get_dir_list(self, folder_id: Union[str, int] = -1,
+                     account: Optional[str] = None) -> Tuple[str, List[LanZouFolder]]:
+        return self.run(lambda api: api.get_dir_list(folder_id), account)
+
+    def mkdir(self, parent_id: Union[str, int] = -1, folder_name: str = '', desc: str = '',
+              account: Optional[str] = None) -> Tuple[str, Optional[LanZouFolder]]:
+        return self.run(lambda api: api.mkdir(parent_id, folder_name, desc), account)
+
+    def get_share_info(self, fid, is_file: bool = True, *, account: str) -> Tuple[str, LanZouShareInfo]:
+        return self.run(lambda api: api.get_share_info(fid, is_file), account)
+
+    def set_passwd(self, fid, passwd: str = '', is_file: bool = True, *, account: str) -> Tuple[str, bool]:
+        return self.run(lambda api: api.set_passwd(fid, passwd, is_file), account)
+
+    def set_desc(self, fid, desc: str, is_file: bool = True, *, account: str) -> Tuple[str, bool]:
+        return self.run(lambda api: api.set_desc(fid, desc, is_file), account)
+
+    def delete_file_or_folder(self, fid, is_file: bool = True, *, account: str) -> Tuple[str, bool]:
+        return self.run(lambda api: api.delete_file_or_folder(fid, is_file), account)
+
+    def get_file_info_by_url(self, share_url: str, pwd: str = '',
+                             account: Optional[str] = None) -> Tuple[str, LanZouFileDetail]:
+        """解析分享链接不需要登录，分摊到各个账号的连接与限速器上"""
+        return self.run(lambda api: api.get_file_info_by_url(share_url, pwd), account)
+
+    def stats(self) -> List[dict]:
+        """各账号的负载与错误统计"""
+
+        now = time.monotonic()
+        with self._lock:
+            rows = []
+            for account in self._accounts.values():
+                while account.recent and now - account.recent[0] > self.rate_window:
+                    account.recent.popleft()
+                rows.append({
+                    'account': account.name,
+                    'available': account.available,
+                    'reason': account.reason,
+                    'in_flight': account.in_flight,
+                    'requests': account.requests,
+                    'errors': account.errors,
+                    'rate': len(account.recent) / self.rate_window,  # 最近的请求速率(次/秒)
+                })
+        return rows
+
+    def close(self):
+        for account in self._accounts.values():
+            account.api.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 批量解析分享链接的下载直链
+--------------------------------------------
+"""
+
+import time
+import heapq
+import logging
+import itertools
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from .api import LanZouApi
+from .type import LanZouFileDetail, LanZouCaptchaWait
+
+ShareItem = Union[str, Tuple[str, str]]
+
+
+def _split_item(item: ShareItem) -> Tuple[str, str]:
+    """支持直接传入分享链接，或 (分享链接, 提取码) 元组"""
+    if isinstance(item, str):
+        return item, ''
+    share_url, pwd = item
+    return share_url, pwd or ''
+
+
+def _begin_one(api: LanZouApi, share_url: str, pwd: str) -> Union[LanZouFileDetail, LanZouCaptchaWait]:
+    """单个链接出错不影响其他链接，异常统一转换为失败结果"""
+    try:
+        return api.begin_file_info(share_url, pwd)
+    except Exception as e:
+        api.logger.error(f'解析分享链接 {share_url} 时发生错误: {e!r}')
+        return LanZouFileDetail(request_info='直链获取失败', share_url=share_url, share_pwd=pwd)
+
+
+def _finish_one(api: LanZouApi, pending: LanZouCaptchaWait) -> LanZouFileDetail:
+    try:
+        return api.finish_file_info(pending)
+    except Exception as e:
+        api.logger.error(f'解析分享链接 {pending.detail.share_url} 时发生错误: {e!r}')
+        return replace(pending.detail, request_info='直链获取失败')
+
+
+def resolve_many(
+        items: Iterable[ShareItem],
+        workers: int = 8,
+        per_host: int = 4,
+        api: Optional[LanZouApi] = None,
+        logger: Optional[logging.Logger] = None,
+) -> Iterator[LanZouFileDetail]:
+    """
+    并发解析多个分享链接，哪个先完成就先返回哪个(不保证与输入顺序一致)
+
+    每个链接需要依次请求分享页、iframe 页、ajaxm.php 和 /file/ 跳转页，多个链接分别处于不同阶段，
+    各阶段的请求按主机分别限流，避免某一个域名被瞬间打满。
+    遇到验证码的链接需要等待 2 秒才能提交验证，这些链接放入按时间排序的等待队列，
+    工作线程继续处理其他链接，时间到了再提交验证，大部分链接都遇到验证码时吞吐量也不会下降。
+
+    for detail in resolve_many([('https://xxx.lanzoul.com/ixxxx', 'abcd'), ...], workers=16):
+        print(detail.share_url, detail.direct_url)
+
+    @param items: 分享链接，或 (分享链接, 提取码) 元组组成的可迭代对象，可以是生成器
+    @param workers: 工作线程数
+    @param per_host: 每个主机同时在途的最大请求数；传入 api 时以 api 自身的 host_limit 为准
+    @param api: 复用已有的 LanZouApi 实例，为空时自动创建
+    @param logger: 日志记录对象，仅在自动创建 api 时使用
+    @return: LanZouFileDetail 生成器，通过 share_url 字段与输入对应
+    """
+
+    owns_api = api is None
+    if owns_api:
+        api = LanZouApi(logger=logger, host_limit=per_host)
+
+    try:
+        yield from _resolve(api, iter(items), workers)
+    finally:
+        if owns_api:  # 自动创建的客户端用完即关闭连接池，传入的 api 由调用方负责
+            api.close()
+
+
+def _resolve(api: LanZouApi, items: Iterator[ShareItem], workers: int) -> Iterator[LanZouFileDetail]:
+    max_pending = workers * 2  # 只预先提交有限的任务，避免一次性把输入全部读进内存
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='lanzou_resolve') as executor:
+        pending = set()
+        deferred: List[Tuple[float, int, LanZouCaptchaWait]] = []  # 等待验证码的链接，按 ready_at 排序的堆
+        sequence = itertools.count()  # ready_at 相同时用于比较
+
+        def _fill():
+            # 到时间的验证码优先提交，它们已经完成了大部分请求
+            while deferred and deferred[0][0] <= time.monotonic():
+                pending.add(executor.submit(_finish_one, api, heapq.heappop(deferred)[2]))
+            while len(pending) < max_pending:
+                try:
+                    share_url, pwd = _split_item(next(items))
+                except StopIteration:
+                    return
+                pending.add(executor.submit(_begin_one, api, share_url, pwd))
+
+        _fill()
+        while pending or deferred:
+            timeout = max(0.0, deferred[0][0] - time.monotonic()) if deferred else None
+            if pending:
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            else:  # 只剩等待验证码的链接
+                time.sleep(timeout)
+                done = ()
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if isinstance(result, LanZouCaptchaWait):
+                    heapq.heappush(deferred, (result.ready_at, next(sequence), result))
+                else:
+                    yield result
+            _fill()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 统一的重试策略：指数退避、随机抖动，以及每次操作的总时限
+--------------------------------------------
+"""
+
+import time
+import random
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple, Type
+
+import requests
+
+_local = threading.local()
+_task_deadline: ContextVar[Optional[float]] = ContextVar('lanzou_task_deadline', default=None)  # 异步客户端使用
+
+
+class RetryPolicy(object):
+    """
+    请求失败时是否重试、等待多久再重试
+
+    第 n 次重试前等待 min(backoff * 2^(n-1), max_backoff) 秒，并在此基础上随机减少最多 jitter 比例，
+    避免大量请求同时失败后又同时重试。一次操作(例如获取一个文件的直链，内部可能发送多个请求)
+    从开始起超过 deadline 秒后不再重试，剩余时间不足时单个请求的超时也会相应缩短。
+    """
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            backoff: float = 0.5,
+            max_backoff: float = 8.0,
+            jitter: float = 0.5,
+            deadline: Optional[float] = 60.0,
+            retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504),
+            retry_exceptions: Tuple[Type[BaseException], ...] = (
+                    requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError),
+            retry_zt: Tuple[int, ...] = (),
+    ):
+        """
+        @param max_attempts: 每个请求最多尝试几轮(每轮会依次尝试所有备用域名)
+        @param backoff: 第一次重试前的等待时间(秒)
+        @param max_backoff: 单次等待时间上限(秒)
+        @param jitter: 随机抖动比例，0 表示不抖动，1 表示在 [0, 等待时间] 内随机
+        @param deadline: 一次操作的总时限(秒)，None 表示不限制
+        @param retry_statuses: 需要重试的 HTTP 状态码
+        @param retry_exceptions: 需要重试的异常类型
+        @param retry_zt: 需要重试的蓝奏云接口返回码(响应 json 中的 zt 字段)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.deadline = deadline
+        self.retry_statuses = tuple(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.retry_zt = tuple(retry_zt)
+
+    def retry_on_status(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+    def retry_on_exception(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_exceptions)
+
+    def retry_on_zt(self, response) -> bool:
+        if not self.retry_zt:
+            return False
+        try:
+            return response.json().get('zt') in self.retry_zt
+        except (ValueError, AttributeError):
+            return False
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后、下一次尝试前应等待的时间"""
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.max_backoff)
+        return delay * (1 - self.jitter * random.random())
+
+    @contextmanager
+    def scope(self):
+        """
+        开始一次操作，操作内的所有请求共享同一个截止时间
+
+        嵌套调用时沿用最外层的截止时间；截止时间保存在线程局部变量中，不同线程的操作互不影响
+        """
+        if getattr(_local, 'deadline', None) is not None or self.deadline is None:
+            yield
+            return
+
+        _local.deadline = time.monotonic() + self.deadline
+        try:
+            yield
+        finally:
+            _local.deadline = None
+
+    @staticmethod
+    def remaining() -> Optional[float]:
+        """当前操作剩余的时间，不在操作内时返回 None"""
+        deadline = getattr(_local, 'deadline', None)
+        return None if deadline is None else deadline - time.monotonic()
+
+    def timeout(self, default: float) -> Optional[float]:
+        """单个请求的超时，不超过当前操作剩余的时间；截止时间已过时返回 None，调用方应停止发送请求"""
+        return self._timeout(default, self.remaining())
+
+    @staticmethod
+    def _timeout(default: float, remaining: Optional[float]) -> Optional[float]:
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            return None
+        return max(0.1, min(default, remaining))
+
+    def _backoff(self, attempt: int, remaining: Optional[float]) -> Optional[float]:
+        """还可以重试时返回需要等待的时间，否则返回 None"""
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self.delay(attempt)
+        if remaining is not None and remaining <= delay:
+            return None
+        return delay
+
+    def wait(self, attempt: int) -> bool:
+        """
+        第 attempt 次尝试失败后调用：还可以重试时等待退避时间并返回 True，否则返回 False
+        """
+        delay = self._backoff(attempt, self.remaining())
+        if delay is None:
+            return False
+
+        time.sleep(delay)
+        return True
+
+    @contextmanager
+    def task_scope(self):
+        """
+        scope 的异步版本，截止时间保存在 contextvars 中：
+        每个 asyncio 任务各自独立，在操作内创建的子任务沿用同一个截止时间
+        """
+        if _task_deadline.get() is not None or self.deadline is None:
+            yield
+            return
+
+        token = _task_deadline.set(time.monotonic() + self.deadline)
+        try:
+            yield
+        finally:
+            _task_deadline.reset(token)
+
+    @staticmethod
+    def task_remaining() -> Optional[float]:
+        deadline = _task_deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def task_timeout(self, default: float) -> Optional[float]:
+        return self._timeout(default, self.task_remaining())
+
+    async def async_wait(self, attempt: int) -> bool:
+        """wait 的异步版本，退避期间不阻塞事件循环"""
+        delay = self._backoff(attempt, self.task_remaining())
+        if delay is None:
+            return False
+
+        import asyncio  # 只有异步客户端用到，同步客户端导入时不必加载
+        await asyncio.sleep(delay)
+        return True
+
+
+def operation(func):
+    """把一个方法标记为一次操作，方法内的所有请求共享 self._retry_policy 的截止时间"""
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self._retry_policy.scope():
+            return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def async_operation(func):
+    """operation 的异步版本"""
+
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        with self._retry_policy.task_scope():
+            return await func(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 大文件分块上传、下载用到的分块读取与清单(manifest)
+--------------------------------------------
+"""
+
+import os
+import json
+import hashlib
+from typing import List, Optional
+
+from .stream import _StreamBody
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.txt'  # 清单文件本身也要通过 is_name_valid 校验
+PART_SUFFIX = '.zip'
+
+
+def part_name(filename: str, index: int) -> str:
+    """数据块的文件名，例如 data.bin.001.zip"""
+    return f'{filename}.{index:03d}{PART_SUFFIX}'
+
+
+def manifest_name(filename: str) -> str:
+    return filename + MANIFEST_SUFFIX
+
+
+def split_ranges(total_size: int, part_size: int) -> List[tuple]:
+    """按块大小切分文件，返回 [(offset, length), ...]"""
+    return [(offset, min(part_size, total_size - offset)) for offset in range(0, total_size, part_size)]
+
+
+def file_sha256(file_path: str, offset: int = 0, length: Optional[int] = None, block_size: int = 1048576) -> str:
+    """计算文件某一段的 sha256"""
+
+    hasher = hashlib.sha256()
+    remain = os.path.getsize(file_path) - offset if length is None else length
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        while remain > 0:
+            chunk = file.read(min(block_size, remain))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remain -= len(chunk)
+    return hasher.hexdigest()
+
+
+class FileSlice(_StreamBody):
+    """
+    只读的文件片段，可以直接交给 MultipartEncoder，不需要先把数据块写到临时文件
+
+    len() 返回片段中尚未读取的长度(MultipartEncoder 据此判断是否读完)；文件在上传过程中被截短时抛出 IOError，
+    不会因为读不到数据而一直循环
+    """
+
+    def __init__(self, file_path: str, offset: int, length: int):
+        file = open(file_path, 'rb')
+        file.seek(offset)
+        super().__init__(file, length)
+
+    def close(self):
+        self._fileobj.close()
+
+
+def build_manifest(filename: str, total_size: int, part_size: int, parts: List[dict]) -> bytes:
+    """
+    生成清单内容
+
+    @param parts: 按顺序排列的数据块信息，每项包含 index、name、offset、size、sha256、id、url、pwd
+    """
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'name': filename,
+        'size': total_size,
+        'part_size': part_size,
+        'parts': sorted(parts, key=lambda p: p['index']),
+    }
+    return json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+def parse_manifest(content: bytes) -> dict:
+    manifest = json.loads(content.decode('utf-8'))
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"不支持的清单版本: {manifest.get('version')}")
+    return manifest
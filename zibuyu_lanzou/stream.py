@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 把本地文件、内存数据、文件对象、生成器包装成 MultipartEncoder 可以直接读取的上传数据
+--------------------------------------------
+"""
+
+import io
+import os
+import mmap
+import stat
+import time
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+UploadSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap, io.IOBase, Iterable[bytes]]
+
+
+class UploadBody(object):
+    """
+    MultipartEncoder 通过 len(obj) 得到剩余长度，通过 obj.read(size) 读取数据；
+    bytes、BytesIO 等对象会被它复制一份，包装之后按需切片读取，不再复制整个数据
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._pos = 0
+
+    def __len__(self):
+        return self._size - self._pos  # 必须是剩余长度，否则读完之后 MultipartEncoder 会一直读下去
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def tell(self) -> int:
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        remain = self._size - self._pos
+        if size is None or size < 0 or size > remain:
+            size = remain
+        if size <= 0:
+            return b''
+        data = self._read(size)
+        self._pos += len(data)
+        return data
+
+    def _read(self, size: int) -> bytes:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _BufferBody(UploadBody):
+    """内存中的数据或 mmap 映射的文件，读取时只复制本次读取的切片"""
+
+    def __init__(self, buffer, owner=None):
+        self._view = memoryview(buffer).cast('B')
+        self._owner = owner  # 需要随之关闭的对象，例如 mmap 与打开的文件
+        super().__init__(len(self._view))
+
+    def _read(self, size):
+        return self._view[self._pos:self._pos + size].tobytes()
+
+    def close(self):
+        self._view.release()  # BytesIO.getbuffer() 返回的视图释放前，BytesIO 不能改变大小
+        for obj in self._owner or ():
+            obj.close()
+
+
+class _StreamBody(UploadBody):
+    """只能顺序读取的对象，例如管道；长度必须事先知道"""
+
+    def __init__(self, fileobj, size: int):
+        super().__init__(size)
+        self._fileobj = fileobj
+
+    def _read(self, size):
+        chunks, need = [], size
+        while need > 0:  # 管道一次可能返回比请求少的数据
+            chunk = self._fileobj.read(need)
+            if not chunk:
+                raise IOError(f'数据只有 {self._pos + size - need} 字节，少于指定的 {self._size} 字节')
+            chunks.append(chunk)
+            need -= len(chunk)
+        return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+
+class _IterBody(UploadBody):
+    """逐块产生数据的生成器；长度必须事先知道"""
+
+    def __init__(self, iterable: Iterable[bytes], size: int):
+        super().__init__(size)
+        self._iterator: Iterator[bytes] = iter(iterable)
+        self._pending = memoryview(b'')
+
+    def _read(self, size):
+        chunks, need = [], size
+        while need > 0:
+            if not self._pending:
+                try:
+                    self._pending = memoryview(next(self._iterator)).cast('B')
+                except StopIteration:
+                    raise IOError(f'数据只有 {self._pos + size - need} 字节，少于指定的 {self._size} 字节')
+                continue
+            chunk, self._pending = self._pending[:need], self._pending[need:]
+            chunks.append(chunk)
+            need -= len(chunk)
+        return b''.join(chunks)
+
+
+def _map_file(file, close_file: bool) -> UploadBody:
+    """把打开的本地文件从当前位置到末尾映射到内存；close_file 为 True 时随 UploadBody 一起关闭文件"""
+
+    owner = [file] if close_file else []
+    start = file.tell()
+    if os.fstat(file.fileno()).st_size - start <= 0:  # 空文件不能 mmap
+        return _BufferBody(b'', owner=owner)
+    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return _BufferBody(memoryview(mapped)[start:], owner=[mapped] + owner)
+
+
+def open_upload_body(source: UploadSource, size: Optional[int] = None) -> UploadBody:
+    """
+    把上传数据包装成 UploadBody，用完后调用 close()
+
+    @param source: 本地文件路径，bytes / bytearray / memoryview / mmap，BytesIO，可读的文件对象(包括管道)，
+                   或者逐块产生 bytes 的可迭代对象
+    @param size: 数据长度；管道、生成器等无法预先得到长度的数据源需要指定，否则先全部读入内存
+    @return: UploadBody
+    """
+
+    if isinstance(source, (str, os.PathLike)):  # 本地文件使用 mmap，不经过文件对象的缓冲区
+        return _map_file(open(source, 'rb'), close_file=True)
+
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return _BufferBody(source)
+
+    if isinstance(source, io.BytesIO):
+        return _BufferBody(source.getbuffer()[source.tell():])
+
+    if hasattr(source, 'read'):
+        try:
+            is_file = stat.S_ISREG(os.fstat(source.fileno()).st_mode)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            is_file = False
+        if is_file and size is None:
+            return _map_file(source, close_file=False)
+        if size is not None:
+            return _StreamBody(source, size)
+        return _BufferBody(source.read())  # 长度未知，只能先全部读出来
+
+    if size is not None:
+        return _IterBody(source, size)
+    return _BufferBody(b''.join(source))
+
+
+class EncoderStream(object):
+    """
+    按 block_size 分块发送 MultipartEncoder 生成的数据，并合并进度回调
+
+    requests 对有 __len__、没有 read 的可迭代对象设置 Content-Length，urllib3 逐块发送迭代出的数据；
+    直接交给 urllib3 时每次只读取 16 KB(MultipartEncoderMonitor 每次读取都调用一次回调)，块越大 Python 层的调用越少。
+    进度回调在距上一次回调超过 interval 秒或 step 字节时触发，发送完成时再调用一次。
+    """
+
+    def __init__(self, encoder, block_size: int = 262144, progress: Optional[Callable[[int, int], None]] = None,
+                 interval: float = 0.1, step: Optional[int] = None):
+        """
+        @param encoder: MultipartEncoder
+        @param block_size: 每次发送的字节数
+        @param progress: 进度回调，参数为 (已发送字节数, 总字节数)
+        @param interval: 两次进度回调的最小间隔(秒)
+        @param step: 已发送的字节数比上一次回调时多出 step 时也会回调，为空表示只按时间
+        """
+        self.encoder = encoder
+        self.block_size = max(1, block_size)
+        self.progress = progress
+        self.interval = interval
+        self.step = step
+        self.total = encoder.len
+        self.bytes_sent = 0
+        self.elapsed = 0.0  # 从开始读取到全部交给连接的时间(秒)
+        self.callbacks = 0
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self) -> Iterator[bytes]:
+        start = last_time = time.perf_counter()
+        last_bytes = 0
+        while True:
+            chunk = self.encoder.read(self.block_size)
+            if not chunk:
+                break
+            yield chunk  # 返回时这一块已经发送完毕
+            self.bytes_sent += len(chunk)
+
+            if self.progress is not None:
+                now = time.perf_counter()
+                if now - last_time >= self.interval or (self.step and self.bytes_sent - last_bytes >= self.step):
+                    last_time, last_bytes = now, self.bytes_sent
+                    self._report()
+
+        self.elapsed = time.perf_counter() - start
+        if self.progress is not None and last_bytes != self.bytes_sent:
+            self._report()
+
+    def _report(self):
+        self.callbacks += 1
+        self.progress(self.bytes_sent, self.total)
+
+    @property
+    def throughput(self) -> float:
+        """发送速度(字节/秒)"""
+        return self.bytes_sent / self.elapsed if self.elapsed > 0 else 0.0
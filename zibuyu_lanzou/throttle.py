@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""
+--------------------------------------------
+project: zibuyu_lanzou
+author: 子不语
+date: 2026/10/17
+contact: 【公众号】思维兵工厂
+description: 按站点自适应限速：令牌桶 + AIMD，遇到反爬验证时降速，一段时间没有再遇到时逐步提速
+--------------------------------------------
+"""
+
+import time
+import threading
+from typing import Dict, List
+from urllib.parse import urlparse
+
+# 限速信号
+ACW = 'acw'  # 分享页面返回 acw_sc__v2 验证页面
+CAPTCHA = 'captcha'  # 假直链返回 '网络异常' 验证页面
+TOO_MANY_REQUESTS = 'too_many_requests'  # 状态码 429
+
+
+def site_of(url: str) -> str:
+    """
+    分享链接的二级域名各不相同(xxx.lanzouo.com)，但反爬是按整个站点统计的，所以按主域名限速
+    """
+    host = urlparse(url).netloc or url
+    name = host.split(':')[0]
+    if name.replace('.', '').isdigit():  # ip 地址
+        return host
+    return '.'.join(name.split('.')[-2:])
+
+
+class _Bucket(object):
+    __slots__ = ('rate', 'tokens', 'updated', 'last_decrease', 'signals', 'successes', 'waited')
+
+    def __init__(self, rate: float, now: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = now
+        self.last_decrease = 0.0
+        self.signals: Dict[str, int] = {}
+        self.successes = 0
+        self.waited = 0.0  # 累计等待时间(秒)
+
+
+class AdaptiveRateLimiter(object):
+    """
+    每个站点一个令牌桶，速率按 AIMD 调整
+
+    每次成功的请求把速率提高 increase / rate，即大约每秒提高 increase 次/秒；
+    遇到限速信号(acw_sc__v2 验证页面、验证码页面、429)时速率乘以 decrease，
+    同一个站点 1 秒(速率低于 1 次/秒时为 1 / rate 秒)内的多个信号(并发请求同时被拦截)只降速一次。
+    令牌不足时请求排队等待，而不是先突发请求再被惩罚。
+    """
+
+    def __init__(self, rate: float = 5.0, min_rate: float = 0.2, max_rate: float = 50.0, burst: float = 2.0,
+                 increase: float = 0.5, decrease: float = 0.5):
+        """
+        @param rate: 每个站点的初始速率(次/秒)
+        @param min_rate: 速率下限
+        @param max_rate: 速率上限
+        @param burst: 令牌桶容量，即空闲后最多连续发出的请求数
+        @param increase: 没有限速信号时每秒增加的速率
+        @param decrease: 遇到限速信号时速率乘以的系数
+        """
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def _bucket(self, site: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(site)
+        if bucket is None:
+            bucket = self._buckets[site] = _Bucket(self.initial_rate, now)
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """取一个令牌，返回需要等待的时间(秒)；令牌可以透支，后来的请求按顺序排在后面"""
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(site_of(url), now)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.tokens -= 1
+            wait = 0.0 if bucket.tokens >= 0 else -bucket.tokens / bucket.rate
+            bucket.waited += wait
+            return wait
+
+    def acquire(self, url: str) -> float:
+        """等待直到可以请求 url，返回等待的时间(秒)"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def success(self, url: str):
+        with self._lock:
+            bucket = self._bucket(site_of(url), time.monotonic())
+            bucket.successes += 1
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+
+    def penalize(self, url: str, signal: str):
+        """遇到限速信号"""
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(site_of(url), now)
+            bucket.signals[signal] = bucket.signals.get(signal, 0) + 1
+            if now - bucket.last_decrease < max(1.0, 1 / bucket.rate):
+                return  # 同一批并发请求引起的信号
+            bucket.last_decrease = now
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+            bucket.tokens = min(bucket.tokens, 0.0)  # 降速后不再允许突发
+
+    def rate(self, url: str) -> float:
+        with self._lock:
+            return self._bucket(site_of(url), time.monotonic()).rate
+
+    def stats(self) -> List[dict]:
+        """各站点当前的速率、成功次数、累计等待时间与各个信号出现的次数"""
+        with self._lock:
+            return [{
+                'site': site,
+                'rate': bucket.rate,
+                'successes': bucket.successes,
+                'waited': bucket.waited,
+                'signals': dict(bucket.signals),
+            } for site, bucket in sorted(self._buckets.items())]
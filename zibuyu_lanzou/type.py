@@ -29,6 +29,15 @@ class LanZouFileDetail:
     direct_url: str = ''  # 直链
 
 
+@dataclass
+class LanZouCaptchaWait:
+    """解析直链时遇到验证码，需要等到 ready_at 之后再提交验证"""
+
+    detail: LanZouFileDetail  # 已经解析出的文件信息
+    post_data: dict  # 提交验证码的参数
+    ready_at: float  # time.monotonic() 的时间点
+
+
 @dataclass
 class LanZouCookie:
     """蓝奏云cookie"""
@@ -37,6 +46,25 @@ class LanZouCookie:
     phpdisk_info: str
 
 
+class LanZouCookieError(Exception):
+    """cookie 缺失或登录已失效，需要更换 cookie 后重试"""
+
+
+class LanZouListError(Exception):
+    """列举文件夹失败(按重试策略重试后仍没有拿到某一页)，不能把已经拿到的部分当作完整的列表"""
+
+    def __init__(self, folder_id, page: int = 0, msg: str = ''):
+        """
+        @param folder_id: 文件夹 id
+        @param page: 失败的文件列表页码，0 表示子文件夹列表
+        @param msg: 失败原因
+        """
+        self.folder_id = folder_id
+        self.page = page
+        what = f'文件列表第 {page} 页' if page else '子文件夹列表'
+        super().__init__(f"获取文件夹 {folder_id} 的{what}失败" + (f": {msg}" if msg else ''))
+
+
 @dataclass
 class LanZouFolder:
     """蓝奏云文件夹信息"""
@@ -60,6 +88,15 @@ class LanZouFile:
     has_des: bool = False  # 是否存在描述
 
 
+@dataclass
+class LanZouBatchResult:
+    """批量操作中单个 id 的结果"""
+
+    id: Union[str, int]
+    success: bool = False
+    request_msg: str = ''  # 失败原因
+
+
 @dataclass
 class LanZouShareInfo:
     """蓝奏云分享链接信息"""
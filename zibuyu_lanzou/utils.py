@@ -10,9 +10,13 @@ description:
 --------------------------------------------
 """
 
-from fake_useragent import UserAgent
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Dict, List, Optional
 from copy import deepcopy
 import mimetypes
+import random
+import threading
 import requests
 import datetime
 import logging
@@ -20,13 +24,49 @@ import json
 import os
 import re
 
-# 共用请求头
+from .cache import DirectUrlCache
+from .parser import strip_comments
+from .type import LanZouFileDetail
+
+# 共用请求头，User-Agent 在发送请求时通过 user_agent() 获取
 HEADERS = {
-    'User-Agent': UserAgent().chrome,
     # 'Referer': 'https://pan.lanzous.com',  # 可以没有
     'Accept-Language': 'zh-CN,zh;q=0.9',
 }
 
+# fake_useragent 的数据加载失败时使用
+_DEFAULT_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                       'Chrome/122.0.0.0 Safari/537.36')
+_USER_AGENT_POOL_SIZE = 8
+_user_agents: List[str] = []
+_user_agent_lock = threading.Lock()
+
+_logger_lock = threading.Lock()
+_configured_handlers = set()  # 已经添加过的 (日志名称, 终端/日志目录)，同一个 handler 只添加一次
+
+
+def user_agent() -> str:
+    """
+    随机返回一个浏览器 User-Agent
+
+    UserAgent() 加载数据要几十毫秒，每次取 .random 还要再遍历一遍数据，
+    所以进程内只在第一次调用时加载并取样若干个，之后从取样结果中随机选择
+    """
+    if not _user_agents:
+        with _user_agent_lock:
+            if not _user_agents:
+                _user_agents.extend(_sample_user_agents(_USER_AGENT_POOL_SIZE))
+    return random.choice(_user_agents)
+
+
+def _sample_user_agents(size: int) -> List[str]:
+    try:
+        from fake_useragent import UserAgent  # 导入也要几十毫秒，用到时才导入
+        ua = UserAgent()
+        return list({ua.random for _ in range(size)}) or [_DEFAULT_USER_AGENT]
+    except Exception:  # 数据文件损坏或版本不兼容
+        return [_DEFAULT_USER_AGENT]
+
 
 # 生成日志记录对象
 def get_logger(
@@ -56,72 +96,80 @@ def get_logger(
     # 设置为日志输出级别
     logger.setLevel(logging.DEBUG)
 
-    # 创建formatter，并设置formatter的格式
-    formatter = logging.Formatter(fmt=fmt, datefmt="%Y-%m-%d %H:%M:%S", )
-
-    # 创建终端输出handler，为其设置格式，并添加到logger中
-    if if_console:
-
-        try:
-            # 使用coloredlogs打印更好看的日志，注册即可，无需创建终端handler
-            import coloredlogs
-
-            # 自定义日志的级别颜色
-            level_color_mapping = {
-                'DEBUG': {'color': 'blue'},
-                'INFO': {'color': 'green'},
-                'WARNING': {'color': 'yellow', 'bold': True},
-                'ERROR': {'color': 'red'},
-                'CRITICAL': {'color': 'red', 'bold': True}
-            }
-
-            # 自定义日志的字段颜色
-            field_color_mapping = dict(
-                asctime=dict(color='green'),
-                hostname=dict(color='magenta'),
-                levelname=dict(color='white', bold=True),
-                name=dict(color='blue'),
-                programname=dict(color='cyan'),
-                username=dict(color='yellow'),
-            )
-
-            coloredlogs.install(
-                level=logging.DEBUG,
-                logger=logger,
-                milliseconds=True,
-                datefmt='%X',
-                fmt=fmt,
-                level_styles=level_color_mapping,
-                field_styles=field_color_mapping
-            )
-        except:
-
-            # 方式一：
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)  # 设置终端的输出级别为info
-
-            console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
-
-    # 若传入base_path，即传入日志文件存放目录，则创建文件输出handler，为其设置格式，并添加到logger中
-    if base_path and os.path.exists(base_path) and os.path.isdir(base_path):
-        # 拼接路径
-        log_dir = os.path.join(base_path, "log_file")
-
-        # 判断路径是否存在，不存在则创建
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-
-        file_path = os.path.join(log_dir, f"{formatted_date}.log")
-
-        file_handler = logging.FileHandler(filename=file_path, mode='a', encoding='utf8', delay=False)
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    with _logger_lock:
+        # 每创建一个客户端都会调用一次，已经添加过的 handler 不再重复添加，否则每条日志会输出多遍
+        if if_console and (log_name, 'console') not in _configured_handlers:
+            _configured_handlers.add((log_name, 'console'))
+            _add_console_handler(logger, fmt)
+
+        # 若传入base_path，即传入日志文件存放目录，则创建文件输出handler，为其设置格式，并添加到logger中
+        if base_path and os.path.exists(base_path) and os.path.isdir(base_path):
+            # 拼接路径
+            log_dir = os.path.join(base_path, "log_file")
+
+            if (log_name, os.path.abspath(log_dir)) not in _configured_handlers:
+                _configured_handlers.add((log_name, os.path.abspath(log_dir)))
+
+                # 判断路径是否存在，不存在则创建
+                if not os.path.exists(log_dir):
+                    os.makedirs(log_dir)
+
+                file_path = os.path.join(log_dir, f"{formatted_date}.log")
+
+                file_handler = logging.FileHandler(filename=file_path, mode='a', encoding='utf8', delay=False)
+                file_handler.setLevel(logging.DEBUG)
+                file_handler.setFormatter(logging.Formatter(fmt=fmt, datefmt="%Y-%m-%d %H:%M:%S", ))
+                logger.addHandler(file_handler)
 
     return logger
 
 
+def _add_console_handler(logger: logging.Logger, fmt: str):
+    """创建终端输出handler，为其设置格式，并添加到logger中"""
+
+    try:
+        # 使用coloredlogs打印更好看的日志，注册即可，无需创建终端handler
+        import coloredlogs
+
+        # 自定义日志的级别颜色
+        level_color_mapping = {
+            'DEBUG': {'color': 'blue'},
+            'INFO': {'color': 'green'},
+            'WARNING': {'color': 'yellow', 'bold': True},
+            'ERROR': {'color': 'red'},
+            'CRITICAL': {'color': 'red', 'bold': True}
+        }
+
+        # 自定义日志的字段颜色
+        field_color_mapping = dict(
+            asctime=dict(color='green'),
+            hostname=dict(color='magenta'),
+            levelname=dict(color='white', bold=True),
+            name=dict(color='blue'),
+            programname=dict(color='cyan'),
+            username=dict(color='yellow'),
+        )
+
+        coloredlogs.install(
+            level=logging.DEBUG,
+            logger=logger,
+            milliseconds=True,
+            datefmt='%X',
+            fmt=fmt,
+            level_styles=level_color_mapping,
+            field_styles=field_color_mapping
+        )
+    except:
+
+        # 方式一：
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)  # 设置终端的输出级别为info
+
+        # 创建formatter，并设置formatter的格式
+        console_handler.setFormatter(logging.Formatter(fmt=fmt, datefmt="%Y-%m-%d %H:%M:%S", ))
+        logger.addHandler(console_handler)
+
+
 def name_format(name: str) -> str:
     """去除非法字符# 去除其它字符集的空白符,去除重复空白字符"""
     name = name.replace(u'\xa0', ' ').replace(u'\u3000', ' ').replace('  ', ' ')
@@ -177,11 +225,8 @@ def is_name_valid(filename: str) -> bool:
 
 def remove_notes(html: str) -> str:
     """删除网页的注释"""
-    # 去掉 html 里面的 // 和 <!-- --> 注释，防止干扰正则匹配提取数据
-    # 蓝奏云的前端程序员喜欢改完代码就把原来的代码注释掉,就直接推到生产环境了 =_=
-    html = re.sub(r'<!--.+?-->|\s+//\s*.+', '', html)  # html 注释
-    html = re.sub(r'(.+?[,;])\s*//.+', r'\1', html)  # js 注释
-    return html
+    # 去掉 html 里面的 // 和 <!-- --> 注释，防止干扰正则匹配提取数据；具体规则见 parser.strip_comments
+    return strip_comments(html)
 
 
 def is_file_url(share_url: str) -> bool:
@@ -195,7 +240,7 @@ def is_file_url(share_url: str) -> bool:
     # VIP 用户的 URL 很随意
     try:
 
-        html = requests.get(share_url, headers=HEADERS).text
+        html = requests.get(share_url, headers={**HEADERS, 'User-Agent': user_agent()}).text
         html = remove_notes(html)
         return True if re.search(r'class="fileinfo"|id="file"|文件描述', html) else False
     except (requests.RequestException, Exception):
@@ -203,37 +248,34 @@ def is_file_url(share_url: str) -> bool:
 
 
 # 参考自 https://zhuanlan.zhihu.com/p/228507547
+# unsbox 的置换表：结果的第 i 位取自参数的第 _UNSBOX_ORDER[i] 位(原表从 1 开始计数)
+_UNSBOX_ORDER = tuple(i - 1 for i in (
+    15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26, 2,
+    30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36))
+_ACW_KEY = "3000176000856006061501533003690027800375"
+_ACW_ARG1 = re.compile(r"arg1='([0-9A-Z]+)'")
+
+
 def unsbox(str_arg):
-    v1 = [15, 35, 29, 24, 33, 16, 1, 38, 10, 9, 19, 31, 40, 27, 22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26, 2,
-          30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36]
-    v2 = ["" for _ in v1]
-    for idx in range(0, len(str_arg)):
-        v3 = str_arg[idx]
-        for idx2 in range(len(v1)):
-            if v1[idx2] == idx + 1:
-                v2[idx2] = v3
-
-    res = ''.join(v2)
-    return res
+    """按置换表重排字符，超出参数长度的位置跳过"""
+    length = len(str_arg)
+    return ''.join([str_arg[i] for i in _UNSBOX_ORDER if i < length])
 
 
 def hex_xor(str_arg, args):
-    res = ''
-    for idx in range(0, min(len(str_arg), len(args)), 2):
-        v1 = int(str_arg[idx:idx + 2], 16)
-        v2 = int(args[idx:idx + 2], 16)
-        v3 = format(v1 ^ v2, 'x')
-        if len(v3) == 1:
-            v3 = '0' + v3
-        res += v3
-
+    """两个十六进制字符串按字节异或，结果长度取两者中较短的"""
+    length = min(len(str_arg), len(args))
+    even = length - length % 2
+    res = bytes(a ^ b for a, b in zip(bytes.fromhex(str_arg[:even]), bytes.fromhex(args[:even]))).hex()
+    if length % 2:  # 奇数长度时最后一段单独计算，与原来逐段切片的结果保持一致
+        res += format(int(str_arg[even:even + 2], 16) ^ int(args[even:even + 2], 16), '02x')
     return res
 
 
 def calc_acw_sc__v2(html_text: str) -> str:
-    arg1 = re.search(r"arg1='([0-9A-Z]+)'", html_text)
+    arg1 = _ACW_ARG1.search(html_text)
     arg1 = arg1.group(1) if arg1 else ""
-    acw_sc__v2 = hex_xor(unsbox(arg1), "3000176000856006061501533003690027800375")
+    acw_sc__v2 = hex_xor(unsbox(arg1), _ACW_KEY)
     return acw_sc__v2
 
 
@@ -243,22 +285,34 @@ def re_domain(url: str):
     return match.group(1) if match else None
 
 
-def get_direct_download_url(share_url: str, password: str) -> str:
+def get_direct_download_url(share_url: str, password: str, cache: Optional[DirectUrlCache] = None) -> Optional[str]:
     """
     根据蓝奏云分享链接，获取下载直链
     @param share_url:
     @param password:
-    @return:
+    @param cache: 直链缓存，可与 LanZouApi 共用同一个实例
+    @return: 下载直链；页面结构变化、找不到所需字段时记录日志并返回 None
     """
 
+    logger = logging.getLogger('lanzou_api')
+
+    if cache is not None:
+        detail = cache.get(share_url, password)
+        if detail is not None:
+            return detail.direct_url
+
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36 Edg/121.0.0.0"
     }
 
     response = requests.get(share_url, headers=headers)
 
-    url_match = re.search(r"url\s*:\s*'(/ajaxm\.php\?file=\d+)'", response.text).group(1)
-    skdklds_match = re.search(r"var\s+skdklds\s*=\s*'([^']*)';", response.text).group(1)
+    url_match = re.search(r"url\s*:\s*'(/ajaxm\.php\?file=\d+)'", response.text)
+    skdklds_match = re.search(r"var\s+skdklds\s*=\s*'([^']*)';", response.text)
+    if url_match is None or skdklds_match is None:
+        logger.error(f"分享页面 {share_url} 中没有找到 ajaxm 地址或 sign")
+        return None
+    url_match, skdklds_match = url_match.group(1), skdklds_match.group(1)
 
     data = {
         'action': 'downprocess',
@@ -272,8 +326,12 @@ def get_direct_download_url(share_url: str, password: str) -> str:
 
     domain = re_domain(share_url)
     response2 = requests.post(f"https://{domain}{url_match}", headers=headers, data=data)
-    data = json.loads(response2.text)
-    full_url = data['dom'] + "/file/" + data['url']
+    try:
+        data = json.loads(response2.text)
+        full_url = data['dom'] + "/file/" + data['url']
+    except (ValueError, KeyError, TypeError):
+        logger.error(f"分享链接 {share_url} 的 ajaxm 返回值无法解析: 【{response2.text[:200]}】")
+        return None
 
     headers = {
         "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
@@ -287,9 +345,40 @@ def get_direct_download_url(share_url: str, password: str) -> str:
         "sec-fetch-user": "?1",
         "upgrade-insecure-requests": "1",
         "cookie": "down_ip=1",
-        'User-Agent': UserAgent().random,
+        'User-Agent': user_agent(),
     }
 
     response3 = requests.get(full_url, headers=headers, allow_redirects=False)
-    redirect_url = response3.headers['Location']
+    redirect_url = response3.headers.get('Location')
+    if not redirect_url:
+        logger.error(f"分享链接 {share_url} 的下载页面没有返回跳转地址")
+        return None
+
+    if cache is not None:
+        cache.set(share_url, password, LanZouFileDetail(
+            request_info='请求成功', share_url=share_url, share_pwd=password, direct_url=redirect_url
+        ))
     return redirect_url
+
+
+class HostLimiter(object):
+    """按主机限制并发请求数，多个线程共享同一个实例"""
+
+    def __init__(self, per_host: int = 4):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _get_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        return semaphore
+
+    @contextmanager
+    def limit(self, url: str):
+        """在 with 语句块内占用 url 所属主机的一个并发名额"""
+        semaphore = self._get_semaphore(urlparse(url).netloc)
+        with semaphore:
+            yield